@@ -0,0 +1,10 @@
+import logging
+__version__ = '0.8.5' # keep in sync with ../setup.py
+
+log = logging.getLogger('stdeb')
+log.setLevel(logging.INFO)
+handler = logging.StreamHandler()
+handler.setLevel(logging.INFO)
+formatter = logging.Formatter('%(message)s')
+handler.setFormatter(formatter)
+log.addHandler(handler)
@@ -0,0 +1,10 @@
+"""
+Benchmarks of gcg on large synthetic repositories.
+
+common   - repository parameters and command-line parsing shared by
+           the scripts
+generate - creates the repositories with 'git fast-import'
+run      - times the stages of a changelog run and writes the results
+           to a JSON file
+compare  - compares two result files, e.g. of two revisions of gcg
+"""
@@ -0,0 +1,99 @@
+#!/usr/bin/env python2
+
+"""
+Helpers shared by the benchmark scripts: the parameters of the generated
+repositories and the command-line parsing.
+"""
+
+import argparse
+import collections
+import sys
+
+RepoParams = collections.namedtuple('RepoParams', [
+    'commits',          # number of commits (including merges and branches)
+    'tag_every',        # mainline commits between consecutive releases
+    'merge_ratio',      # share of mainline commits which are merges
+    'branch_length',    # commits per side branch (merged back)
+    'message_size',     # approximate size of the commit messages (bytes)
+    'annotated_ratio',  # share of the tags which are annotated
+    'seed',             # random seed
+])
+DEFAULT_PARAMS = RepoParams(commits=10000, tag_every=100, merge_ratio=0.1,
+                            branch_length=1, message_size=200,
+                            annotated_ratio=0.5, seed=0)
+
+
+def params_name(params):
+    """
+    :param params: a RepoParams object
+    :return: a directory name unique for the parameters
+    """
+    return 'repo-c{}-t{}-m{}-b{}-s{}-a{}-r{}'.format(*params)
+
+
+def params_from_dict(data):
+    """
+    :param data: dictionary of parameters, as saved (see RepoParams._asdict())
+    :return: a RepoParams object; parameters added since the dictionary
+             was saved have their default values
+    """
+    return DEFAULT_PARAMS._replace(**data)
+
+
+def add_params_arguments(parser):
+    """Add the repository parameters to an argparse parser"""
+    parser.add_argument(
+        '--commits', help="""Number of commits""",
+        type=int, nargs='+', default=[DEFAULT_PARAMS.commits],
+    )
+    parser.add_argument(
+        '--tag-every', help="""Mainline commits per release""",
+        type=int, default=DEFAULT_PARAMS.tag_every,
+    )
+    parser.add_argument(
+        '--merge-ratio', help="""Share of merge commits (0-1)""",
+        type=float, default=DEFAULT_PARAMS.merge_ratio,
+    )
+    parser.add_argument(
+        '--branch-length', help="""Commits per merged side branch""",
+        type=int, default=DEFAULT_PARAMS.branch_length,
+    )
+    parser.add_argument(
+        '--message-size', help="""Commit message size (bytes)""",
+        type=int, default=DEFAULT_PARAMS.message_size,
+    )
+    parser.add_argument(
+        '--annotated-ratio', help="""Share of annotated tags (0-1);
+        the other tags are lightweight""",
+        type=float, default=DEFAULT_PARAMS.annotated_ratio,
+    )
+    parser.add_argument(
+        '--seed', help="""Random seed""",
+        type=int, default=DEFAULT_PARAMS.seed,
+    )
+
+
+def params_from_arguments(options):
+    """:return: list of RepoParams objects, one per commit count"""
+    return [RepoParams(x, options.tag_every, options.merge_ratio,
+                       options.branch_length, options.message_size,
+                       options.annotated_ratio, options.seed)
+            for x in options.commits]
+
+
+def script_arguments(description, argv, add_arguments):
+    """
+    Parse the command-line parameters of a benchmark script
+    :param description: description of the script (for --help)
+    :param argv: script parameters (including the script name) or None
+                 to use sys.argv
+    :param add_arguments: callable adding the arguments to the parser
+    :return: object with configuration (as provided by argparse)
+    """
+    if argv is None:
+        argv = sys.argv
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+        description=description)
+    add_arguments(parser)
+    return parser.parse_args(argv[1:])
@@ -0,0 +1,95 @@
+#!/usr/bin/env python2
+
+"""
+Compare two benchmark result files (see benchmarks.run), e.g. of the last
+release and of the current revision, and report the stages which got
+slower by more than a threshold.
+
+Usage: python -m benchmarks.compare baseline.json current.json
+"""
+
+from __future__ import print_function
+
+import json
+import sys
+
+from benchmarks.common import script_arguments
+from benchmarks.run import STAGES, scenario_key
+
+# stages shorter than that (in both runs) are too noisy to compare
+MIN_DURATION = 0.05
+
+
+def load_results(path):
+    """
+    :param path: results file path
+    :return: tuple (revision, dict of scenarios by scenario_key())
+    """
+    with open(path) as rfile:
+        results = json.load(rfile)
+    return (results.get('revision'),
+            dict((scenario_key(x), x) for x in results['scenarios']))
+
+
+def compare_results(baseline, current, threshold):
+    """
+    :param baseline: scenarios of the baseline run (see load_results())
+    :param current: scenarios of the compared run
+    :param threshold: ratio of the times (current / baseline) above which
+                      a stage is reported as regressed
+    :return: list of tuples (scenario key, stage, baseline time,
+             current time, ratio, regressed) for the scenarios in both
+    """
+    retval = []
+    for key in sorted(set(baseline) & set(current)):
+        before = baseline[key]['timings']
+        after = current[key]['timings']
+        for stage in STAGES + ('total',):
+            if stage not in before or stage not in after:
+                continue
+            ratio = after[stage] / before[stage] if before[stage] else None
+            regressed = ratio is not None and ratio > threshold and \
+                max(before[stage], after[stage]) >= MIN_DURATION
+            retval.append((key, stage, before[stage], after[stage], ratio,
+                           regressed))
+    return retval
+
+
+def add_arguments(parser):
+    """Add the arguments of the comparison to an argparse parser"""
+    parser.add_argument('baseline', help="""Baseline results file""")
+    parser.add_argument('current', help="""Results file to compare""")
+    parser.add_argument(
+        '-t', '--threshold',
+        help="""Time ratio (current / baseline) regarded as a regression""",
+        type=float, default=1.2,
+    )
+
+
+def main(argv=None):
+    """
+    Compare the results
+    :param argv: optional script parameters; default is to use sys.argv
+    :return: exit code; 1 when any stage regressed
+    """
+    options = script_arguments("Compare two benchmark result files.", argv,
+                               add_arguments)
+    (base_revision, baseline) = load_results(options.baseline)
+    (revision, current) = load_results(options.current)
+    print("{} -> {}".format(base_revision, revision))
+    regressions = 0
+    for (key, stage, before, after, ratio, regressed) in compare_results(
+            baseline, current, options.threshold):
+        print("{:<60} {:<9} {:9.3f}s {:9.3f}s {:>7}{}".format(
+            key, stage, before, after,
+            '{:.2f}x'.format(ratio) if ratio is not None else '-',
+            '  REGRESSION' if regressed else ''))
+        regressions += regressed
+    for key in sorted(set(baseline) ^ set(current)):
+        print("{:<60} only in {}".format(
+            key, 'baseline' if key in baseline else 'current'))
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,216 @@
+#!/usr/bin/env python2
+
+"""
+Synthetic repository generator for the benchmarks.
+
+The history is streamed into 'git fast-import', which creates repositories
+with hundreds of thousands of commits in seconds (where committing through
+the index, as tests.helpers.gitrepo does, takes hours). The content is
+deterministic for given parameters.
+
+Usage: python -m benchmarks.generate PATH --commits 100000 --tag-every 500
+"""
+
+from __future__ import print_function
+
+import json
+import os
+import random
+import subprocess
+import sys
+
+from benchmarks.common import DEFAULT_PARAMS, add_params_arguments, \
+    params_from_arguments, params_from_dict, params_name, script_arguments
+
+AUTHORS = [("Alice Example", "alice@example.com"),
+           ("Bob Example", "bob@example.com"),
+           ("Carol Example", "carol@example.com")]
+# date of the first commit; consecutive commits are a minute apart
+START_DATE = 1500000000
+FILE_COUNT = 64
+PARAMS_FILE = 'gcg-benchmark.json'
+
+
+def vocabulary(rand, count=1024):
+    """
+    :param rand: random.Random object
+    :param count: number of words
+    :return: list of random words for the commit messages
+    """
+    return [''.join(rand.choice('abcdefghijklmnopqrstuvwxyz')
+                    for _ in range(rand.randint(2, 9)))
+            for _ in range(count)]
+
+
+def commit_message(rand, words, number, size):
+    """
+    :param rand: random.Random object
+    :param words: list of words to make the message of
+    :param number: commit number
+    :param size: approximate message size
+    :return: commit message; the headline references a bug every other
+             commit, so bug tracking filters have something to do
+    """
+    if number % 2:
+        headline = "ISSUE-{0} Change number {0}".format(number)
+    else:
+        headline = "Change number {}".format(number)
+    body = []
+    length = len(headline)
+    while length < size:
+        word = rand.choice(words)
+        body.append(word)
+        length += len(word) + 1
+    lines = [' '.join(body[x:x + 10]) for x in range(0, len(body), 10)]
+    return headline + ('\n\n' + '\n'.join(lines) if lines else '') + '\n'
+
+
+def data(payload):
+    """:return: a fast-import 'data' command with the payload"""
+    payload = payload.encode('utf-8')
+    return b'data ' + str(len(payload)).encode('ascii') + b'\n' + payload
+
+
+class StreamWriter(object):
+    """
+    Writer of the fast-import stream: commits on the mainline (with side
+    branches of params.branch_length commits for the merges) and tags
+    """
+
+    def __init__(self, out, params):
+        self.out = out
+        self.params = params
+        self.rand = random.Random(params.seed)
+        self.words = vocabulary(self.rand)
+        self.mark = 0
+        self.count = 0
+        self.tags = 0
+
+    def commit(self, ref, parents):
+        """Write a commit on top of the parents (marks); return its mark"""
+        self.mark += 1
+        self.count += 1
+        (name, email) = self.rand.choice(AUTHORS)
+        date = START_DATE + 60 * self.count
+        person = '{} <{}> {} +0000'.format(name, email, date)
+        path = 'file{:02d}.txt'.format(self.rand.randrange(FILE_COUNT))
+        self.out.write(b''.join([
+            'commit {}\nmark :{}\n'.format(ref, self.mark).encode('ascii'),
+            'author {0}\ncommitter {0}\n'.format(person).encode('utf-8'),
+            data(commit_message(self.rand, self.words, self.count,
+                                self.params.message_size)), b'\n',
+            b''.join('{} :{}\n'.format('from' if i == 0 else 'merge',
+                                       x).encode('ascii')
+                     for (i, x) in enumerate(parents)),
+            'M 644 inline {}\n'.format(path).encode('ascii'),
+            data('{}\n'.format(self.count)), b'\n',
+        ]))
+        return self.mark
+
+    def tag(self, mark):
+        """Tag the commit (mark) with the next release version"""
+        self.tags += 1
+        version = '{}.{}.0'.format(self.tags // 100 + 1, self.tags % 100)
+        if self.rand.random() < self.params.annotated_ratio:
+            tagger = '{} <{}> {} +0000'.format(
+                AUTHORS[0][0], AUTHORS[0][1], START_DATE + 60 * self.count)
+            self.out.write(b''.join([
+                'tag {}\nfrom :{}\ntagger {}\n'.format(
+                    version, mark, tagger).encode('utf-8'),
+                data('Release {}\n'.format(version)), b'\n']))
+        else:
+            self.out.write('reset refs/tags/{}\nfrom :{}\n\n'.format(
+                version, mark).encode('ascii'))
+
+    def write(self):
+        """Write the whole history"""
+        head = None
+        since_tag = 0
+        while self.count < self.params.commits:
+            parents = [head] if head is not None else []
+            if head is not None and \
+                    self.count + self.params.branch_length + 1 <= \
+                    self.params.commits and \
+                    self.rand.random() < self.params.merge_ratio:
+                side = head
+                for _ in range(self.params.branch_length):
+                    side = self.commit('refs/heads/topic', [side])
+                parents.append(side)
+            head = self.commit('refs/heads/master', parents)
+            since_tag += 1
+            if since_tag >= self.params.tag_every:
+                self.tag(head)
+                since_tag = 0
+        self.out.write(b'done\n')
+
+
+def generate_repo(path, params=DEFAULT_PARAMS):
+    """
+    Create a bare repository with synthetic history, unless the one
+    at the path was already generated with the same parameters
+    :param path: repository path
+    :param params: a RepoParams object
+    :return: path
+    :raises: ValueError when git fails
+    """
+    params_path = os.path.join(path, PARAMS_FILE)
+    if os.path.isfile(params_path):
+        with open(params_path) as pfile:
+            if params_from_dict(json.load(pfile)) == params:
+                return path
+        raise ValueError("{} was generated with different parameters".format(
+            path))
+    subprocess.check_call(['git', 'init', '--quiet', '--bare', path])
+    subprocess.check_call(['git', '--git-dir', path, 'symbolic-ref', 'HEAD',
+                           'refs/heads/master'])
+    importer = subprocess.Popen(
+        ['git', '--git-dir', path, 'fast-import', '--quiet', '--done'],
+        stdin=subprocess.PIPE)
+    try:
+        StreamWriter(importer.stdin, params).write()
+    finally:
+        importer.stdin.close()
+    if importer.wait():
+        raise ValueError("git fast-import failed with exit code {}".format(
+            importer.returncode))
+    with open(params_path, 'w') as pfile:
+        json.dump(params._asdict(), pfile)
+    return path
+
+
+def generate_repos(directory, options):
+    """
+    Create (or reuse) the repositories for the command-line parameters
+    (see add_params_arguments())
+    :param directory: directory to create the repositories in
+    :param options: command-line options
+    :return: list of tuples (RepoParams object, repository path)
+    :raises: ValueError when git fails
+    """
+    return [(x, generate_repo(os.path.join(directory, params_name(x)), x))
+            for x in params_from_arguments(options)]
+
+
+def add_arguments(parser):
+    """Add the arguments of the generator to an argparse parser"""
+    parser.add_argument(
+        'directory', help="""Directory to create the repositories in""")
+    add_params_arguments(parser)
+
+
+def main(argv=None):
+    """
+    Generate the repositories
+    :param argv: optional script parameters; default is to use sys.argv
+    :return: exit code
+    """
+    options = script_arguments(
+        "Generate synthetic repositories for the benchmarks.", argv,
+        add_arguments)
+    for (_, path) in generate_repos(options.directory, options):
+        print(path)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,179 @@
+#!/usr/bin/env python2
+
+"""
+Time the stages of a changelog run on synthetic repositories (see
+benchmarks.generate) and write the results to a JSON file, to be compared
+with the results of another revision (see benchmarks.compare).
+
+The stages are those of gcg.entrypoint.run():
+
+resolve  - opening the repository, resolving the limits, the tag index
+traverse - walking the history into releases
+headers  - release header data (tag details, dates)
+render   - rendering the template
+
+Usage: python -m benchmarks.run --commits 10000 100000 -o results.json
+"""
+
+from __future__ import print_function
+
+import collections
+import contextlib
+import json
+import os
+import platform
+import shlex
+import subprocess
+import sys
+import time
+
+from benchmarks.common import add_params_arguments, params_from_dict, \
+    params_name, script_arguments
+from benchmarks.generate import generate_repos
+from gcg.backends import open_backend
+from gcg.entrypoint import (generate_changelog, init_jinja_env, parse_args,
+                            traverse_version_tree)
+from gcg.release_headers import collate_entry_header_data
+from gcg.scope import resolve_commit_from_arguments, resolve_version_limit
+from gcg.tag_filter import TagFilter
+from gcg.tag_index import get_tag_index
+
+STAGES = ('resolve', 'traverse', 'headers', 'render')
+RESULTS_VERSION = 1
+
+
+@contextlib.contextmanager
+def timed(timings, stage):
+    """Record the wall time of the block under the stage name"""
+    start = time.time()
+    yield
+    timings[stage] = time.time() - start
+
+
+def time_stages(path, gcg_args):
+    """
+    Generate a changelog (to nowhere), timing each stage
+    :param path: repository path
+    :param gcg_args: gcg options (but the path), e.g. ['-O', 'deb', '-x']
+    :return: tuple (timings, counters); timings is an OrderedDict
+             with seconds per stage, counters a dict with the numbers
+             of releases, commits and output characters
+    """
+    options = parse_args(['-p', path] + list(gcg_args))
+    timings = collections.OrderedDict()
+    with timed(timings, 'resolve'):
+        backend = open_backend(options.backend, options.path)
+        upper_limit = resolve_commit_from_arguments(backend, options, 'until')
+        lower_limit = resolve_commit_from_arguments(backend, options, 'since')
+        tag_index = get_tag_index(backend, TagFilter(None, options.tag_prefix))
+        if options.versions is not None:
+            upper_limit = resolve_version_limit(backend, options, upper_limit)
+    with timed(timings, 'traverse'):
+        entries = traverse_version_tree(
+            backend, options, upper_limit, lower_limit, tag_index)
+    with timed(timings, 'headers'):
+        headers = collate_entry_header_data(backend, entries, options)
+    size = 0
+    with timed(timings, 'render'):
+        environment = init_jinja_env(options.template_dir)
+        for chunk in generate_changelog(entries, headers,
+                                        options.output_format[0],
+                                        environment):
+            size += len(chunk)
+    counters = {'releases': len(entries),
+                'commits': sum(len(x) for x in entries.values()),
+                'output_size': size}
+    return (timings, counters)
+
+
+def best_of(path, gcg_args, repeat):
+    """
+    Time the stages a number of times
+    :return: tuple (timings, counters); the best time of each stage
+    """
+    best = None
+    for _ in range(repeat):
+        (timings, counters) = time_stages(path, gcg_args)
+        if best is None:
+            best = timings
+        else:
+            for stage in STAGES:
+                best[stage] = min(best[stage], timings[stage])
+    best['total'] = sum(best[x] for x in STAGES)
+    return (best, counters)
+
+
+def describe_revision():
+    """:return: the gcg revision benchmarked (git describe), if known"""
+    try:
+        with open(os.devnull, 'w') as devnull:
+            return subprocess.check_output(
+                ['git', 'describe', '--always', '--dirty'],
+                cwd=os.path.dirname(os.path.abspath(__file__)),
+                stderr=devnull).decode('utf-8').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def scenario_key(scenario):
+    """:return: string identifying the scenario across result files"""
+    return '{} {}'.format(params_name(params_from_dict(scenario['params'])),
+                          ' '.join(scenario['gcg_args'])).strip()
+
+
+def add_arguments(parser):
+    """Add the arguments of the benchmark to an argparse parser"""
+    add_params_arguments(parser)
+    parser.add_argument(
+        '-d', '--directory',
+        help="""Directory of the generated repositories; they're reused
+        by subsequent runs""",
+        default='benchmark-repos',
+    )
+    parser.add_argument(
+        '-g', '--gcg-args',
+        help="""gcg options to benchmark (quoted), e.g. "-O deb -x";
+        repeat for more scenarios. Default: -O rpm""",
+        action='append',
+    )
+    parser.add_argument(
+        '-r', '--repeat',
+        help="""Runs per scenario; the best time of each stage is kept""",
+        type=int, default=3,
+    )
+    parser.add_argument(
+        '-o', '--output',
+        help="""Results file (JSON)""",
+        default='benchmark-results.json',
+    )
+
+
+def main(argv=None):
+    """
+    Run the benchmarks
+    :param argv: optional script parameters; default is to use sys.argv
+    :return: exit code
+    """
+    options = script_arguments(
+        "Time the stages of gcg on synthetic repositories.", argv,
+        add_arguments)
+    scenarios = []
+    for (params, path) in generate_repos(options.directory, options):
+        for gcg_args in options.gcg_args or ['-O rpm']:
+            gcg_args = shlex.split(gcg_args)
+            (timings, counters) = best_of(path, gcg_args, options.repeat)
+            scenario = {'params': params._asdict(), 'gcg_args': gcg_args,
+                        'timings': timings, 'counters': counters}
+            print('{}: {}'.format(scenario_key(scenario), ', '.join(
+                '{} {:.3f}s'.format(*x) for x in timings.items())))
+            scenarios.append(scenario)
+    with open(options.output, 'w') as ofile:
+        json.dump({'version': RESULTS_VERSION,
+                   'revision': describe_revision(),
+                   'python': platform.python_version(),
+                   'scenarios': scenarios}, ofile, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,26 @@
+"""
+History backends: access to the commits and tags of a repository.
+
+The 'git' backend runs git commands (through GitPython), the 'gitdb'
+backend reads the object database in-process and spawns no processes.
+"""
+
+from gcg.backends.base import HistoryBackend, Signature
+from gcg.backends.gitcli import GitCliBackend
+from gcg.backends.inprocess import InProcessBackend
+
+BACKENDS = dict((x.name, x) for x in (GitCliBackend, InProcessBackend))
+DEFAULT_BACKEND = GitCliBackend.name
+
+
+def open_backend(name, path, repo=None):
+    """
+    Open the repository with the given backend
+    :param name: backend name, one of BACKENDS
+    :param path: repository path
+    :param repo: optional; an already opened git.Repo object for the path,
+                 reused when the backend can work with it
+    :return: a HistoryBackend object
+    :raises: the errors of git.Repo() when the repository can't be opened
+    """
+    return BACKENDS[name].open(path, repo)
@@ -0,0 +1,153 @@
+#!/usr/bin/env python2
+
+"""
+Interface of the history backends
+"""
+
+import collections
+
+from gcg.history import CommitStub
+
+# who made a release and when (seconds since the epoch)
+Signature = collections.namedtuple('Signature', ['name', 'email', 'date'])
+
+
+class HistoryBackend(object):
+    """
+    Access to the history of a repository: walking the commits, listing
+    the tags and retrieving their details.
+
+    Commits are returned as gcg.history.CommitRecord objects (or stubs,
+    see gcg.history.CommitStub); tags as names and commit ids.
+    """
+    name = None
+    # True when the backend can filter commits itself (see git_filter_args())
+    native_filters = False
+
+    def __init__(self, repo):
+        """
+        :param repo: reference to the repository (git.Repo())
+        """
+        self.repo = repo
+
+    @classmethod
+    def open(cls, path, repo=None):
+        """
+        Create the backend for the repository at given path
+        :param path: repository path
+        :param repo: optional; an already opened git.Repo object
+        :return: a HistoryBackend object
+        """
+        if repo is not None:
+            return cls(repo)
+        import git
+        return cls(git.Repo(path))
+
+    @property
+    def git_dir(self):
+        """The Git directory of the repository"""
+        return self.repo.git_dir
+
+    def commit(self, rev):
+        """
+        Resolve a revision (branch, tag, sha, 'HEAD~2' etc.) to a commit
+        :param rev: revision
+        :return: a git.Commit object
+        :raises: git.BadName or ValueError when there's no such commit
+        """
+        return self.repo.commit(rev)
+
+    # pylint: disable=too-many-arguments
+    def iter_commits(self, high, low=None, exclude=None, filter_args=None,
+                     first_parent=False, date_order=False):
+        """
+        Return (yield) the commits from 'high' to 'low' (or the oldest
+        reachable commit), in reverse chronological order, like
+        'git log' lists them
+
+        :param high: top commit of the walk
+        :param low: optional; commit whose history is not walked
+        :param exclude: optional; list of other commits whose history
+                        is not walked
+        :param filter_args: optional; 'git log' options filtering the
+                            commits, for backends with native_filters.
+                            Commits filtered out are skipped, except for
+                            the tagged and the shallow ones, returned as
+                            stubs
+        :param first_parent: optional; True to follow only the first
+                             parent of the commits (git log --first-parent)
+        :param date_order: optional; True to return no parent before all
+                           its children (git log --date-order)
+        :return: a CommitRecord (or CommitStub) object
+        :raises: ValueError when the history can't be read
+        """
+        raise NotImplementedError
+
+    def iter_commit_ids(self, high, low=None, exclude=None,
+                        first_parent=False):
+        """
+        Same walk as iter_commits(), but only the commit ids and dates
+        are retrieved
+        :return: (yield) a CommitStub object
+        :raises: ValueError when the history can't be read
+        """
+        for commit in self.iter_commits(high, low, exclude,
+                                        first_parent=first_parent):
+            yield CommitStub(commit.hexsha, commit.committed_date)
+
+    def commit_records(self, hexshas):
+        """
+        Retrieve the given commits, without walking the history
+        :param hexshas: list of commit ids
+        :return: (yield) a CommitRecord object per commit id, in the same
+                 order
+        :raises: ValueError when the commits can't be read
+        """
+        raise NotImplementedError
+
+    def tag_refs(self, patterns, merged=None):
+        """
+        List the tags, as 'git for-each-ref' does
+        :param patterns: list of ref patterns (e.g. 'refs/tags/[0-9]*')
+        :param merged: optional; revision the tags must be reachable from
+        :return: list of tuples (commit id, tag name), sorted by name;
+                 annotated tags are peeled to the object they point at
+        """
+        raise NotImplementedError
+
+    def tag_details(self, name):
+        """
+        :param name: tag name
+        :return: the tag object (git.TagObject) with the tagger and date;
+                 None for lightweight tags
+        """
+        return self.repo.tags[name].tag
+
+    def tag_signatures(self, patterns):
+        """
+        Retrieve who made the tags, and when, for many tags at once:
+        the tagger of annotated tags, the author of the tagged commit
+        for lightweight tags
+        :param patterns: list of ref patterns (e.g. 'refs/tags/')
+        :return: dictionary; k: tag name, v: Signature object, or None
+                 when it's not available (e.g. tags without a tagger)
+        """
+        raise NotImplementedError
+
+    def is_ancestor(self, ancestor, descendant):
+        """
+        :param ancestor: commit id
+        :param descendant: commit id
+        :return: True when 'ancestor' is reachable from 'descendant'
+        """
+        raise NotImplementedError
+
+    # pylint: disable=unused-argument
+    def supports_perl_regexp(self, revision, pattern):
+        """
+        :param revision: a revision to probe the backend with
+        :param pattern: the regular expression to be used
+        :return: True when native filters can use the pattern as a Perl
+                 regular expression
+        """
+        return False
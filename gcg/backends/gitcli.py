@@ -0,0 +1,142 @@
+#!/usr/bin/env python2
+
+"""
+History backend running git commands
+"""
+
+import logging
+
+from gcg.backends.base import HistoryBackend, Signature
+from gcg.clones import shallow_commits
+from gcg.history import iter_commit_records, iter_commit_stubs, \
+    iter_filtered_commits, iter_listed_commits
+
+# tagger of annotated tags, author of commits (lightweight tags)
+SIGNATURE_FORMAT = '%00'.join([
+    '%(refname)', '%(objecttype)',
+    '%(taggername)', '%(taggeremail)', '%(taggerdate:unix)',
+    '%(authorname)', '%(authoremail)', '%(authordate:unix)'])
+
+
+class GitCliBackend(HistoryBackend):
+    """
+    Backend streaming the history out of 'git log' (see gcg.history)
+    and listing the tags with 'git for-each-ref'
+    """
+    name = 'git'
+    native_filters = True
+
+    def __init__(self, repo):
+        super(GitCliBackend, self).__init__(repo)
+        self.client = repo.git
+
+    # pylint: disable=too-many-arguments
+    def iter_commits(self, high, low=None, exclude=None, filter_args=None,
+                     first_parent=False, date_order=False):
+        refs = high if low is None else "{}..{}".format(low, high)
+        excluded = walk_args(exclude, first_parent, date_order)
+        if filter_args:
+            return iter_filtered_commits(
+                self.client, str(refs), filter_args,
+                self.walk_marks(high, [low] + list(exclude or [])),
+                *excluded)
+        return iter_commit_records(self.client, str(refs), *excluded)
+
+    def iter_commit_ids(self, high, low=None, exclude=None,
+                        first_parent=False):
+        refs = high if low is None else "{}..{}".format(low, high)
+        return iter_commit_stubs(self.client, str(refs),
+                                 *walk_args(exclude, first_parent))
+
+    def commit_records(self, hexshas):
+        return iter_listed_commits(self.client, hexshas)
+
+    def walk_marks(self, high, bottoms):
+        """
+        The commits a filtered walk keeps the position of: the tagged
+        commits (release boundaries) and the shallow ones (where the
+        history is truncated) in the range
+        :param high: top commit of the walk
+        :param bottoms: commits whose history is not walked; None is ignored
+        :return: set of commit ids
+        """
+        bottoms = [x for x in bottoms if x is not None]
+        args = ['--format=%(objectname) %(*objectname)',
+                '--merged={}'.format(high)]
+        args.extend('--no-merged={}'.format(x) for x in bottoms)
+        (status, output, errors) = self.client.for_each_ref(
+            *(args + ['refs/tags/']), with_extended_output=True,
+            with_exceptions=False)
+        if status:
+            raise ValueError(errors)
+        retval = set()
+        for line in output.splitlines():
+            (objectname, peeled) = line.split(' ', 1)
+            retval.add(peeled or objectname)
+        for hexsha in shallow_commits(self.repo):
+            if self.is_ancestor(hexsha, str(high)) and not any(
+                    self.is_ancestor(hexsha, str(x)) for x in bottoms):
+                retval.add(hexsha)
+        return retval
+
+    def tag_refs(self, patterns, merged=None):
+        args = ['--format=%(objectname) %(*objectname) %(refname)']
+        if merged is not None:
+            args.append('--merged={}'.format(merged))
+        (status, output, errors) = self.client.for_each_ref(
+            *(args + list(patterns)), with_extended_output=True,
+            with_exceptions=False)
+        if status:
+            logging.error(errors)
+            return []
+        retval = []
+        for line in output.splitlines():
+            (objectname, peeled, refname) = line.split(' ', 2)
+            retval.append((peeled or objectname,
+                           refname[len('refs/tags/'):]))
+        return retval
+
+    def tag_signatures(self, patterns):
+        (status, output, errors) = self.client.for_each_ref(
+            '--format=' + SIGNATURE_FORMAT, *patterns,
+            with_extended_output=True, with_exceptions=False)
+        if status:
+            logging.error(errors)
+            return {}
+        retval = {}
+        for line in output.splitlines():
+            fields = line.split('\0')
+            (name, email, date) = fields[5:] if fields[1] == 'commit' \
+                else fields[2:5]
+            retval[fields[0][len('refs/tags/'):]] = Signature(
+                name, email.strip('<>'), int(date)) if date else None
+        return retval
+
+    def is_ancestor(self, ancestor, descendant):
+        (status, _, _) = self.client.merge_base(
+            '--is-ancestor', ancestor, descendant, with_extended_output=True,
+            with_exceptions=False)
+        return not status
+
+    def supports_perl_regexp(self, revision, pattern):
+        # fails when git has no PCRE support or PCRE rejects the pattern
+        (status, _, _) = self.client.rev_list(
+            '--max-count=1', '--perl-regexp', '--grep=' + pattern, revision,
+            with_extended_output=True, with_exceptions=False)
+        return not status
+
+
+def walk_args(exclude=None, first_parent=False, date_order=False):
+    """
+    :param exclude: optional; list of commits whose history is not walked
+    :param first_parent: optional; True to follow the first parents only
+    :param date_order: optional; True to list no parent before all its
+                       children
+    :return: list of 'git log' arguments
+    """
+    retval = ['^{}'.format(x) for x in exclude or []]
+    if first_parent:
+        retval.append('--first-parent')
+    if date_order:
+        retval.append('--date-order')
+    return retval
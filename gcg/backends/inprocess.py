@@ -0,0 +1,300 @@
+#!/usr/bin/env python2
+
+"""
+History backend reading the Git object database in-process (GitDB),
+without spawning any git processes
+"""
+
+import binascii
+import collections
+import fnmatch
+import heapq
+import itertools
+import re
+import warnings
+
+from gcg.backends.base import HistoryBackend, Signature
+from gcg.clones import shallow_commits
+from gcg.history import Author, CommitRecord
+
+# states of the commits seen by the walk
+QUEUED = 0
+HIDDEN = 1
+DONE = 2
+
+
+class InProcessBackend(HistoryBackend):
+    """
+    Backend walking the history with GitPython objects backed by GitDB,
+    a pure-Python reader of loose and packed objects. References are read
+    from the files of the Git directory.
+
+    The walk follows the order of 'git log': commits are taken by
+    committer date, ties in the order they were reached. Like git, it
+    treats the shallow commits of a shallow clone as having no parents.
+    Walks of a range (with commits to hide, e.g. 'low') are held back
+    in memory until the hidden commits are walked through (see
+    visible_commits()); that's typically the whole range. So are walks
+    in the --date-order (see date_ordered()).
+    """
+    name = 'gitdb'
+
+    @classmethod
+    def open(cls, path, repo=None):
+        import git
+        if repo is not None and isinstance(repo.odb, git.GitDB):
+            return cls(repo)
+        with warnings.catch_warnings():
+            # GitPython discourages GitDB in favour of 'git cat-file'
+            # processes, which is exactly what's to be avoided here
+            warnings.simplefilter('ignore', DeprecationWarning)
+            return cls(git.Repo(path, odbt=git.GitDB))
+
+    # pylint: disable=too-many-arguments
+    def iter_commits(self, high, low=None, exclude=None, filter_args=None,
+                     first_parent=False, date_order=False):
+        hidden_revs = ([low] if low is not None else []) + list(exclude or [])
+        shallow = self.shallow()
+        walk = CommitWalk(shallow, first_parent)
+        for rev in hidden_revs:
+            walk.push(self.commit(rev), True)
+        walk.push(self.commit(high), False)
+        commits = visible_commits(walk)
+        if date_order:
+            commits = date_ordered(list(commits), walk.parents)
+        return (commit_record(x, shallow) for x in commits)
+
+    def commit_records(self, hexshas):
+        shallow = self.shallow()
+        for hexsha in hexshas:
+            yield commit_record(self.commit(hexsha), shallow)
+
+    def shallow(self):
+        """
+        :return: set of binary ids of the shallow commits (see gcg.clones)
+        """
+        return set(binascii.unhexlify(x)
+                   for x in shallow_commits(self.repo))
+
+    def tag_refs(self, patterns, merged=None):
+        reachable = None
+        if merged is not None:
+            reachable = self.ancestors(self.commit(merged))
+        retval = []
+        for ref in self.repo.tags:
+            if not any(ref_matches(ref.path, x) for x in patterns):
+                continue
+            target = ref.object
+            if target.type == 'tag':
+                target = target.object
+            if reachable is not None and target.binsha not in reachable:
+                continue
+            retval.append((target.hexsha, ref.name))
+        return sorted(retval, key=lambda x: x[1])
+
+    def tag_signatures(self, patterns):
+        retval = {}
+        for ref in self.repo.tags:
+            if not any(ref_matches(ref.path, x) for x in patterns):
+                continue
+            target = ref.object
+            retval[ref.name] = None
+            if target.type == 'commit':
+                retval[ref.name] = Signature(
+                    target.author.name, target.author.email,
+                    target.authored_date)
+            elif target.type == 'tag' and target.tagger is not None:
+                retval[ref.name] = Signature(
+                    target.tagger.name, target.tagger.email,
+                    target.tagged_date)
+        return retval
+
+    def is_ancestor(self, ancestor, descendant):
+        binsha = self.commit(ancestor).binsha
+        return any(x.binsha == binsha for x in walk_ancestors(
+            self.commit(descendant), self.shallow()))
+
+    def ancestors(self, commit):
+        """
+        :param commit: a git.Commit object
+        :return: set of binary ids of the commit and all its ancestors
+        """
+        return set(x.binsha
+                   for x in walk_ancestors(commit, self.shallow()))
+
+
+class CommitWalk(object):
+    """
+    Walk of the history by committer date; commits reachable from the
+    hidden ones are not returned. The walk is over when there's nothing
+    else to return and the hidden commits left are older than all the
+    walked ones.
+    """
+
+    def __init__(self, shallow=(), first_parent=False):
+        """
+        :param shallow: binary ids of the commits whose parents are
+                        not walked (see InProcessBackend.shallow())
+        :param first_parent: True to walk from the commits returned to
+                             their first parents only; like in git,
+                             the hidden ones still hide all their parents
+        """
+        self.shallow = shallow
+        self.first_parent = first_parent
+        self.states = {}
+        self.queue = []
+        self.order = itertools.count()
+        # number of commits in the queue, by state
+        self.queued = {QUEUED: 0, HIDDEN: 0}
+        self.oldest = None
+
+    def push(self, commit, hidden):
+        """Queue the commit, or hide it (and its ancestors) if it's known"""
+        stack = [commit]
+        while stack:
+            commit = stack.pop()
+            state = self.states.get(commit.binsha)
+            if state is None:
+                self.states[commit.binsha] = HIDDEN if hidden else QUEUED
+                self.queued[self.states[commit.binsha]] += 1
+                heapq.heappush(self.queue, (-commit.committed_date,
+                                            next(self.order), commit))
+            elif hidden and state != HIDDEN:
+                self.states[commit.binsha] = HIDDEN
+                if state == QUEUED:
+                    self.queued[QUEUED] -= 1
+                    self.queued[HIDDEN] += 1
+                else:
+                    # already walked; its parents are known as well
+                    stack.extend(self.parents(commit))
+
+    def parents(self, commit):
+        """Parents of the commit, none for the shallow commits"""
+        return () if commit.binsha in self.shallow else commit.parents
+
+    def hidden(self, commit):
+        """True when the commit turned out to be reachable from a hidden one"""
+        return self.states[commit.binsha] == HIDDEN
+
+    def __iter__(self):
+        while self.queue:
+            if not self.queued[QUEUED] and (
+                    self.oldest is None or -self.queue[0][0] < self.oldest):
+                # the hidden commits left can't reach any walked one
+                break
+            (_, _, commit) = heapq.heappop(self.queue)
+            hidden = self.hidden(commit)
+            self.queued[self.states[commit.binsha]] -= 1
+            if not hidden:
+                self.states[commit.binsha] = DONE
+                self.oldest = commit.committed_date
+                yield commit
+            parents = self.parents(commit)
+            if self.first_parent and not hidden:
+                parents = parents[:1]
+            for parent in parents:
+                self.push(parent, hidden)
+
+
+def visible_commits(walk):
+    """
+    Return (yield) the commits of the walk which are not reachable from
+    the hidden ones. Like in git, a commit taken early may still turn out
+    to be reachable from a hidden one, so the commits are held back while
+    there are hidden commits in the queue; once there are none left,
+    the rest of the walk is streamed.
+    :param walk: a CommitWalk object
+    :return: git.Commit objects
+    """
+    held = []
+    for commit in walk:
+        held.append(commit)
+        if not walk.queued[HIDDEN]:
+            for item in held:
+                if not walk.hidden(item):
+                    yield item
+            held = []
+    for item in held:
+        if not walk.hidden(item):
+            yield item
+
+
+def date_ordered(commits, parents):
+    """
+    Order the commits like 'git log --date-order' does: by committer
+    date, ties in the order of the walk, but no parent before all its
+    children (which may be out of order, e.g. with a clock skew)
+    :param commits: list of git.Commit objects, in the walk order
+    :param parents: function returning the parents of a commit
+                    (see CommitWalk.parents())
+    :return: (yield) git.Commit objects
+    """
+    children = collections.Counter(
+        x.binsha for commit in commits for x in parents(commit))
+    positions = dict((x.binsha, index) for (index, x) in enumerate(commits))
+    queue = [(-x.committed_date, index, x)
+             for (index, x) in enumerate(commits) if not children[x.binsha]]
+    heapq.heapify(queue)
+    while queue:
+        (_, _, commit) = heapq.heappop(queue)
+        yield commit
+        for parent in parents(commit):
+            index = positions.get(parent.binsha)
+            if index is None:
+                continue
+            children[parent.binsha] -= 1
+            if not children[parent.binsha]:
+                heapq.heappush(queue, (-commits[index].committed_date,
+                                       index, commits[index]))
+
+
+def walk_ancestors(commit, shallow=()):
+    """
+    Return (yield) the commit and all its ancestors, in no specific order
+    :param commit: a git.Commit object
+    :param shallow: optional; binary ids of the commits whose parents are
+                    not walked
+    :return: git.Commit objects
+    """
+    seen = set([commit.binsha])
+    stack = [commit]
+    while stack:
+        commit = stack.pop()
+        yield commit
+        if commit.binsha in shallow:
+            continue
+        for parent in commit.parents:
+            if parent.binsha not in seen:
+                seen.add(parent.binsha)
+                stack.append(parent)
+
+
+def commit_record(commit, shallow=()):
+    """
+    :param commit: a git.Commit object
+    :param shallow: optional; binary ids of the commits to be recorded
+                    with no parents
+    :return: a CommitRecord object with the same data
+    """
+    message = commit.message
+    if isinstance(message, bytes):
+        # GitPython leaves messages it's unable to decode as they are
+        message = message.decode('utf-8', 'replace')
+    parents = () if commit.binsha in shallow else commit.parents
+    return CommitRecord(
+        commit.hexsha, tuple(x.hexsha for x in parents),
+        Author(commit.author.name, commit.author.email),
+        commit.authored_date, commit.committed_date, message)
+
+
+def ref_matches(refname, pattern):
+    """
+    Match the ref name as 'git for-each-ref' does: literally (the whole
+    name or up to a slash) or as an fnmatch pattern
+    :param refname: full ref name, e.g. 'refs/tags/1.0.0'
+    :param pattern: ref pattern; special characters escaped with '\\'
+    :return: True or False
+    """
+    if refname == pattern or refname.startswith(pattern.rstrip('/') + '/'):
+        return True
+    return fnmatch.fnmatchcase(refname, re.sub(r'\\(.)', r'[\1]', pattern))
@@ -0,0 +1,230 @@
+#!/usr/bin/env python2
+
+"""
+Batch mode: generate many changelogs, as listed in a manifest file,
+in a single invocation.
+
+Jobs are spread over a pool of worker processes, in chunks of jobs
+targeting the same repository where possible. Each worker opens
+a repository once and creates a Jinja environment once (per template
+directory), for all the jobs it runs.
+"""
+
+from __future__ import print_function
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import sys
+
+import git
+
+import gcg.entrypoint
+import gcg.errors as err
+
+# per-process state of a worker, reused between jobs
+_REPOSITORIES = {}
+_ENVIRONMENTS = {}
+# chunks of jobs handed to a worker at once, per worker (see main())
+CHUNKS_PER_WORKER = 4
+
+
+def parse_args(argv):
+    """Parse user's command-line parameters
+
+    :param argv: User arguments
+    :returns: object with configuration (as provided by argparse)
+    """
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+        description="Generate many changelogs, as listed in a manifest.",
+        epilog="""
+        The manifest is a JSON (or YAML, if PyYAML is available) document:
+        a list of jobs, or an object with such list under the 'jobs' key.
+        A job is an object with gcg options as keys, spelled as the long
+        option names with underscores (e.g. output_format, deb_distribution)
+        and an optional 'name'. The output_file is mandatory. Relative paths
+        are relative to the manifest location.
+        """
+    )
+    parser.add_argument(
+        'manifest',
+        help="""Path of the manifest file""",
+        type=str, action="store",
+    )
+    parser.add_argument(
+        '-j', '--jobs',
+        help="""Number of worker processes""",
+        type=int, action="store",
+        default=multiprocessing.cpu_count(),
+    )
+    parser.add_argument(
+        '-v', '--verbose',
+        help="Verbosity level. Specify twice for debug logs as well.",
+        action="count", default=0
+    )
+    return parser.parse_args(argv)
+
+
+def read_document(path):
+    """
+    Read a JSON (or YAML) document
+    :param path: file path; YAML is expected for .yml and .yaml files
+    :return: the document content
+    :raises: ValueError when the file cannot be read or parsed
+    """
+    try:
+        with open(path) as mfile:
+            if path.endswith(('.yml', '.yaml')):
+                try:
+                    import yaml
+                except ImportError:
+                    raise ValueError("PyYAML is needed for YAML manifests")
+                data = yaml.safe_load(mfile)
+            else:
+                data = json.load(mfile)
+    except (IOError, OSError) as exc:
+        raise ValueError(exc)
+    return data
+
+
+def load_manifest(path):
+    """
+    Load the list of jobs from the manifest file
+    :param path: manifest file path
+    :return: list of dictionaries (one per job)
+    :raises: ValueError when the manifest cannot be loaded or is malformed
+    """
+    data = read_document(path)
+    jobs = data.get('jobs') if isinstance(data, dict) else data
+    if not isinstance(jobs, list) or \
+            not all(isinstance(x, dict) for x in jobs):
+        raise ValueError("the manifest should contain a list of jobs")
+    for job in jobs:
+        if 'output_file' not in job:
+            raise ValueError("job {} has no output_file".format(
+                job.get('name', jobs.index(job))))
+    return jobs
+
+
+def job_arguments(job, basedir):
+    """
+    Translate the job description into gcg command-line arguments
+    :param job: dictionary; job description from the manifest
+    :param basedir: directory relative paths are resolved against
+    :return: list of strings
+    """
+    retval = []
+    for (key, value) in sorted(job.items()):
+        if key == 'name' or value is None or value is False:
+            continue
+        flag = '--' + key.replace('_', '-')
+        if value is True:
+            retval.append(flag)
+            continue
+        for item in value if isinstance(value, list) else [value]:
+            if key in ('path', 'output_file', 'template_dir', 'stats',
+                       'profile_out'):
+                item = os.path.join(basedir, item)
+            retval.extend([flag, str(item)])
+    if 'path' not in job:
+        retval.extend(['--path', basedir])
+    return retval
+
+
+def run_job(argv):
+    """
+    Run a single job, reusing the state of the worker process
+    :param argv: gcg command-line arguments
+    :return: exit code (see gcg.errors)
+    """
+    try:
+        options = gcg.entrypoint.parse_args(argv)
+    except ValueError as exc:
+        logging.error("Invalid input; details: %s", exc)
+        return err.INVALID_INPUT
+    except SystemExit:
+        return err.ARGPARSE_FAILURE
+
+    repo = _REPOSITORIES.get(options.path)
+    if repo is None:
+        try:
+            repo = git.Repo(options.path)
+            _REPOSITORIES[options.path] = repo
+        except (ValueError, OSError, git.InvalidGitRepositoryError):
+            # let run() report it the usual way
+            repo = None
+    environment = _ENVIRONMENTS.get(options.template_dir)
+    if environment is None:
+        environment = gcg.entrypoint.init_jinja_env(options.template_dir)
+        _ENVIRONMENTS[options.template_dir] = environment
+    return gcg.entrypoint.run(options, repo, environment)
+
+
+def run_listed_job(job):
+    """
+    Run a job of the manifest, reporting any failure as its exit code
+    :param job: tuple (index, name, command-line arguments)
+    :return: tuple (index, name, exit code)
+    """
+    (index, name, argv) = job
+    logging.info("Running job %s", name)
+    try:
+        status = run_job(argv)
+    # pylint: disable=broad-except
+    except Exception:
+        logging.exception("Job %s failed", name)
+        status = err.UNHANDLED_EXCEPTION
+    return (index, name, status)
+
+
+def main(argv=None):
+    """
+    Main entry point of the batch mode
+    :param argv: optional script parameters; default is to use sys.argv
+    :return: exit code; SUCCESS when all jobs succeeded
+    """
+    if argv is None:
+        argv = sys.argv
+    options = parse_args(argv[1:])
+    logging.basicConfig(
+        level=gcg.entrypoint.log_level_from_verbosity(options.verbose),
+        format="[%(levelname)s] %(message)s")
+
+    try:
+        jobs = load_manifest(options.manifest)
+    except ValueError as exc:
+        logging.error("Invalid manifest %s; details: %s",
+                      options.manifest, exc)
+        return err.INVALID_INPUT
+
+    basedir = os.path.dirname(os.path.abspath(options.manifest))
+    # jobs of the same repository are next to each other, so a chunk
+    # mostly reuses the repository its worker has opened
+    listed = sorted(
+        (os.path.realpath(os.path.join(basedir, job.get('path', ''))),
+         index, job.get('name', str(index)), job_arguments(job, basedir))
+        for (index, job) in enumerate(jobs))
+    listed = [x[1:] for x in listed]
+
+    workers = max(1, min(options.jobs, len(listed)))
+    if workers == 1:
+        results = [run_listed_job(x) for x in listed]
+    else:
+        pool = multiprocessing.Pool(workers)
+        try:
+            results = list(pool.imap_unordered(
+                run_listed_job, listed,
+                max(1, len(listed) // (workers * CHUNKS_PER_WORKER))))
+        finally:
+            pool.close()
+            pool.join()
+
+    retval = err.SUCCESS
+    for (_, name, status) in sorted(results):
+        print("{}: {}".format(name, status))
+        if status != err.SUCCESS:
+            retval = err.BATCH_JOBS_FAILED
+    return retval
@@ -0,0 +1,135 @@
+#!/usr/bin/env python2
+
+"""
+Persistent cache of the release -> commits segmentation produced by
+the version tree traversal.
+
+The cache lives in the Git directory of the repository (gcg-cache).
+There is one file per set of traversal-affecting options; it records
+the top commit it was built for, so a later run can reuse it and walk
+only the commits added on top of it.
+"""
+
+import collections
+import hashlib
+import json
+import logging
+import os
+import tempfile
+
+from gcg.commit_store import CommitStore
+
+CACHE_DIR = 'gcg-cache'
+CACHE_FORMAT = 1
+# command-line options which affect the outcome of the traversal
+TRAVERSAL_OPTIONS = ('exclude_merges', 'bug_tracking_only',
+                     'bug_tracking_pattern', 'custom_tag_pattern',
+                     'tag_prefix', 'first_parent', 'expand_merges')
+
+
+class CachedHistory(object):
+    """
+    Outcome of a previous traversal, as loaded from the cache
+    """
+
+    def __init__(self, tip, entries, tag_index, max_date):
+        """
+        :param tip: hexsha of the top commit the traversal started from
+        :param entries: an OrderedDict; k: tag name, v: CommitStore
+        :param tag_index: tag index (k: hexsha, v: list of tags) which
+                          was in effect at the time
+        :param max_date: most recent committer timestamp in the history
+        """
+        self.tip = tip
+        self.entries = entries
+        self.tag_index = tag_index
+        self.max_date = max_date
+
+    def changed_tags(self, tag_index):
+        """
+        Compare the cached tag index with the current one
+        :param tag_index: current tag index
+        :return: list of commits (hexsha) whose tags are different
+        """
+        return [x for x in set(self.tag_index) | set(tag_index)
+                if self.tag_index.get(x) != tag_index.get(x)]
+
+    def replay(self):
+        """
+        Return (yield) the cached history in the form of traversal events
+        (see traverse_version_tree): a release boundary event for each
+        release, followed by its (already filtered) commits
+        :return: tuple (tags, commit, kept)
+        """
+        for (version, commits) in self.entries.items():
+            yield ([version] if version else None, None, False)
+            for commit in commits:
+                yield (None, commit, True)
+
+
+class ChangelogCache(object):
+    """
+    Access to the cache file matching given repository and options
+    """
+
+    def __init__(self, backend, options, lower_limit):
+        """
+        :param backend: history backend of the repository (gcg.backends)
+        :param options: command-line options as specified by the user
+        :param lower_limit: the bottom commit of the traversal (or None)
+        """
+        key = dict((x, getattr(options, x, None)) for x in TRAVERSAL_OPTIONS)
+        key['since'] = lower_limit.hexsha if lower_limit else None
+        key['format'] = CACHE_FORMAT
+        digest = hashlib.sha1(
+            json.dumps(key, sort_keys=True).encode('utf-8')).hexdigest()
+        self.path = os.path.join(backend.git_dir, CACHE_DIR,
+                                 digest + '.json')
+
+    def load(self):
+        """
+        Load the cached history
+        :return: a CachedHistory object or None when there's no usable cache
+        """
+        if not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path) as cfile:
+                data = json.load(cfile)
+            if data['format'] != CACHE_FORMAT:
+                return None
+            entries = collections.OrderedDict(
+                (version, CommitStore.from_columns(columns))
+                for (version, columns) in data['entries'])
+            return CachedHistory(data['tip'], entries, data['tags'],
+                                 data['max_date'])
+        except (IOError, ValueError, KeyError, TypeError) as exc:
+            logging.warning("Ignoring unreadable cache %s: %s", self.path, exc)
+            return None
+
+    def save(self, history):
+        """
+        Store the history in the cache; the file is replaced atomically
+        :param history: a CachedHistory object
+        :return: n/a
+        """
+        data = {
+            'format': CACHE_FORMAT,
+            'tip': history.tip,
+            'tags': history.tag_index,
+            'max_date': history.max_date,
+            'entries': [(version, commits.to_columns())
+                        for (version, commits) in history.entries.items()],
+        }
+        dirname = os.path.dirname(self.path)
+        try:
+            if not os.path.isdir(dirname):
+                os.makedirs(dirname)
+            (handle, tmp_path) = tempfile.mkstemp(dir=dirname)
+            with os.fdopen(handle, 'w') as cfile:
+                json.dump(data, cfile)
+            os.rename(tmp_path, self.path)
+        except (IOError, OSError) as exc:
+            logging.warning("Unable to write cache %s: %s", self.path, exc)
+        else:
+            logging.info("Changelog cache updated: %s", self.path)
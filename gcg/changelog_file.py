@@ -0,0 +1,108 @@
+#!/usr/bin/env python2
+
+"""
+Handling of existing changelog files, for the sake of updating
+them in place rather than regenerating from scratch
+"""
+
+import contextlib
+import logging
+import os
+import re
+import shutil
+import tempfile
+
+# release header lines of the built-in templates
+HEADER_PATTERNS = {
+    'rpm': re.compile(br'^\* .* - (?P<version>\S+)\s*$'),
+    'deb': re.compile(br'^\S+ \((?P<version>[^)\s]+)\) .*;'),
+}
+COPY_BUFFER_SIZE = 1024 * 1024
+
+
+def find_newest_release(path, output_format, known_versions):
+    """
+    Find the most recent release header of an existing changelog which
+    refers to a known release. Headers above it (e.g. for the untagged,
+    current version) are considered stale.
+
+    :param path: changelog file path
+    :param output_format: format of the changelog, e.g. 'rpm' or 'deb'
+    :param known_versions: dictionary; k: version as present in the
+                           changelog, v: the tag name
+    :return: tuple (tag name, offset of the header line in the file);
+             (None, None) when there's no such header or no file
+    :raises: ValueError when the format is not supported
+    """
+    if output_format not in HEADER_PATTERNS:
+        raise ValueError("updating '{}' changelogs is not supported".format(
+            output_format))
+    pattern = HEADER_PATTERNS[output_format]
+    if not os.path.exists(path):
+        return (None, None)
+
+    offset = 0
+    with open(path, 'rb') as cfile:
+        for line in cfile:
+            mobj = pattern.match(line)
+            if mobj:
+                version = mobj.group('version').decode('utf-8', 'replace')
+                if version in known_versions:
+                    return (known_versions[version], offset)
+                logging.info("Release %s of %s will be regenerated",
+                             version, path)
+            offset += len(line)
+    return (None, None)
+
+
+def prepend_to_file(path, offset, chunks):
+    """
+    Replace the beginning (up to the offset) of the file with new content.
+    The rest of the file is copied over as is, in large chunks; the file
+    is replaced atomically.
+
+    :param path: file path
+    :param offset: offset of the first byte of the file to be kept
+    :param chunks: new content; iterable of strings
+    :return: n/a
+    """
+    with replaced_file(path, 'wb') as ofile:
+        for chunk in chunks:
+            ofile.write(chunk.encode('utf-8'))
+        with open(path, 'rb') as ifile:
+            ifile.seek(offset)
+            shutil.copyfileobj(ifile, ofile, COPY_BUFFER_SIZE)
+
+
+@contextlib.contextmanager
+def replaced_file(path, mode='w'):
+    """
+    Write the file anew through a temporary file in the same directory,
+    which replaces the file once the block is over. If the block fails,
+    the file is left as it was. Files which can't be replaced (e.g. pipes
+    or devices) are written directly.
+
+    :param path: file path
+    :param mode: 'w' (text) or 'wb' (binary)
+    :return: (context manager) file object to write to
+    """
+    path = os.path.realpath(path)
+    if os.path.exists(path) and not os.path.isfile(path):
+        with open(path, mode) as ofile:
+            yield ofile
+        return
+    (handle, tmp_path) = tempfile.mkstemp(dir=os.path.dirname(path))
+    try:
+        with os.fdopen(handle, mode) as ofile:
+            yield ofile
+        if os.path.exists(path):
+            shutil.copymode(path, tmp_path)
+        else:
+            # the mode open() would create the file with
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(tmp_path, 0o666 & ~umask)
+        os.rename(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
@@ -0,0 +1,113 @@
+#!/usr/bin/env python2
+
+"""
+Support for shallow and partial clones: detection and keeping git off
+the network.
+
+The history of a shallow clone ends at the shallow commits (listed in
+the 'shallow' file of the Git directory), whose parents are not in the
+clone; walks stop there, so the oldest release walked is likely
+incomplete and older ones are missing. Partial clones (e.g. made with
+--filter=blob:none) leave out objects git fetches from the promisor
+remote on first access. gcg needs the commits and the tags only, which
+such clones have; git is kept from fetching anything, so a stray access
+fails instead of making a network round-trip.
+"""
+
+import logging
+import os
+
+SHALLOW_FILE = 'shallow'
+# GIT_NO_LAZY_FETCH is recognized by recent git versions only; older
+# versions are denied all the transports instead
+NO_FETCH_ENVIRONMENT = {'GIT_NO_LAZY_FETCH': '1', 'GIT_ALLOW_PROTOCOL': 'none'}
+
+
+class CloneStatus(object):
+    """
+    Completeness of the clone of a repository
+    """
+
+    def __init__(self, shallow=(), promisors=()):
+        """
+        :param shallow: ids of the shallow commits
+        :param promisors: names of the promisor remotes
+        """
+        self.shallow = frozenset(shallow)
+        self.promisors = list(promisors)
+
+    def __str__(self):
+        retval = []
+        if self.shallow:
+            retval.append('shallow ({} boundary commit(s))'.format(
+                len(self.shallow)))
+        if self.promisors:
+            retval.append('partial (promisor remote(s): {})'.format(
+                ', '.join(self.promisors)))
+        return ', '.join(retval) or 'complete'
+
+
+def shallow_commits(repo):
+    """
+    :param repo: reference to the repository (git.Repo())
+    :return: set of ids of the shallow commits; empty unless the
+             repository is a shallow clone
+    """
+    common_dir = getattr(repo, 'common_dir', None) or repo.git_dir
+    try:
+        with open(os.path.join(common_dir, SHALLOW_FILE)) as sfile:
+            return set(x.strip() for x in sfile if x.strip())
+    except (IOError, OSError):
+        return set()
+
+
+def promisor_remotes(repo):
+    """
+    :param repo: reference to the repository (git.Repo())
+    :return: sorted list of names of the remotes missing objects are
+             fetched from; empty unless the repository is a partial clone
+    """
+    config = repo.config_reader()
+    retval = set()
+    for section in config.sections():
+        if section.startswith('remote "') and \
+                config.get_value(section, 'promisor', False) is True:
+            retval.add(section[len('remote "'):-1])
+    # set up by git versions older than 2.29 (remote.*.promisor is newer)
+    partial_clone = config.get_value('extensions', 'partialClone', None) \
+        if config.has_section('extensions') else None
+    if partial_clone:
+        retval.add(str(partial_clone))
+    return sorted(retval)
+
+
+def prepare_clone(repo, client):
+    """
+    Check how complete the clone of the repository is and keep git
+    from fetching missing objects
+    :param repo: reference to the repository (git.Repo())
+    :param client: an initialized git.Git() object
+    :return: a CloneStatus object
+    """
+    client.update_environment(**NO_FETCH_ENVIRONMENT)
+    status = CloneStatus(shallow_commits(repo), promisor_remotes(repo))
+    logging.info("Clone: %s", status)
+    return status
+
+
+def report_truncation(hexsha, version=None):
+    """
+    Warn the history walked ends at a shallow commit
+    :param hexsha: id of the shallow commit
+    :param version: optional; tag name of the release of the commit
+                    (empty for the current version)
+    """
+    if version is None:
+        release = "the oldest release walked"
+    elif version:
+        release = "release " + version
+    else:
+        release = "the current version"
+    logging.warning("History is truncated at %s (shallow clone): %s may be "
+                    "incomplete and older releases are missing", hexsha,
+                    release)
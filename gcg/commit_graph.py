@@ -0,0 +1,188 @@
+#!/usr/bin/env python2
+
+"""
+Support for git's commit-graph file: detection (including changed-path
+Bloom filters) and, on request, writing it for the repository.
+
+The commit-graph speeds up the history walks git does for gcg; with the
+changed-path Bloom filters, walks limited to some paths skip computing
+most of the tree differences. Only the monorepo walks are limited
+to paths; the changelog of a whole repository doesn't use the filters.
+"""
+
+import collections
+import logging
+import os
+import struct
+
+GRAPH_FILE = os.path.join('info', 'commit-graph')
+GRAPH_CHAIN_DIR = os.path.join('info', 'commit-graphs')
+GRAPH_CHAIN_FILE = 'commit-graph-chain'
+GRAPH_SIGNATURE = b'CGPH'
+# header: signature, version, hash version, chunk count, base graph count
+GRAPH_HEADER = struct.Struct('>4sBBBB')
+CHUNK_ENTRY_SIZE = 12
+BLOOM_CHUNKS = (b'BIDX', b'BDAT')
+
+
+class CommitGraphStatus(object):
+    """
+    Availability of the commit-graph of a repository
+    """
+
+    def __init__(self, files=(), chunks=(), enabled=True):
+        """
+        :param files: paths of the commit-graph files
+        :param chunks: set of chunk ids found in the files
+        :param enabled: False when git is configured not to use the
+                        commit-graph (core.commitGraph)
+        """
+        self.files = list(files)
+        self.chunks = set(chunks)
+        self.enabled = enabled
+        self.written = False
+        self.path_limited = False
+
+    @property
+    def present(self):
+        """True when git uses a commit-graph for the repository"""
+        return self.enabled and bool(self.files)
+
+    @property
+    def changed_paths(self):
+        """True when the commit-graph has changed-path Bloom filters"""
+        return self.present and all(x in self.chunks for x in BLOOM_CHUNKS)
+
+    @property
+    def path_limited_walk(self):
+        """True when the walk is limited to paths, with the filters"""
+        return self.path_limited and self.changed_paths
+
+    def strategy(self):
+        """
+        :return: dictionary; the commit-graph used and the walk strategy
+                 (as reported by --stats)
+        """
+        return collections.OrderedDict([
+            ('present', self.present), ('bloom', self.changed_paths),
+            ('path_limited_walk', self.path_limited_walk)])
+
+    def __str__(self):
+        if not self.present:
+            return 'not available'
+        return '{}{}; {}'.format(
+            'with changed-path filters' if self.changed_paths
+            else 'without changed-path filters',
+            ' (written now)' if self.written else '',
+            'walking the changed paths with the filters'
+            if self.path_limited_walk else 'changed-path filters not used')
+
+
+def graph_files(objects_dir):
+    """
+    Find the commit-graph files: a single file or a chain of split ones
+    :param objects_dir: the objects directory of the repository
+    :return: list of paths
+    """
+    retval = []
+    single = os.path.join(objects_dir, GRAPH_FILE)
+    if os.path.isfile(single):
+        retval.append(single)
+    chain_dir = os.path.join(objects_dir, GRAPH_CHAIN_DIR)
+    chain = os.path.join(chain_dir, GRAPH_CHAIN_FILE)
+    if os.path.isfile(chain):
+        with open(chain) as cfile:
+            retval.extend(
+                os.path.join(chain_dir, 'graph-{}.graph'.format(x.strip()))
+                for x in cfile if x.strip())
+    return retval
+
+
+def read_chunk_ids(path):
+    """
+    Read the table of contents of a commit-graph file
+    :param path: commit-graph file path
+    :return: set of chunk ids (byte strings, e.g. b'BIDX')
+    """
+    retval = set()
+    try:
+        with open(path, 'rb') as gfile:
+            header = gfile.read(GRAPH_HEADER.size)
+            if len(header) < GRAPH_HEADER.size:
+                return retval
+            (signature, _, _, count, _) = GRAPH_HEADER.unpack(header)
+            if signature != GRAPH_SIGNATURE:
+                return retval
+            table = gfile.read(count * CHUNK_ENTRY_SIZE)
+    except (IOError, OSError) as exc:
+        logging.debug("Unable to read commit-graph %s: %s", path, exc)
+        return retval
+    for start in range(0, len(table), CHUNK_ENTRY_SIZE):
+        retval.add(table[start:start + 4])
+    return retval
+
+
+def commit_graph_status(repo):
+    """
+    Check if git has a commit-graph for the repository
+    :param repo: reference to the repository (git.Repo())
+    :return: a CommitGraphStatus object
+    """
+    enabled = repo.config_reader().get_value('core', 'commitGraph', True)
+    files = graph_files(objects_directory(repo))
+    chunks = None
+    for path in files:
+        ids = read_chunk_ids(path)
+        # the filters are of use only when all the graph files have them
+        chunks = ids if chunks is None else chunks & ids
+    return CommitGraphStatus(files, chunks or (), enabled is not False)
+
+
+def objects_directory(repo):
+    """The objects directory of the repository (shared by worktrees)"""
+    common_dir = getattr(repo, 'common_dir', None) or repo.git_dir
+    return os.path.join(common_dir, 'objects')
+
+
+def write_commit_graph(repo, client):
+    """
+    Write (or refresh) the commit-graph of the repository, with
+    changed-path Bloom filters, for all the reachable commits
+    :param repo: reference to the repository (git.Repo())
+    :param client: an initialized git.Git() object
+    :return: True when the commit-graph was written
+    """
+    objects_dir = objects_directory(repo)
+    if not os.access(objects_dir, os.W_OK):
+        logging.warning("Repository %s is not writable; commit-graph not "
+                        "written", repo.git_dir)
+        return False
+    import git
+    try:
+        client.commit_graph('write', '--reachable', '--changed-paths')
+    except git.GitCommandError as exc:
+        logging.warning("Unable to write the commit-graph: %s", exc)
+        return False
+    return True
+
+
+def prepare_commit_graph(repo, client, write=False, path_limited=False):
+    """
+    Check the commit-graph of the repository, optionally writing it first,
+    and report whether git's walks are accelerated by it; the report is
+    a warning when the commit-graph was requested (written)
+    :param repo: reference to the repository (git.Repo())
+    :param client: an initialized git.Git() object
+    :param write: True to write (or refresh) the commit-graph
+    :param path_limited: True when the walk can be limited to paths
+                         (e.g. monorepo components) if the changed-path
+                         filters are available
+    :return: a CommitGraphStatus object
+    """
+    written = write and write_commit_graph(repo, client)
+    status = commit_graph_status(repo)
+    status.written = written
+    status.path_limited = path_limited
+    logging.log(logging.WARNING if write else logging.INFO,
+                "Commit-graph: %s", status)
+    return status
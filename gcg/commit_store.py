@@ -0,0 +1,210 @@
+#!/usr/bin/env python2
+
+"""
+Compact, column-oriented storage of commits collected for the changelog.
+
+Keeping whole commit objects alive for the entire history is expensive,
+so only the data the changelog needs is kept, packed into flat buffers
+and arrays. Templates access it through short-lived, read-only views.
+"""
+
+import binascii
+from array import array
+
+from gcg.history import Author
+
+SHA_SIZE = 20
+
+
+class CommitStore(object):
+    """
+    Append-only sequence of commits. Indexing and iteration return
+    CommitView objects, so a store can be used in place of a list
+    of commits (e.g. as a value of the changelog entries).
+    """
+
+    def __init__(self):
+        self._shas = bytearray()
+        # 'd' is exact for integers up to 2**53 and has the same size
+        # on every platform, unlike 'l'
+        self._authored = array('d')
+        self._committed = array('d')
+        self._parent_counts = array('H')
+        self._author_ids = array('L')
+        self._authors = []
+        self._author_lookup = {}
+        self._messages = bytearray()
+        self._message_offsets = array('L', [0])
+
+    def append(self, commit):
+        """
+        Store a commit
+        :param commit: a CommitRecord or CommitView object
+        :return: n/a
+        """
+        self._shas += binascii.unhexlify(commit.hexsha)
+        self._authored.append(commit.authored_date)
+        self._committed.append(commit.committed_date)
+        self._parent_counts.append(commit.parent_count)
+        author = (commit.author.name, commit.author.email)
+        author_id = self._author_lookup.get(author)
+        if author_id is None:
+            author_id = len(self._authors)
+            self._authors.append(Author(*author))
+            self._author_lookup[author] = author_id
+        self._author_ids.append(author_id)
+        self._messages += commit.message.encode('utf-8')
+        self._message_offsets.append(len(self._messages))
+
+    def extend(self, other):
+        """
+        Store all the commits of another store, column by column
+        :param other: a CommitStore object
+        :return: n/a
+        """
+        # pylint: disable=protected-access
+        author_ids = []
+        for author in other._authors:
+            author_id = self._author_lookup.get(tuple(author))
+            if author_id is None:
+                author_id = len(self._authors)
+                self._authors.append(author)
+                self._author_lookup[tuple(author)] = author_id
+            author_ids.append(author_id)
+        self._shas += other._shas
+        self._authored.extend(other._authored)
+        self._committed.extend(other._committed)
+        self._parent_counts.extend(other._parent_counts)
+        self._author_ids.extend(author_ids[x] for x in other._author_ids)
+        base = len(self._messages)
+        self._messages += other._messages
+        self._message_offsets.extend(
+            base + x for x in other._message_offsets[1:])
+
+    def to_columns(self):
+        """
+        Export the content of the store in a form suitable for JSON
+        :return: dictionary of columns
+        """
+        return {
+            'shas': binascii.hexlify(bytes(self._shas)).decode('ascii'),
+            'authored': self._authored.tolist(),
+            'committed': self._committed.tolist(),
+            'parent_counts': self._parent_counts.tolist(),
+            'author_ids': self._author_ids.tolist(),
+            'authors': [list(x) for x in self._authors],
+            'messages': self._messages.decode('utf-8'),
+            'message_offsets': self._message_offsets.tolist(),
+        }
+
+    @classmethod
+    def from_columns(cls, columns):
+        """
+        Create a store out of columns exported with to_columns()
+        :param columns: dictionary of columns
+        :return: a CommitStore object
+        """
+        # pylint: disable=protected-access
+        store = cls()
+        store._shas = bytearray(binascii.unhexlify(columns['shas']))
+        store._authored.extend(columns['authored'])
+        store._committed.extend(columns['committed'])
+        store._parent_counts.extend(columns['parent_counts'])
+        store._author_ids.extend(columns['author_ids'])
+        store._authors = [Author(*x) for x in columns['authors']]
+        store._author_lookup = dict(
+            (tuple(x), i) for (i, x) in enumerate(store._authors))
+        store._messages = bytearray(columns['messages'].encode('utf-8'))
+        store._message_offsets = array('L', columns['message_offsets'])
+        return store
+
+    def __len__(self):
+        return len(self._authored)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("commit index out of range")
+        return CommitView(self, index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield CommitView(self, index)
+
+    def hexsha(self, index):
+        """Commit id (hex string) of the commit at given position"""
+        start = index * SHA_SIZE
+        return binascii.hexlify(
+            bytes(self._shas[start:start + SHA_SIZE])).decode('ascii')
+
+    def message(self, index):
+        """Full message of the commit at given position"""
+        return self._messages[self._message_offsets[index]:
+                              self._message_offsets[index + 1]].decode(
+                                  'utf-8')
+
+    def author(self, index):
+        """Author (name, email) of the commit at given position"""
+        return self._authors[self._author_ids[index]]
+
+    def authored_date(self, index):
+        """Author timestamp of the commit at given position"""
+        return int(self._authored[index])
+
+    def committed_date(self, index):
+        """Committer timestamp of the commit at given position"""
+        return int(self._committed[index])
+
+    def parent_count(self, index):
+        """Number of parents of the commit at given position"""
+        return self._parent_counts[index]
+
+
+class CommitView(object):
+    """
+    Read-only view of a single commit kept in a CommitStore. Attribute
+    names follow git.Commit, so the views work with the existing
+    templates and filters (e.g. commit_headline).
+    """
+    __slots__ = ('_store', '_index')
+
+    def __init__(self, store, index):
+        self._store = store
+        self._index = index
+
+    @property
+    def hexsha(self):
+        """Commit id (hex string)"""
+        return self._store.hexsha(self._index)
+
+    @property
+    def message(self):
+        """Full commit message"""
+        return self._store.message(self._index)
+
+    @property
+    def author(self):
+        """Commit author (an object with 'name' and 'email')"""
+        return self._store.author(self._index)
+
+    @property
+    def authored_date(self):
+        """Author timestamp (seconds since epoch)"""
+        return self._store.authored_date(self._index)
+
+    @property
+    def committed_date(self):
+        """Committer timestamp (seconds since epoch)"""
+        return self._store.committed_date(self._index)
+
+    @property
+    def parent_count(self):
+        """Number of parents"""
+        return self._store.parent_count(self._index)
+
+    def __str__(self):
+        return self.hexsha
+
+    def __repr__(self):
+        return '<CommitView {}>'.format(self.hexsha)
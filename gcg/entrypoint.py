@@ -15,20 +15,37 @@ from __future__ import print_function
 
 import argparse
 import collections
+import itertools
 import logging
 import os
 import re
 import sys
-from datetime import datetime
-from tzlocal import get_localzone
-
-import git
-import jinja2
-import jinja2.environment
 
 import gcg.errors as err
+from gcg.backends import BACKENDS, DEFAULT_BACKEND, open_backend
+from gcg.cache import CachedHistory, ChangelogCache
+from gcg.changelog_file import prepend_to_file, replaced_file
+from gcg.clones import prepare_clone, report_truncation
+from gcg.commit_graph import prepare_commit_graph
+from gcg.commit_store import CommitStore
+from gcg.history import CommitStub, commit_filtered_out, \
+    walk_merged_commits
 from gcg.tag_filter import TagFilter
-from gcg.jinja_filters import commit_headline
+from gcg.tag_index import get_tag_index
+from gcg.jinja_filters import FILTERS, commit_headline
+from gcg.parallel import ReleaseRanges, can_fork, iter_parallel_releases
+from gcg.pipeline import ReleaseStream
+from gcg.records import BINARY_FORMATS, RECORD_FORMATS, generate_records
+from gcg.release_headers import ReleaseHeaders, collate_entry_header_data
+from gcg.release_window import ReleaseWindow, VersionRange
+from gcg.scope import resolve_commit_from_arguments, resolve_update_limit, \
+    resolve_version_limit
+from gcg.stats import RunStats
+
+OUTPUT_CHUNK_SIZE = 256 * 1024
+BUILTIN_FORMATS = ('rpm', 'deb')
+# pattern constructs which may match a line break
+UNSAFE_GREP_REGEX = re.compile(r'\\[sSWDnrxuUN0-7]|\[\^|\(\?[a-zA-Z]*s|\n')
 
 
 def parse_args(argv):
@@ -53,13 +70,26 @@ def parse_args(argv):
     )
     parser.add_argument(
         '-O', '--output-format',
-        help="""Output changelog format""",
-        type=str, action="store", choices=['rpm', 'deb'],
+        help="""Output changelog format: one of the built-in formats
+        ({}), one of the machine-readable record formats ({}) or
+        the name of a template from --template-dir.
+        May be given multiple times to produce several changelogs out
+        of one history scan; each needs its own --output-file then
+        (given in the same order).""".format(
+            ', '.join(BUILTIN_FORMATS), ', '.join(sorted(RECORD_FORMATS))),
+        type=str, action="append",
         required=True
     )
     parser.add_argument(
         '-o', '--output-file',
         help="""Output file path. Uses standard output when omitted""",
+        type=str, action="append",
+    )
+    parser.add_argument(
+        '--template-dir',
+        help="""Directory with custom (Jinja2) templates. Its templates
+        take precedence over the built-in ones; their names can be
+        used as output formats (-O).""",
         type=str, action="store",
     )
     parser.add_argument(
@@ -94,6 +124,21 @@ def parse_args(argv):
              "issue reference in the message (e.g. a Jira ticket).",
         action="store_true",
     )
+    parser.add_argument(
+        '--first-parent',
+        help="""Walk the mainline only, following the first parent of
+        the merge commits: a merge stands for the changes it integrated
+        and its message is used for them. Tags of the side branches are
+        not seen.""",
+        action="store_true",
+    )
+    parser.add_argument(
+        '--expand-merges',
+        help="""With --first-parent, list the commits a mainline merge
+        brought in (those of its side branch) in place of the merge.
+        They are put in the release of the merge.""",
+        action="store_true",
+    )
     parser.add_argument(
         '-B', '--bug-tracking-pattern',
         help="Provide the pattern (Python regexp) to check against commit"
@@ -149,95 +194,158 @@ def parse_args(argv):
         processes them as if the were 1.0.0 1.0.1""",
         action="store",
     )
+    parser.add_argument(
+        '--last-releases',
+        help="""Include only the given number of most recent releases
+        (on top of the current version). The history walk stops as soon
+        as they are complete.""",
+        type=int, action="store", metavar='N',
+    )
+    parser.add_argument(
+        '--versions',
+        help="""Include only the releases within the Semantic Versioning
+        range, given as comma-separated comparisons, e.g. '>=2.0.0,<3.0.0'.
+        The walk starts at the most recent release within the range and
+        stops at the first release older than the range.""",
+        type=str, action="store", metavar='RANGE',
+    )
+    parser.add_argument(
+        '--cache',
+        help="""Keep the outcome of the history traversal in a cache
+        within the Git directory (gcg-cache) and, on subsequent runs,
+        walk only the commits added since the cached top commit.""",
+        action="store_true",
+    )
+    parser.add_argument(
+        '--backend',
+        help="""How the history is read: 'git' runs git commands, 'gitdb'
+        reads the repository in-process (pure Python, no git processes;
+        commits are filtered by gcg only).""",
+        choices=sorted(BACKENDS), default=DEFAULT_BACKEND,
+    )
+    parser.add_argument(
+        '-j', '--jobs',
+        help="""Number of worker processes collecting the releases.
+        With more than one, the release boundaries are found by a quick
+        walk of the commit ids first, then the commits of the releases
+        are retrieved and filtered in parallel. The output is the same.""",
+        type=int, action="store", default=1, metavar='N',
+    )
+    parser.add_argument(
+        '--commit-graph',
+        help="""Write (or refresh) git's commit-graph file, with changed-path
+        Bloom filters, before walking the history; it speeds up this
+        and later walks. The repository must be writable. The filters
+        speed up the path-limited walks of gcg-monorepo only. Whether
+        the commit-graph is in use is reported (and recorded by
+        --stats).""",
+        action="store_true",
+    )
+    parser.add_argument(
+        '--stats',
+        help="""Write statistics of the run to the file (JSON): wall time
+        of the phases (open, resolve, traverse, headers, render), the number
+        of git processes and object reads, commits walked and kept, releases
+        and the output size.""",
+        type=str, action="store", metavar='FILE',
+    )
+    parser.add_argument(
+        '--profile-out',
+        help="""Profile the run and write the data (cProfile format, see
+        the pstats module) to the file.""",
+        type=str, action="store", metavar='FILE',
+    )
+    parser.add_argument(
+        '--update',
+        help="""Update the existing output file (-o) in place: only
+        the releases newer than the most recent release found in the file
+        are generated and put in front of the existing content.""",
+        action="store_true",
+    )
 
     options = parser.parse_args(argv)
-    if options.output_format == 'deb':
-        if options.deb_package_name is None:
-            raise ValueError("For 'deb', the package name (-n) is mandatory")
-        if options.deb_distribution is None:
-            raise ValueError("For 'deb', the --deb-distribution is mandatory")
-
+    validate_options(options)
     return options
 
 
-def get_commit_tags(client, commit):
+def validate_options(options):
     """
-    Retrieve tags pointing at a specific commit/revision
-    :param client: an initialized git.Git() object to query with
-    :param commit:
-    :return: list of strings containing tags pointing at specified
-             revision; may be empty if there's no tag at this revision
+    Check the options are consistent with each other; fill in
+    the defaults depending on other options
+    :param options: command-line options, as returned by argparse
+    :return: n/a
+    :raises: ValueError when the options are inconsistent
     """
-    retval = []
-    (status, output, errors) = client.tag(
-        '--points-at', commit.hexsha, with_extended_output=True)
-    if status:
-        logging.error(errors)
-    else:
-        if output:
-            retval = output.split('\n')
-    return retval
+    validate_output_options(options)
+    validate_walk_options(options)
+    if options.update:
+        validate_update_options(options)
 
 
-def collate_entry_header_data(repo, entries, options):
+def validate_output_options(options):
     """
-    :param repo:
-    :param entries: an OrderedDict object with keys being tag names (string)
-                    and values being a list of git.Commit objects
-    :param options: user input parameters
-    :return: dictionary; k: tag name, v: object with properties
-                datetime
+    Check the output formats and files (see validate_options())
     """
-    retval = {}
-    localtz = get_localzone()
-    for version in entries:
-        if not version or (entries[version] and not options.prefer_tags):
-            hdr = log_entry_header_from_commit(entries[version][0], localtz)
-        else:
-            logging.info("Retrieving details of tag '%s'", version)
-            hdr = log_entry_header_from_tag(repo.tags[version].tag, localtz)
-        stripped = version
-        if options.tag_prefix and stripped.startswith(options.tag_prefix):
-            stripped = stripped[len(options.tag_prefix):]
-        hdr['version'] = stripped or options.current_version
-        hdr['deb_urgency'] = options.deb_urgency
-        hdr['deb_distro'] = options.deb_distribution
-        hdr['deb_name'] = options.deb_package_name
-        retval[version] = hdr
-    return retval
+    for output_format in options.output_format:
+        if output_format in RECORD_FORMATS:
+            # fails early when the encoder isn't available
+            RECORD_FORMATS[output_format]()
+    if options.template_dir is None:
+        for output_format in options.output_format:
+            if output_format not in BUILTIN_FORMATS and \
+                    output_format not in RECORD_FORMATS:
+                raise ValueError("Unknown output format '{}'; use "
+                                 "--template-dir for custom templates".format(
+                                     output_format))
+    if options.output_file is None:
+        options.output_file = [None]
+    if len(options.output_file) != len(options.output_format):
+        raise ValueError("Each output format (-O) needs its own output "
+                         "file (-o)")
+    if 'deb' in options.output_format:
+        if options.deb_package_name is None:
+            raise ValueError("For 'deb', the package name (-n) is mandatory")
+        if options.deb_distribution is None:
+            raise ValueError("For 'deb', the --deb-distribution is mandatory")
 
 
-def log_entry_header_from_commit(the_commit, localtz):
+def validate_walk_options(options):
     """
-    Retrieve information for the release line from the commit
-    :param the_commit: a git.Commit object
-    :param localtz: a tzinfo object representing the local timezone
-    :return: dictionary
+    Check the options of the history walk: the release window, the worker
+    processes and the first-parent mode (see validate_options())
     """
-    hdr = dict()
-    hdr['date'] = datetime.fromtimestamp(the_commit.authored_date, localtz)
-    hdr['date_rpm'] = hdr['date'].strftime('%a %b %d %Y')
-    hdr['date_deb'] = hdr['date'].strftime('%a, %d %b %Y %H:%M:%S %z')
-    hdr['author'] = str(the_commit.author.name)
-    hdr['email'] = str(the_commit.author.email)
-    return hdr
-
-
-def log_entry_header_from_tag(tag, localtz):
+    if options.last_releases is not None or options.versions is not None:
+        if options.since is not None:
+            raise ValueError("--since can't be combined with "
+                             "--last-releases or --versions")
+        if options.update or options.cache:
+            raise ValueError("--update and --cache can't be combined with "
+                             "--last-releases or --versions")
+        if options.last_releases is not None and options.last_releases < 0:
+            raise ValueError("--last-releases can't be negative")
+        if options.versions is not None:
+            if options.custom_tag_pattern is not None:
+                raise ValueError("--versions requires Semantic Versioning "
+                                 "tags; it can't be used with -T")
+            VersionRange(options.versions)
+    if options.jobs < 1:
+        raise ValueError("--jobs must be at least 1")
+    if options.expand_merges and not options.first_parent:
+        raise ValueError("--expand-merges requires --first-parent")
+
+
+def validate_update_options(options):
     """
-    Retrieve information for the release line from the tag
-    :param tag: a git.Tag object
-    :param localtz: a tzinfo object representing the local timezone
-    :return: dictionary
+    Check the options are fit for --update (see validate_options())
     """
-    hdr = dict()
-    authored_date = tag.tagged_date
-    hdr['date'] = datetime.fromtimestamp(authored_date, localtz)
-    hdr['date_rpm'] = hdr['date'].strftime('%a %b %d %Y')
-    hdr['date_deb'] = hdr['date'].strftime('%a, %d %b %Y %H:%M:%S %z')
-    hdr['author'] = str(tag.tagger.name)
-    hdr['email'] = str(tag.tagger.email)
-    return hdr
+    if options.output_file[0] is None:
+        raise ValueError("--update requires the output file (-o)")
+    if len(options.output_file) > 1:
+        raise ValueError("--update supports a single output file only")
+    if options.since is not None:
+        raise ValueError("--update and --since are mutually exclusive")
+    if options.output_format[0] in RECORD_FORMATS:
+        raise ValueError("--update supports changelog templates only")
 
 
 def log_level_from_verbosity(count):
@@ -257,26 +365,34 @@ def log_level_from_verbosity(count):
 def init_jinja_env(external_template_dir=None):
     """
     Initialize Jinja environment:
-    - load templates embedded in the gcg module
-    - optionally load from an external template directory
+    - load templates embedded in the gcg module (precompiled, if available)
+    - optionally load from an external template directory; those are
+      covered by the on-disk bytecode cache
     - register custom Jinja filters
     :param external_template_dir: optional; when provided, templates from given
                                   directory will be looked up first
     :return: the newly created Jinja environment
     """
+    import jinja2
+    from gcg.precompiled import bytecode_cache, module_loader
     loaders = []
+    cache = None
     if external_template_dir:
         loaders.append(jinja2.FileSystemLoader(external_template_dir))
+        cache = bytecode_cache()
+    precompiled = module_loader()
+    if precompiled is not None:
+        loaders.append(precompiled)
     loaders.append(jinja2.PackageLoader('gcg'))
 
     env = jinja2.Environment(
-        loader=jinja2.ChoiceLoader(loaders)
+        loader=jinja2.ChoiceLoader(loaders),
+        bytecode_cache=cache
     )
-    env.filters['commit_headline'] = commit_headline
+    env.filters.update(FILTERS)
     return env
 
 
-# pylint: disable=too-many-return-statements
 def main(argv=None):
     """
     Main entry point
@@ -296,165 +412,585 @@ def main(argv=None):
     logging.basicConfig(
         level=loglevel, format="[%(levelname)s] %(message)s")
 
-    try:
-        repo = git.Repo(options.path)
-    except ValueError as exc:
-        logging.error("Invalid input; details: %s", exc)
-        return err.INVALID_INPUT
-    except git.NoSuchPathError as exc:
-        logging.error("Path specified with '-p' does not exist; %s", exc)
-        return err.REPO_PATH_INVALID
-    except git.InvalidGitRepositoryError as exc:
-        logging.error("Path specified with '-p' does not a Git repo make; %s",
-                      exc)
-        return err.REPO_PATH_NOT_REPO
+    return run(options)
 
-    try:
-        client = git.Git(options.path)
-        upper_limit = resolve_commit_from_arguments(repo, options, 'until')
-        lower_limit = resolve_commit_from_arguments(repo, options, 'since')
-    except ValueError as exc:
-        logging.error("Invalid input values for changelog scope; details: "
-                      "%s.", exc)
-        return err.INVALID_VCS_LIMITS
 
+# pylint: disable=too-many-arguments
+def run(options, repo=None, environment=None, backend=None, out=None):
+    """
+    Generate the changelog as configured by the options; on request,
+    write the statistics (--stats) and the profile (--profile-out) of it
+    :param options: command-line options, as returned by parse_args()
+    :param repo: optional; an already opened git.Repo object for
+                 options.path, reused by the backend if possible. Opened
+                 on demand when omitted
+    :param environment: optional; Jinja environment to load templates
+                        from. Created on demand when omitted
+    :param backend: optional; an already opened history backend
+                    (see gcg.backends) for options.path; takes precedence
+                    over repo and options.backend
+    :param out: optional; file-like object to write the changelog to
+                when there's no output file (-o); standard output
+                by default
+    :return: exit code (see gcg.errors)
+    """
+    stats = RunStats()
+    profiler = None
+    if getattr(options, 'profile_out', None):
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
     try:
-        entries = traverse_version_tree(
-            client, repo, options, upper_limit, lower_limit)
-        headers = collate_entry_header_data(repo, entries, options)
+        retval = run_changelog(options, repo, environment, stats, backend,
+                               out)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(options.profile_out)
+    if getattr(options, 'stats', None):
+        stats.write(options.stats, retval)
+    return retval
+
+
+# pylint: disable=too-many-return-statements,too-many-branches
+# pylint: disable=too-many-arguments
+def run_changelog(options, repo, environment, stats, backend=None, out=None):
+    """
+    Generate the changelog as configured by the options
+    :param options: command-line options, as returned by parse_args()
+    :param repo: an already opened git.Repo object or None (see run())
+    :param environment: Jinja environment or None (see run())
+    :param stats: a RunStats object to record the phases in
+    :param backend: an already opened history backend or None (see run())
+    :param out: file-like object to write to or None (see run())
+    :return: exit code (see gcg.errors)
+    """
+    import git
+    import jinja2
+    with stats.phase('open'):
+        try:
+            if backend is None:
+                backend = open_backend(options.backend, options.path, repo)
+        except ValueError as exc:
+            logging.error("Invalid input; details: %s", exc)
+            return err.INVALID_INPUT
+        except git.NoSuchPathError as exc:
+            logging.error("Path specified with '-p' does not exist; %s", exc)
+            return err.REPO_PATH_INVALID
+        except git.InvalidGitRepositoryError as exc:
+            logging.error("Path specified with '-p' does not a Git repo "
+                          "make; %s", exc)
+            return err.REPO_PATH_NOT_REPO
+
+        if environment is None:
+            environment = init_jinja_env(options.template_dir)
+        try:
+            for output_format in options.output_format:
+                if output_format not in RECORD_FORMATS:
+                    environment.get_template(output_format)
+        except jinja2.TemplateNotFound as exc:
+            logging.error("No template for output format '%s'", exc)
+            return err.INVALID_INPUT
+
+    if getattr(options, 'stats', None):
+        backend = stats.counting_backend(backend)
+    return generate_from_backend(backend, options, environment, stats, out)
+
 
+def generate_from_backend(backend, options, environment, stats, out=None):
+    """
+    Generate the changelog out of the history read by the backend
+    :param backend: history backend (see gcg.backends)
+    :param options: command-line options, as returned by parse_args()
+    :param environment: Jinja environment to load the templates from
+    :param stats: a RunStats object to record the phases in
+    :param out: optional; file-like object to write to (see run())
+    :return: exit code (see gcg.errors)
+    """
+    with stats.phase('resolve'):
+        try:
+            (releases, update_offset) = resolve_scope(backend, options,
+                                                      stats)
+        except ValueError as exc:
+            logging.error("Invalid input values for changelog scope; "
+                          "details: %s.", exc)
+            return err.INVALID_VCS_LIMITS
+
+    from tzlocal import get_localzone
+    release_headers = ReleaseHeaders(backend, options, get_localzone())
+
+    def header_data(version, commits):
+        """Header of a single release, as it's streamed"""
+        with stats.phase('headers'):
+            return release_headers(version, commits)
+
+    releases = stats.releases(releases)
+    try:
+        if len(options.output_format) > 1:
+            # the releases are needed more than once; scan them only once
+            entries = collections.OrderedDict(releases)
+            with stats.phase('headers'):
+                headers = collate_entry_header_data(backend, entries, options)
+        else:
+            entries = ReleaseStream(releases, header_data)
+            headers = entries.headers
+
+        with stats.phase('render'):
+            if update_offset is not None:
+                prepend_to_file(
+                    options.output_file[0], update_offset,
+                    stats.counted_chunks(generate_changelog(
+                        entries, headers, options.output_format[0],
+                        environment)))
+            else:
+                for (output_format, output_file) in zip(
+                        options.output_format, options.output_file):
+                    stats.count('output_size', print_changelog(
+                        entries, headers, output_format, output_file,
+                        environment, out))
     except ValueError as exc:
         logging.error("Program aborted; details: %s.", exc)
         return err.PROCESSING_FAILED
 
-    print_changelog(entries, headers, options.output_format,
-                    options.output_file)
-
     return err.SUCCESS
 
 
-def print_changelog(entries, headers, output_format, output_file=None):
+def resolve_scope(backend, options, stats=None):
+    """
+    Prepare the repository and resolve the scope of the changelog
+    :param backend: history backend (see gcg.backends)
+    :param options: command-line options, as returned by parse_args()
+    :param stats: optional; a RunStats object to record the commit-graph
+                  strategy in
+    :return: tuple (releases, as returned by iter_version_tree(), not
+             walked yet; offset of the existing changelog content to
+             update or None, see resolve_update_limit())
+    :raises ValueError: when the limits can't be resolved
+    """
+    clone = prepare_clone(backend.repo, backend.repo.git)
+    # the walk isn't limited to paths; the commit-graph speeds it up,
+    # the changed-path filters don't
+    graph = prepare_commit_graph(backend.repo, backend.repo.git,
+                                 options.commit_graph)
+    if stats is not None:
+        stats.record('commit_graph', graph.strategy())
+    upper_limit = resolve_commit_from_arguments(backend, options, 'until')
+    lower_limit = resolve_commit_from_arguments(backend, options, 'since')
+    tag_index = get_tag_index(backend, TagFilter(None, options.tag_prefix))
+    update_offset = None
+    if getattr(options, 'versions', None) is not None:
+        upper_limit = resolve_version_limit(backend, options, upper_limit)
+    if options.update:
+        (lower_limit, update_offset) = resolve_update_limit(
+            backend, options, tag_index)
+    return (iter_version_tree(backend, options, upper_limit, lower_limit,
+                              tag_index, clone.shallow), update_offset)
+
+
+# pylint: disable=too-many-arguments
+def print_changelog(entries, headers, output_format, output_file=None,
+                    environment=None, out=None):
     """
-    Render the changelog report
+    Render the changelog report. The output is written as it's rendered,
+    in large chunks, so the complete changelog is never held in memory.
+    An existing output file is only replaced once the changelog is
+    complete.
     :param entries: typically commit objects
     :param headers: release headers (dictionary with release tag as key)
     :param output_format: string, e.g. 'rpm' or 'deb'
     :param output_file: optional; file name to write to. By default write
                         to standard output
-    :return: n/a
+    :param environment: optional; Jinja environment to load the template
+                        from (see init_jinja_env())
+    :param out: optional; file-like object to write to instead of
+                the standard output, when there's no output file
+    :return: size of the changelog (characters, or bytes for binary
+             formats)
     """
-    environment = init_jinja_env()
-    template = environment.get_template(output_format)
-    output = template.render(entries=entries, headers=headers)
+    chunks = generate_changelog(entries, headers, output_format, environment)
+    binary = output_format in BINARY_FORMATS
+    size = 0
     if output_file:
-        with open(output_file, 'w') as ofile:
-            ofile.write(output)
+        with replaced_file(output_file, 'wb' if binary else 'w') as ofile:
+            for chunk in chunks:
+                ofile.write(chunk)
+                size += len(chunk)
     else:
-        print(output)
-
-
-def commit_filtered_out(commit, options, bugtracking_regex):
+        out = out if out is not None else sys.stdout
+        if binary:
+            out = getattr(out, 'buffer', out)
+        for chunk in chunks:
+            out.write(chunk)
+            size += len(chunk)
+        if output_format not in RECORD_FORMATS:
+            out.write('\n')
+    return size
+
+
+def generate_changelog(entries, headers, output_format, environment=None):
     """
-    Decide if commit should be processed or not
-
-    :param commit: Commit to be inspected
-    :param options: command-line options
-    :param bugtracking_regex: regular expression object to match
-                              against the commit message. Only used if
-                              options.bug_tracking_only evaluates to True
-    :return: True / False
+    Render the changelog report piece by piece
+    :param entries: typically commit objects
+    :param headers: release headers (dictionary with release tag as key)
+    :param output_format: string, e.g. 'rpm' or 'deb'
+    :param environment: optional; Jinja environment to load the template
+                        from. When omitted, init_jinja_env() is used.
+                        Not used by the record formats (see gcg.records)
+    :return: (yield) strings; consecutive parts of the changelog,
+             each (but the last) at least OUTPUT_CHUNK_SIZE long
     """
-    retval = False
-    if options.exclude_merges and len(commit.parents) > 1:
-        logging.info("Ignoring merge commit %s", commit)
-        retval = True
-    elif options.bug_tracking_only:
-        if not bugtracking_regex.match(commit.message):
-            logging.info("Ignoring commit %s (no bug reference)", commit)
-            retval = True
-    return retval
-
-
-def repo_iterate(repo, high, low=None):
+    if output_format in RECORD_FORMATS:
+        for chunk in generate_records(entries, headers, output_format,
+                                      OUTPUT_CHUNK_SIZE):
+            yield chunk
+        return
+    if environment is None:
+        environment = init_jinja_env()
+    template = environment.get_template(output_format)
+    pending = []
+    size = 0
+    for piece in template.generate(entries=entries, headers=headers):
+        pending.append(piece)
+        size += len(piece)
+        if size >= OUTPUT_CHUNK_SIZE:
+            yield ''.join(pending)
+            pending = []
+            size = 0
+    if pending:
+        yield ''.join(pending)
+
+
+def repo_iterate(backend, high, low=None, exclude=None, filter_args=None,
+                 first_parent=False):
     """
     Return (yield) one commit by one, from 'high' to 'low'
     (or oldest reachable commit) and in reverse chronological order
     (see rev-list and git log commands)
 
-    :param repo: an initialized git.Repo object
+    :param backend: history backend (see gcg.backends) to walk with
     :param high: top of the version tree to scan; typically tip of the branch,
                 HEAD, but it can be any commit
     :param low: optional; the low end of the revision list. When unspecified,
                 function will scan the history until the first reachable commit
-    :return: a git.Commit object
+    :param exclude: optional; list of commits whose history is to be
+                    skipped (in addition to the history of 'low')
+    :param filter_args: optional; 'git log' options filtering the commits
+                        (see git_filter_args()). Tagged commits filtered
+                        out by git are returned as stubs
+    :param first_parent: optional; True to walk the mainline only
+                         (see --first-parent)
+    :return: a gcg.history.CommitRecord (or CommitStub) object
     """
+    for commit in backend.iter_commits(high, low, exclude, filter_args,
+                                       first_parent):
+        yield commit
 
-    refs = high if low is None else "{}..{}".format(low, high)
 
-    for commit in repo.iter_commits(refs):
-        yield commit
+def git_filter_args(backend, options, revision):
+    """
+    Translate the commit filters (see commit_filtered_out()) into 'git log'
+    options, where git can do equivalent or broader filtering. Either way,
+    commit_filtered_out() has the final say on commits which pass.
+
+    :param backend: history backend (see gcg.backends) to walk with
+    :param options: command-line options as specified by the user
+    :param revision: a revision to probe git (and the pattern) with
+    :return: list of 'git log' options; may be empty
+    """
+    retval = []
+    if not backend.native_filters:
+        return retval
+    if options.exclude_merges:
+        retval.append('--no-merges')
+    if options.bug_tracking_only:
+        pattern = options.bug_tracking_pattern
+        # git matches line by line (and the pattern anywhere in a line),
+        # so it's broader than re.match() only if the pattern can't span
+        # lines
+        if UNSAFE_GREP_REGEX.search(pattern) or \
+                not all(ord(x) < 128 for x in pattern):
+            logging.info("Bug tracking pattern is checked by gcg only")
+        else:
+            if not backend.supports_perl_regexp(revision, pattern):
+                logging.info("Git can't use the bug tracking pattern as "
+                             "a Perl regular expression; it's checked by "
+                             "gcg only")
+            else:
+                retval.extend(['--perl-regexp', '--grep=' + pattern])
+    return retval
+
+
+def walk_history(backend, options, upper_limit, lower_limit, exclude=None):
+    """
+    Walk the history as configured by the options
+    :param backend: history backend (see gcg.backends) to walk with
+    :param options: command-line options as specified by the user
+    :param upper_limit: the top commit from which scanning begins
+    :param lower_limit: the bottom commit of the scan (or None)
+    :param exclude: optional; list of other commits whose history is
+                    not walked
+    :return: iterator of the commits (see repo_iterate()) or, with
+             --expand-merges, of tuples (mainline commit, commits it
+             brought in) (see gcg.history.iter_mainline_groups())
+    """
+    if getattr(options, 'expand_merges', False):
+        # merges filtered out by git couldn't be expanded
+        return walk_merged_commits(backend, upper_limit.hexsha, lower_limit,
+                                   exclude)
+    return repo_iterate(
+        backend, upper_limit, lower_limit, exclude,
+        git_filter_args(backend, options, upper_limit.hexsha),
+        getattr(options, 'first_parent', False))
+
+
+def walk_events(commits, tag_index, options, bugtracking_regexp,
+                expand=False):
+    """
+    Turn walked commits into traversal events (see traverse_version_tree)
+    :param commits: iterable of commits, in the walk order; CommitStub
+                    objects stand for commits already filtered out
+    :param tag_index: tag index, as returned by get_tag_index()
+    :param options: command-line options as specified by the user
+    :param bugtracking_regexp: compiled --bug-tracking-pattern
+    :param expand: optional; True when 'commits' are tuples (mainline
+                   commit, commits it brought in) and the merges are to
+                   be replaced by the commits they brought in
+    :return: (yield) tuple (tags, commit, kept); 'tags' are the release
+             tags pointing at the commit (if any), 'kept' tells if
+             the commit passed the filters
+    """
+    for item in commits:
+        (commit, merged) = item if expand else (item, ())
+        if isinstance(commit, CommitStub):
+            logging.debug("Skipping commit %s (filtered out by git)",
+                          commit.hexsha)
+            yield (tag_index.get(commit.hexsha), commit, False)
+            continue
+        if expand and commit.parent_count > 1:
+            logging.debug("Expanding merge commit %s", commit.hexsha)
+            yield (tag_index.get(commit.hexsha), commit, False)
+            for merged_commit in merged:
+                yield (None, merged_commit, not commit_filtered_out(
+                    merged_commit, options, bugtracking_regexp))
+            continue
+        logging.debug("Processing commit %s (%s)", commit.hexsha,
+                      commit_headline(commit))
+        yield (tag_index.get(commit.hexsha), commit,
+               not commit_filtered_out(commit, options, bugtracking_regexp))
 
 
-def traverse_version_tree(client, repo, options, upper_limit, lower_limit):
+def load_cached_history(backend, options, upper_limit, lower_limit,
+                        tag_index):
+    """
+    Load the cached traversal outcome and check it can be built upon
+    :param backend: history backend (see gcg.backends) to query with
+    :param options: command-line options as specified by the user
+    :param upper_limit: the top commit from which scanning begins
+    :param lower_limit: the bottom commit of the scan (or None)
+    :param tag_index: current tag index
+    :return: a CachedHistory object or None if there's nothing to reuse
+    """
+    cached = ChangelogCache(backend, options, lower_limit).load()
+    if cached is None:
+        return None
+    if cached.tip != upper_limit.hexsha:
+        if not backend.is_ancestor(cached.tip, upper_limit.hexsha):
+            logging.info("Cached commit %s is not an ancestor of %s",
+                         cached.tip, upper_limit.hexsha)
+            return None
+    for hexsha in cached.changed_tags(tag_index):
+        if backend.is_ancestor(hexsha, cached.tip):
+            logging.info("Tags of cached commit %s have changed", hexsha)
+            return None
+    return cached
+
+
+# pylint: disable=too-many-arguments
+def traverse_version_tree(backend, options, upper_limit, lower_limit,
+                          tag_index=None, shallow=()):
     """
     Scan the version tree and return the entries
-    :param client: an initialized git.Git() object to query with
-    :param repo: reference to the repository (git.Repo())
+    :param backend: history backend (see gcg.backends) to walk with
     :param options: command-line options as specified by the user
     :param upper_limit: the top commit from which scanning begins
     :param lower_limit: the bottom commit where scanning the version
                         tree ends; if None, scan will continue until
                         the very first reachable commit
+    :param tag_index: optional; tag index, as returned by get_tag_index().
+                      Built on demand when omitted
+    :param shallow: optional; ids of the shallow commits, where
+                    the history is reported to be truncated
     :return: an OrderedDict object with keys being tag names (string)
-             and values being a list of git.Commit objects
+             and values being CommitStore objects (sequences of commits)
     """
+    return collections.OrderedDict(iter_version_tree(
+        backend, options, upper_limit, lower_limit, tag_index, shallow))
+
+
+# pylint: disable=too-many-arguments
+def iter_version_tree(backend, options, upper_limit, lower_limit,
+                      tag_index=None, shallow=()):
+    """
+    Scan the version tree and return (yield) the releases one by one,
+    as soon as the walk crosses the release boundary.
+
+    The scan is a sequence of events - tuples (tags, commit, kept) - coming
+    either from the walk or from the cache; tags start a new release,
+    kept commits are recorded for the current release. With a release
+    window (--last-releases, --versions) the walk stops as soon as the
+    requested releases are complete.
+
+    :param backend: history backend (see gcg.backends) to walk with
+    :param options: command-line options as specified by the user
+    :param upper_limit: the top commit from which scanning begins
+    :param lower_limit: the bottom commit where scanning the version
+                        tree ends; if None, scan will continue until
+                        the very first reachable commit
+    :param tag_index: optional; tag index, as returned by get_tag_index().
+                      Built on demand when omitted
+    :param shallow: optional; ids of the shallow commits (see gcg.clones),
+                    where the history is reported to be truncated
+    :return: (yield) tuple (tag name, CommitStore); tag name is an empty
+             string for the commits above the most recent release
+    """
+    tag_filter = TagFilter(None, options.tag_prefix)
+    if tag_index is None:
+        tag_index = get_tag_index(backend, tag_filter)
+    window = ReleaseWindow.from_options(options, tag_filter)
+
+    cached = None
+    if getattr(options, 'cache', False) and window is None:
+        cached = load_cached_history(
+            backend, options, upper_limit, lower_limit, tag_index)
+    if cached is not None and cached.tip == upper_limit.hexsha:
+        logging.info("Using cached history of %s", cached.tip)
+        for release in cached.entries.items():
+            yield release
+        return
+
+    jobs = getattr(options, 'jobs', 1)
+    if cached is None and jobs > 1 and not can_fork():
+        logging.info("Worker processes can't be started; walking the "
+                     "history serially")
+        jobs = 1
+    if cached is None and jobs > 1:
+        releases = iter_parallel_version_tree(
+            backend, options, upper_limit, lower_limit, tag_index, shallow)
+    else:
+        releases = iter_serial_version_tree(
+            backend, options, upper_limit, lower_limit, tag_index, shallow,
+            cached)
+    for release in releases:
+        yield release
+
+
+# pylint: disable=too-many-arguments
+def iter_parallel_version_tree(backend, options, upper_limit, lower_limit,
+                               tag_index, shallow=()):
+    """
+    Same as iter_version_tree(), with the releases collected by a pool
+    of worker processes (see gcg.parallel)
+    :param backend: history backend (see gcg.backends) to walk with
+    :param options: command-line options as specified by the user
+    :param upper_limit: the top commit from which scanning begins
+    :param lower_limit: the bottom commit of the scan (or None)
+    :param tag_index: tag index, as returned by get_tag_index()
+    :param shallow: optional; ids of the shallow commits
+    :return: (yield) tuple (tag name, CommitStore)
+    """
+    window = ReleaseWindow.from_options(
+        options, TagFilter(None, options.tag_prefix))
+    use_cache = getattr(options, 'cache', False) and window is None
+    first_parent = getattr(options, 'first_parent', False)
+    ranges = ReleaseRanges(
+        backend.iter_commit_ids(upper_limit, lower_limit,
+                                first_parent=first_parent),
+        tag_index, window, shallow)
+    # only needed (and kept in memory) to write the cache
     entries = collections.OrderedDict()
-    curr_entry = list()
+    for (curr_tag, curr_entry) in iter_parallel_releases(
+            backend, options, ranges, getattr(options, 'jobs', 1),
+            lower_limit):
+        if use_cache:
+            entries[curr_tag] = curr_entry
+        yield (curr_tag, curr_entry)
+    if use_cache:
+        ChangelogCache(backend, options, lower_limit).save(CachedHistory(
+            upper_limit.hexsha, entries, tag_index, ranges.max_date))
+
+
+# pylint: disable=too-many-arguments,too-many-locals
+def iter_serial_version_tree(backend, options, upper_limit, lower_limit,
+                             tag_index, shallow=(), cached=None):
+    """
+    Same as iter_version_tree(), walking the history in this process
+    :param backend: history backend (see gcg.backends) to walk with
+    :param options: command-line options as specified by the user
+    :param upper_limit: the top commit from which scanning begins
+    :param lower_limit: the bottom commit of the scan (or None)
+    :param tag_index: tag index, as returned by get_tag_index()
+    :param shallow: optional; ids of the shallow commits
+    :param cached: optional; CachedHistory object to build upon (see
+                   load_cached_history()); only the commits above its
+                   top commit are walked then
+    :return: (yield) tuple (tag name, CommitStore)
+    """
+    curr_entry = CommitStore()
     curr_tag = ''
     bugtracking_regexp = re.compile(options.bug_tracking_pattern, re.MULTILINE)
-    tag_filter = TagFilter(None, options.tag_prefix)
-
-    for commit in repo_iterate(repo, upper_limit, lower_limit):
-        logging.debug("Processing commit %s (%s)", commit.hexsha,
-                      commit_headline(commit))
-        tags = tag_filter.matching_only(get_commit_tags(client, commit))
+    window = ReleaseWindow.from_options(
+        options, TagFilter(None, options.tag_prefix))
+    use_cache = getattr(options, 'cache', False) and window is None
+    expand = getattr(options, 'expand_merges', False)
+    events = []
+    max_date = 0
+    if cached is not None:
+        walked = list(walk_history(backend, options, upper_limit, lower_limit,
+                                   [cached.tip]))
+        mainline = [x[0] for x in walked] if expand else walked
+        # the walk is ordered by date; history which doesn't fit on top
+        # of the cached part would be interleaved with it
+        if all(x.committed_date >= cached.max_date for x in mainline):
+            logging.info("Reusing cached history of %s; %d new commit(s)",
+                         cached.tip, len(mainline))
+            events = itertools.chain(
+                walk_events(walked, tag_index, options, bugtracking_regexp,
+                            expand),
+                cached.replay())
+            max_date = cached.max_date
+        else:
+            logging.info("New commits predate the cached history")
+            cached = None
+    if cached is None:
+        events = walk_events(
+            walk_history(backend, options, upper_limit, lower_limit),
+            tag_index, options, bugtracking_regexp, expand)
+
+    # only needed (and kept in memory) to write the cache
+    entries = collections.OrderedDict()
+    for (tags, commit, kept) in events:
+        if commit is not None:
+            max_date = max(max_date, commit.committed_date)
         if tags:
-            if curr_entry:
-                entries[curr_tag] = curr_entry
+            if curr_entry and (window is None or window.selects(curr_tag)):
+                if use_cache:
+                    entries[curr_tag] = curr_entry
+                yield (curr_tag, curr_entry)
             # TODO: handle more tags pointing to the same commit (somehow)
             curr_tag = tags[0]
-            curr_entry = list()
-
-        if not commit_filtered_out(commit, options, bugtracking_regexp):
+            curr_entry = CommitStore()
+            if window is not None and window.complete(curr_tag):
+                logging.info("Requested releases complete at %s", curr_tag)
+                break
+
+        if commit is not None and commit.hexsha in shallow:
+            report_truncation(commit.hexsha, curr_tag)
+        if kept:
             curr_entry.append(commit)
-    if curr_entry:
+    if curr_entry and (window is None or window.selects(curr_tag)):
         entries[curr_tag] = curr_entry
-    return entries
-
+        yield (curr_tag, curr_entry)
 
-def resolve_commit_from_arguments(repo, options, arg_name):
-    """
-    Resolve a reference to a commit (by branch name, label or sha)
-    to an actual commit id
-    :param arg_name: name of the command-line argument to resolve
-    :param options: command-line options
-    :param repo: reference to a repository (initialized)
-    :returns: a commit id as string
-    :raises: ValueError when the reference cannot be found within the repo
-    """
-    retval = None
-    ref = getattr(options, arg_name)
-    if ref is not None:
-        invalid_commit_msg = "Value of argument --%s does not not resolve " \
-                             "to a valid commit in this repository"
-        try:
-            retval = repo.commit(ref)
-            logging.info("Commit referred to as '%s' (%s) resolved to %s",
-                         arg_name, ref, retval.hexsha)
-        except git.BadName as exc:
-            logging.error(invalid_commit_msg, arg_name)
-            raise ValueError(exc)
-        except ValueError:
-            logging.error(invalid_commit_msg, arg_name)
-            raise
-    return retval
+    if use_cache:
+        ChangelogCache(backend, options, lower_limit).save(CachedHistory(
+            upper_limit.hexsha, entries, tag_index, max_date))
@@ -11,4 +11,5 @@ REPO_PATH_INVALID = 11
 REPO_PATH_NOT_REPO = 12
 INVALID_VCS_LIMITS = 13
 PROCESSING_FAILED = 20
+BATCH_JOBS_FAILED = 21
 UNHANDLED_EXCEPTION = 255
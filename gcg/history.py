@@ -0,0 +1,560 @@
+#!/usr/bin/env python2
+
+"""
+Retrieval of the commit history from Git.
+
+Commits are streamed from a single 'git log' process and parsed
+incrementally into lightweight records, so the history can be walked
+without per-commit object database lookups.
+"""
+
+import collections
+import functools
+import itertools
+import logging
+import subprocess
+
+# Fields requested from 'git log', separated by NUL characters. Commit
+# messages cannot contain NULs, which makes the format delimiter-safe.
+LOG_FIELDS = ('%H', '%P', '%an', '%ae', '%at', '%ct', '%B')
+READ_CHUNK_SIZE = 256 * 1024
+# 'git log' options of the walks retrieving the changed paths as well
+# (no rename detection: it would need the blobs, possibly missing in
+# partial clones)
+PATH_LOG_ARGS = ('--format=%x00' + '%x00'.join(LOG_FIELDS), '-z',
+                 '--name-only', '--no-renames', '--diff-merges=first-parent')
+
+Author = collections.namedtuple('Author', ['name', 'email'])
+# a commit known by its id and date only (e.g. one filtered out by git)
+CommitStub = collections.namedtuple('CommitStub', ['hexsha', 'committed_date'])
+
+
+class CommitRecord(object):
+    """
+    Plain commit data, as much of it as the changelog needs.
+    Attribute names follow git.Commit so both can be used interchangeably
+    by the filters and templates.
+    """
+    __slots__ = ('hexsha', 'parents', 'author', 'authored_date',
+                 'committed_date', 'message')
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, hexsha, parents, author, authored_date,
+                 committed_date, message):
+        self.hexsha = hexsha
+        self.parents = parents
+        self.author = author
+        self.authored_date = authored_date
+        self.committed_date = committed_date
+        self.message = message
+
+    @property
+    def parent_count(self):
+        """Number of parents"""
+        return len(self.parents)
+
+    def __str__(self):
+        return self.hexsha
+
+    def __repr__(self):
+        return '<CommitRecord {}>'.format(self.hexsha)
+
+    @classmethod
+    def from_fields(cls, fields):
+        """
+        Create a record out of raw 'git log' fields (see LOG_FIELDS)
+        :param fields: list of byte strings, one per field
+        :return: a CommitRecord object
+        """
+        (hexsha, parents, name, email, adate, cdate, message) = [
+            x.decode('utf-8', 'replace') for x in fields]
+        return cls(hexsha, tuple(parents.split()), Author(name, email),
+                   int(adate), int(cdate), message)
+
+
+def split_fields(chunks, count):
+    """
+    Split a stream of NUL-separated data into groups of fields
+    :param chunks: iterable of byte strings, as read from the process
+    :param count: number of fields per group
+    :return: (yield) lists of byte strings with 'count' elements each
+    """
+    fields = []
+    pending = b''
+    for chunk in chunks:
+        parts = (pending + chunk).split(b'\0')
+        pending = parts.pop()
+        for part in parts:
+            fields.append(part)
+            if len(fields) == count:
+                yield fields
+                fields = []
+
+
+def iter_log_fields(client, fields, refs, *args):
+    """
+    Run 'git log' with a NUL-separated format and return (yield)
+    the fields of each commit as they are read
+
+    :param client: an initialized git.Git() object to query with
+    :param fields: sequence of format placeholders, e.g. ('%H', '%ct')
+    :param refs: revision range, as accepted by 'git log'
+    :param args: optional, extra 'git log' options
+    :return: list of byte strings, one per field
+    :raises: ValueError when git reports a failure
+    """
+    chunks = iter_log_output(
+        client, ('--format=' + '%x00'.join(fields), '-z') + args + (refs,))
+    try:
+        for values in split_fields(chunks, len(fields)):
+            yield values
+    finally:
+        chunks.close()
+
+
+def iter_log_output(client, args, pathspecs=(), revisions=None):
+    """
+    Run 'git log' and return (yield) its output as it's read; git is
+    stopped early when the consumer doesn't need the rest of the output
+
+    :param client: an initialized git.Git() object to query with
+    :param args: 'git log' arguments, including the revision range
+    :param pathspecs: optional; paths limiting the walk
+    :param revisions: optional; list of revisions passed on the standard
+                      input (--stdin), e.g. too many for the command line
+    :return: byte strings
+    :raises: ValueError when git reports a failure
+    """
+    if revisions is None:
+        process = client.log(*(tuple(args) + ('--',) + tuple(pathspecs)),
+                             as_process=True)
+    else:
+        process = client.log(
+            *(tuple(args) + ('--stdin', '--') + tuple(pathspecs)),
+            as_process=True, istream=subprocess.PIPE)
+        # git reads all the revisions before it writes anything
+        process.stdin.write(''.join(
+            x + '\n' for x in revisions).encode('ascii'))
+        process.stdin.close()
+    chunks = iter(functools.partial(process.stdout.read, READ_CHUNK_SIZE),
+                  b'')
+    finished = False
+    try:
+        for chunk in chunks:
+            yield chunk
+        finished = True
+    finally:
+        if not finished:
+            # consumer stopped early; no need to let git finish the walk
+            process.proc.kill()
+    import git
+    try:
+        process.wait()
+    except git.GitCommandError as exc:
+        raise ValueError(exc)
+
+
+def iter_commit_records(client, refs, *args):
+    """
+    Return (yield) commit records for the given revision range, in the
+    order 'git log' (and 'git rev-list') would list them
+
+    :param client: an initialized git.Git() object to query with
+    :param refs: revision range, as accepted by 'git log'
+    :param args: optional, extra 'git log' options
+    :return: a CommitRecord object
+    :raises: ValueError when git reports a failure
+    """
+    for fields in iter_log_fields(client, LOG_FIELDS, refs, *args):
+        yield CommitRecord.from_fields(fields)
+
+
+def iter_listed_commits(client, hexshas):
+    """
+    Retrieve the records of the given commits, without walking their
+    history
+
+    :param client: an initialized git.Git() object to query with
+    :param hexshas: list of commit ids
+    :return: (yield) a CommitRecord object per commit id, in the same order
+    :raises: ValueError when git reports a failure
+    """
+    chunks = iter_log_output(
+        client, ('--format=' + '%x00'.join(LOG_FIELDS), '-z',
+                 '--no-walk=unsorted'), revisions=hexshas)
+    try:
+        for fields in split_fields(chunks, len(LOG_FIELDS)):
+            yield CommitRecord.from_fields(fields)
+    finally:
+        chunks.close()
+
+
+def iter_commit_stubs(client, refs, *args):
+    """
+    Same as iter_commit_records(), but retrieve only the commit ids
+    and dates; that's a fraction of the data of the full records
+
+    :param client: an initialized git.Git() object to query with
+    :param refs: revision range, as accepted by 'git log'
+    :param args: optional, extra 'git log' options
+    :return: a CommitStub object
+    :raises: ValueError when git reports a failure
+    """
+    for (hexsha, cdate) in iter_log_fields(client, ('%H', '%ct'), refs,
+                                           *args):
+        yield CommitStub(hexsha.decode('ascii'), int(cdate))
+
+
+def iter_filtered_commits(client, refs, filter_args, marks, *args):
+    """
+    Walk the revision range with commit filtering done by git.
+
+    Only the commits which pass the filters are retrieved, as full records.
+    The marked commits (e.g. the ones with a release tag) are looked up
+    directly, and those filtered out are returned as stubs at their place
+    in the walk (see place_marked_commits()), so the release boundaries
+    are still known.
+
+    :param client: an initialized git.Git() object to query with
+    :param refs: revision range, as accepted by 'git log'
+    :param filter_args: 'git log' commit limiting options (e.g. --no-merges)
+    :param marks: ids of the commits to keep the position of; they
+                  must be reachable from the top of the range and not
+                  from its bottom, the rest is up to the walk (e.g.
+                  the mainline of a --first-parent walk)
+    :param args: optional, extra 'git log' options
+    :return: (yield) a CommitRecord or a CommitStub object
+    :raises: ValueError when git reports a failure or the walks don't agree
+    """
+    marked = list(iter_listed_commits(client, sorted(marks))) if marks \
+        else []
+    survivors = iter_commit_records(client, refs, *(args + tuple(filter_args)))
+    for commit in place_marked_commits(
+            survivors, marked, WalkOrder(client, refs, args),
+            '--first-parent' in args):
+        yield commit
+
+
+class WalkOrder(object):
+    """
+    Positions of the commits in a walk among the commits of the same date,
+    asked from git date by date; git stops walking at the older commits
+    """
+
+    def __init__(self, client, refs, args):
+        """
+        :param client: an initialized git.Git() object to query with
+        :param refs: revision range, as accepted by 'git log'
+        :param args: extra 'git log' options of the walk
+        """
+        self.client = client
+        self.refs = refs
+        self.args = tuple(args)
+        self.dates = {}
+
+    def listed(self, date):
+        """
+        :param date: commit date (seconds since the epoch)
+        :return: True if the commits of the date were asked for already
+        """
+        return date in self.dates
+
+    def positions(self, date, start=None):
+        """
+        :param date: commit date (seconds since the epoch)
+        :param start: optional; commit of the walk to walk from instead
+                      of the top of the range, when the walk is a chain
+                      (--first-parent); the commits of the date above it
+                      may be left out then
+        :return: dict; ids of the walked commits of the date mapped
+                 to their position in the walk
+        :raises: ValueError when git reports a failure
+        """
+        if date not in self.dates:
+            args = ('--since=@{}'.format(date),
+                    '--until=@{}'.format(date)) + self.args
+            refs = self.refs
+            if start is not None:
+                (low, _, _) = refs.rpartition('..')
+                refs = start
+                if low:
+                    args += ('^' + low,)
+            self.dates[date] = dict(
+                (hexsha.decode('ascii'), position)
+                for (position, (hexsha,)) in enumerate(iter_log_fields(
+                    self.client, ('%H',), refs, *args)))
+        return self.dates[date]
+
+    def precedes(self, first, second):
+        """
+        :param first: a commit (CommitRecord object)
+        :param second: another commit, which is in the walk
+        :return: True if 'first' comes before 'second' in the walk
+                 or isn't in the walk at all
+        :raises: ValueError when 'second' isn't in the walk
+        """
+        if first.committed_date != second.committed_date:
+            return first.committed_date > second.committed_date
+        positions = self.positions(first.committed_date)
+        if second.hexsha not in positions:
+            raise ValueError("Commit {} is out of the walk order".format(
+                second.hexsha))
+        return positions.get(first.hexsha, -1) < positions[second.hexsha]
+
+
+def place_marked_commits(survivors, marked, order, first_parent=False):
+    """
+    Merge marked commits into the filtered walk they may be missing from.
+
+    The walk is ordered by the commit dates, so the commits are placed
+    by theirs; git is asked for the order of the commits of the same
+    date only (see WalkOrder). Commits dated before their parents (clock
+    skew) may be misplaced. The marked commits are reachable, but a
+    --first-parent walk leaves out the ones off the mainline: a marked
+    commit is kept then if it's the first parent of a commit placed
+    before it, or git lists it among the commits of its date.
+
+    :param survivors: generator of CommitRecord objects (the filtered walk)
+    :param marked: CommitRecord objects of the marked commits
+    :param order: WalkOrder object of the (unfiltered) walk
+    :param first_parent: optional; True for a --first-parent walk
+    :return: (yield) a survivor, or a stub for a marked commit filtered out
+    :raises: ValueError when the walks don't agree
+    """
+    tied = collections.Counter(x.committed_date for x in marked)
+    pending = collections.deque(sorted(marked, key=lambda x: (
+        -x.committed_date,
+        order.positions(x.committed_date).get(x.hexsha, -1)
+        if tied[x.committed_date] > 1 else 0)))
+    walked = set()
+    # first parents of the commits placed, and the one placed last
+    mainline = set()
+    last = [None]
+
+    def place(commit):
+        """Record the commit is placed and return it"""
+        walked.add(commit.hexsha)
+        mainline.update(commit.parents[:1])
+        last[0] = commit.hexsha
+        return commit
+
+    def walks(commit):
+        """True if the marked commit is (still) to be placed"""
+        if commit.hexsha in walked:
+            return False
+        date = commit.committed_date
+        if first_parent and commit.hexsha not in mainline:
+            # the mainline goes on from the commit placed last
+            return commit.hexsha in order.positions(date, last[0])
+        return not order.listed(date) or \
+            commit.hexsha in order.positions(date)
+
+    try:
+        # None stands for the end of the walk, where the rest is placed
+        for commit in itertools.chain(survivors, [None]):
+            while pending and (commit is None or (
+                    pending[0].hexsha != commit.hexsha and
+                    order.precedes(pending[0], commit))):
+                mark = pending.popleft()
+                if walks(mark):
+                    place(mark)
+                    yield CommitStub(mark.hexsha, mark.committed_date)
+            if commit is not None:
+                if pending and pending[0].hexsha == commit.hexsha:
+                    pending.popleft()
+                yield place(commit)
+    finally:
+        survivors.close()
+
+
+def merge_walks(stubs, survivors, hexsha):
+    """
+    Merge a filtered walk into the full walk it's a subset of
+    :param stubs: iterable of CommitStub objects (the full walk)
+    :param survivors: generator of commits (the filtered walk)
+    :param hexsha: callable returning the commit id of a survivor
+    :return: (yield) a survivor, or a stub for the commits filtered out
+    :raises: ValueError when the walks don't agree
+    """
+    try:
+        upcoming = next(survivors, None)
+        for stub in stubs:
+            if upcoming is not None and hexsha(upcoming) == stub.hexsha:
+                yield upcoming
+                upcoming = next(survivors, None)
+            else:
+                yield stub
+        if upcoming is not None:
+            raise ValueError("Commit {} is out of the walk order".format(
+                hexsha(upcoming)))
+    finally:
+        survivors.close()
+
+
+def iter_commit_paths(client, refs, *args):
+    """
+    Same as iter_commit_records(), but also retrieve the paths changed
+    by each commit. Merge commits are compared with their first parent.
+
+    :param client: an initialized git.Git() object to query with
+    :param refs: revision range, as accepted by 'git log'
+    :param args: optional, extra 'git log' options
+    :return: (yield) tuple (CommitRecord object, tuple of paths)
+    :raises: ValueError when git reports a failure
+    """
+    for item in split_commit_paths(
+            iter_log_output(client, PATH_LOG_ARGS + args + (refs,))):
+        yield item
+
+
+def iter_limited_commit_paths(client, refs, pathspecs, *args):
+    """
+    Same as iter_commit_paths(), but only the paths matching the pathspecs
+    are reported and the commits not changing any of them are returned
+    as stubs, with no paths. Git limits the walk to the paths, which is
+    fast with the changed-path Bloom filters of the commit-graph; a full
+    walk of stubs is run side by side to keep the position of every commit.
+
+    :param client: an initialized git.Git() object to query with
+    :param refs: revision range, as accepted by 'git log'
+    :param pathspecs: list of paths (git pathspecs) to limit the walk to
+    :param args: optional, extra 'git log' options
+    :return: (yield) tuple (CommitRecord or CommitStub object, paths)
+    :raises: ValueError when git reports a failure or the walks don't agree
+    """
+    survivors = split_commit_paths(iter_log_output(
+        client, PATH_LOG_ARGS + ('--full-history',) + args + (refs,),
+        pathspecs))
+    for item in merge_walks(iter_commit_stubs(client, refs, *args),
+                            survivors, lambda x: x[0].hexsha):
+        if isinstance(item, CommitStub):
+            item = (item, ())
+        yield item
+
+
+def split_commit_paths(chunks):
+    """
+    Parse the output of 'git log' run with PATH_LOG_ARGS.
+
+    Each record is preceded by an empty field (paths are never empty),
+    so the variable-length list of paths ends where the next record
+    begins.
+
+    :param chunks: generator of byte strings, as read from the process
+    :return: (yield) tuple (CommitRecord object, tuple of paths)
+    """
+    record = None
+    paths = []
+    try:
+        for (field, ) in split_fields(chunks, 1):
+            if record is not None and len(record) < len(LOG_FIELDS):
+                record.append(field)
+            elif not field:
+                if record is not None:
+                    yield (CommitRecord.from_fields(record), tuple(paths))
+                record = []
+                paths = []
+            else:
+                if not paths and field.startswith(b'\n'):
+                    # the list of paths is separated by a line break
+                    field = field[1:]
+                paths.append(field.decode('utf-8', 'replace'))
+    finally:
+        chunks.close()
+    if record is not None:
+        yield (CommitRecord.from_fields(record), tuple(paths))
+
+
+def commit_filtered_out(commit, options, bugtracking_regex):
+    """
+    Decide if commit should be processed or not
+
+    :param commit: Commit to be inspected
+    :param options: command-line options
+    :param bugtracking_regex: regular expression object to match
+                              against the commit message. Only used if
+                              options.bug_tracking_only evaluates to True
+    :return: True / False
+    """
+    retval = False
+    if options.exclude_merges and len(commit.parents) > 1:
+        logging.info("Ignoring merge commit %s", commit)
+        retval = True
+    elif options.bug_tracking_only:
+        if not bugtracking_regex.match(commit.message):
+            logging.info("Ignoring commit %s (no bug reference)", commit)
+            retval = True
+    return retval
+
+
+def walk_merged_commits(backend, high, low=None, exclude=None):
+    """
+    Walk the history with the commits the mainline commits brought in
+    (see --expand-merges), with a single walk
+    :param backend: history backend (see gcg.backends) to walk with
+    :param high: id of the top commit of the walk
+    :param low: optional; commit whose history is not walked
+    :param exclude: optional; list of other commits whose history
+                    is not walked
+    :return: iterator of tuples, as returned by iter_mainline_groups()
+    """
+    return iter_mainline_groups(
+        backend.iter_commits(high, low, exclude, date_order=True), high)
+
+
+def iter_mainline_groups(commits, top):
+    """
+    Split a walk into the mainline (the first parents, from the top
+    commit down) and the commits brought in by each mainline commit:
+    those reachable from it, but not from its first parent.
+
+    A commit is brought in by the lowest mainline commit it's reachable
+    from through the other parents; that's found by passing the number
+    of the mainline commit on from the children to the parents, which
+    needs the children walked first (git log --date-order). Groups are
+    returned as soon as no commit left in the walk can join them.
+
+    :param commits: iterable of commits (CommitRecord), no commit before
+                    all its children
+    :param top: id of the top commit of the walk
+    :return: (yield) tuple (mainline commit, list of the commits it
+             brought in, in the walk order)
+    :raises: ValueError when a commit comes before its children
+    """
+    mainline = []
+    groups = []
+    # parents yet to be walked: k: commit id, v: mainline number
+    pending = {}
+    counts = collections.Counter()
+    expected = top
+    done = 0
+    for commit in commits:
+        number = pending.pop(commit.hexsha, None)
+        if number is not None:
+            counts[number] -= 1
+        if commit.hexsha == expected:
+            number = len(mainline)
+            mainline.append(commit)
+            groups.append([])
+            expected = commit.parents[0] if commit.parents else None
+            parents = commit.parents[1:]
+        elif number is None:
+            raise ValueError("Commit {} is out of the walk order".format(
+                commit.hexsha))
+        else:
+            groups[number].append(commit)
+            parents = commit.parents
+        for parent in parents:
+            previous = pending.get(parent)
+            if previous is None or previous < number:
+                if previous is not None:
+                    counts[previous] -= 1
+                pending[parent] = number
+                counts[number] += 1
+        while done < len(mainline) and not counts[done]:
+            yield (mainline[done], groups[done])
+            groups[done] = None
+            done += 1
+    # the rest have parents which aren't walked (e.g. hidden ones)
+    for number in range(done, len(mainline)):
+        yield (mainline[number], groups[number])
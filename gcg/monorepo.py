@@ -0,0 +1,386 @@
+#!/usr/bin/env python2
+
+"""
+Monorepo mode: changelogs of many components (sub-packages) living in
+one repository, each restricted to its own paths, out of a single walk
+of the history.
+
+Every commit is routed to each component whose paths it changes.
+Components have their own release tags (typically told apart by the tag
+prefix), so the history is split into releases separately per component.
+"""
+
+from __future__ import print_function
+
+import argparse
+import collections
+import fnmatch
+import logging
+import os
+import re
+import sys
+
+import git
+import jinja2
+
+import gcg.entrypoint
+import gcg.errors as err
+from gcg.backends import GitCliBackend
+from gcg.clones import prepare_clone, report_truncation
+from gcg.batch import job_arguments, read_document
+from gcg.commit_graph import prepare_commit_graph
+from gcg.commit_store import CommitStore
+from gcg.history import commit_filtered_out, iter_commit_paths, \
+    iter_limited_commit_paths
+from gcg.records import RECORD_FORMATS
+from gcg.release_headers import collate_entry_header_data
+from gcg.scope import resolve_commit_from_arguments
+from gcg.tag_filter import TagFilter
+from gcg.tag_index import get_tag_indexes
+
+# options affecting the walk itself; the same for all components
+SHARED_OPTIONS = ('path', 'until', 'since', 'exclude_merges',
+                  'bug_tracking_only', 'bug_tracking_pattern', 'commit_graph',
+                  'first_parent')
+UNSUPPORTED_OPTIONS = ('last_releases', 'versions', 'cache', 'update', 'stats',
+                       'profile_out', 'jobs', 'expand_merges')
+GLOB_CHARACTERS = re.compile(r'[*?[]')
+
+
+def parse_args(argv):
+    """Parse user's command-line parameters
+
+    :param argv: User arguments
+    :returns: object with configuration (as provided by argparse)
+    """
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+        description="Generate changelogs of many components of one "
+                    "repository out of a single history walk.",
+        epilog="""
+        The manifest is a JSON (or YAML, if PyYAML is available) object
+        with a list of 'components' and optional common gcg 'options'
+        (spelled as in batch mode manifests, e.g. output_format).
+        A component has a 'name', a list of 'paths' (relative to the
+        repository top directory; directories or glob patterns), an
+        'output_file' and, optionally, its own gcg options such as
+        tag_prefix. Relative file paths are relative to the manifest
+        location.
+        """
+    )
+    parser.add_argument(
+        'manifest',
+        help="""Path of the manifest file""",
+        type=str, action="store",
+    )
+    parser.add_argument(
+        '-v', '--verbose',
+        help="Verbosity level. Specify twice for debug logs as well.",
+        action="count", default=0
+    )
+    return parser.parse_args(argv)
+
+
+class Component(object):
+    """
+    A part of the repository with its own changelog
+    """
+
+    def __init__(self, name, pathspecs, options):
+        """
+        :param name: name of the component
+        :param pathspecs: list of directories (or glob patterns) the
+                          component consists of
+        :param options: gcg command-line options of the component
+        """
+        self.name = name
+        self.options = options
+        self.prefixes = []
+        self.patterns = []
+        for spec in pathspecs:
+            spec = spec.strip('/')
+            if spec.startswith('./'):
+                spec = spec[len('./'):]
+            if GLOB_CHARACTERS.search(spec):
+                self.patterns.append(spec)
+            elif spec in ('', '.'):
+                self.prefixes.append('')
+            else:
+                self.prefixes.append(spec + '/')
+
+    def pathspecs(self):
+        """
+        :return: list of git pathspecs matching the component's paths;
+                 None when the component spans the whole repository
+        """
+        if '' in self.prefixes:
+            return None
+        return [x.rstrip('/') for x in self.prefixes] + self.patterns
+
+    def touches(self, paths):
+        """
+        Check if any of the paths belongs to the component
+        :param paths: sequence of paths, relative to the top directory
+        :return: True or False
+        """
+        for path in paths:
+            for prefix in self.prefixes:
+                if (path + '/').startswith(prefix):
+                    return True
+            for pattern in self.patterns:
+                if fnmatch.fnmatchcase(path, pattern) or \
+                        fnmatch.fnmatchcase(path, pattern + '/*'):
+                    return True
+        return False
+
+
+class ComponentHistory(object):
+    """
+    Releases of a single component, collected while walking the history
+    """
+
+    def __init__(self, tag_index):
+        """
+        :param tag_index: tag index of the component's releases, as
+                          returned by get_tag_index()
+        """
+        self.tag_index = tag_index
+        self.entries = collections.OrderedDict()
+        self._tag = ''
+        self._commits = CommitStore()
+
+    def add(self, commit, kept):
+        """
+        Register a commit of the walk
+        :param commit: a CommitRecord object
+        :param kept: True when the commit goes to the component's changelog
+        :return: n/a
+        """
+        tags = self.tag_index.get(commit.hexsha)
+        if tags:
+            self.close()
+            self._tag = tags[0]
+            self._commits = CommitStore()
+        if kept:
+            self._commits.append(commit)
+
+    def close(self):
+        """Finish the current release; empty releases are dropped"""
+        if self._commits:
+            self.entries[self._tag] = self._commits
+
+
+def load_components(path):
+    """
+    Load the components from the manifest file
+    :param path: manifest file path
+    :return: list of Component objects
+    :raises: ValueError when the manifest cannot be loaded, is malformed
+             or the components can't share a single walk
+    """
+    data = read_document(path)
+    if not isinstance(data, dict) or \
+            not isinstance(data.get('components'), list):
+        raise ValueError("the manifest should contain a list of components")
+    shared = data.get('options') or {}
+    basedir = os.path.dirname(os.path.abspath(path))
+
+    retval = []
+    for item in data['components']:
+        if not isinstance(item, dict) or 'name' not in item:
+            raise ValueError("each component needs a name")
+        for key in ('paths', 'output_file'):
+            if not item.get(key):
+                raise ValueError("component {} has no {}".format(
+                    item['name'], key))
+        job = dict(shared)
+        job.update((k, v) for (k, v) in item.items()
+                   if k not in ('name', 'paths'))
+        for key in UNSUPPORTED_OPTIONS:
+            if job.get(key):
+                raise ValueError("{} is not supported in monorepo "
+                                 "mode".format(key))
+        if job.get('backend', GitCliBackend.name) != GitCliBackend.name:
+            raise ValueError("monorepo mode supports the '{}' backend "
+                             "only".format(GitCliBackend.name))
+        options = gcg.entrypoint.parse_args(job_arguments(job, basedir))
+        pathspecs = item['paths']
+        if not isinstance(pathspecs, list):
+            pathspecs = [pathspecs]
+        retval.append(Component(item['name'], pathspecs, options))
+
+    for key in SHARED_OPTIONS:
+        if len(set(getattr(x.options, key) for x in retval)) > 1:
+            raise ValueError("'{}' must be the same for all "
+                             "components".format(key))
+    return retval
+
+
+def walk_components(backend, components, upper_limit, lower_limit,
+                    limit_paths=False):
+    """
+    Walk the history, retrieving the paths changed by the commits
+    :param backend: a GitCliBackend object to query with
+    :param components: list of Component objects
+    :param upper_limit: the top commit from which scanning begins
+    :param lower_limit: the bottom commit where scanning ends (or None)
+    :param limit_paths: True to have git limit the walk to the components'
+                        paths; worth it with the changed-path Bloom filters
+                        of the commit-graph
+    :return: (yield) tuple (CommitRecord or CommitStub object, paths)
+    """
+    options = components[0].options
+    refs = upper_limit.hexsha
+    if lower_limit is not None:
+        refs = '{}..{}'.format(lower_limit.hexsha, upper_limit.hexsha)
+    pathspecs = []
+    for component in components:
+        if pathspecs is not None and component.pathspecs() is not None:
+            pathspecs.extend(x for x in component.pathspecs()
+                             if x not in pathspecs)
+        else:
+            pathspecs = None
+    args = ('--first-parent',) if options.first_parent else ()
+    if limit_paths and pathspecs is not None:
+        logging.info("Walking the history limited to the components' paths")
+        return iter_limited_commit_paths(backend.client, refs, pathspecs,
+                                         *args)
+    return iter_commit_paths(backend.client, refs, *args)
+
+
+def traverse_components(backend, components, commits, shallow=()):
+    """
+    Split the walked history into releases per component
+    :param backend: a GitCliBackend object to query with
+    :param components: list of Component objects
+    :param commits: the walk, as returned by walk_components()
+    :param shallow: optional; ids of the shallow commits, where
+                    the history is reported to be truncated
+    :return: list of OrderedDict objects (one per component); k: tag name,
+             v: CommitStore object
+    """
+    options = components[0].options
+    bugtracking_regexp = re.compile(options.bug_tracking_pattern,
+                                    re.MULTILINE)
+    tag_indexes = get_tag_indexes(
+        backend, [TagFilter(None, x.options.tag_prefix) for x in components])
+    histories = [ComponentHistory(x) for x in tag_indexes]
+
+    walked = 0
+    for (commit, paths) in commits:
+        walked += 1
+        if commit.hexsha in shallow:
+            report_truncation(commit.hexsha)
+        kept = bool(paths) and not commit_filtered_out(
+            commit, options, bugtracking_regexp)
+        for (component, history) in zip(components, histories):
+            history.add(commit, kept and component.touches(paths))
+    for history in histories:
+        history.close()
+    logging.info("Walked %d commit(s) for %d component(s)", walked,
+                 len(components))
+    return [x.entries for x in histories]
+
+
+def init_environments(components):
+    """
+    Prepare the Jinja environments of the components and check their
+    templates exist
+    :param components: list of Component objects
+    :return: dictionary; k: template directory, v: Jinja environment
+    :raises: jinja2.TemplateNotFound when a template is missing
+    """
+    environments = {}
+    for component in components:
+        template_dir = component.options.template_dir
+        if template_dir not in environments:
+            environments[template_dir] = gcg.entrypoint.init_jinja_env(
+                template_dir)
+        for output_format in component.options.output_format:
+            if output_format not in RECORD_FORMATS:
+                environments[template_dir].get_template(output_format)
+    return environments
+
+
+def generate_changelogs(backend, components):
+    """
+    Generate the changelogs of the components out of a single walk
+    :param backend: a GitCliBackend object to query with
+    :param components: list of Component objects
+    :return: exit code (see gcg.errors)
+    """
+    try:
+        environments = init_environments(components)
+    except jinja2.TemplateNotFound as exc:
+        logging.error("No template for output format '%s'", exc)
+        return err.INVALID_INPUT
+
+    common = components[0].options
+    try:
+        upper_limit = resolve_commit_from_arguments(backend, common, 'until')
+        lower_limit = resolve_commit_from_arguments(backend, common, 'since')
+    except ValueError as exc:
+        logging.error("Invalid input values for changelog scope; details: "
+                      "%s.", exc)
+        return err.INVALID_VCS_LIMITS
+
+    try:
+        clone = prepare_clone(backend.repo, backend.client)
+        graph = prepare_commit_graph(
+            backend.repo, backend.client, common.commit_graph,
+            all(x.pathspecs() is not None for x in components))
+        releases = traverse_components(
+            backend, components,
+            walk_components(backend, components, upper_limit, lower_limit,
+                            graph.path_limited_walk),
+            clone.shallow)
+        for (component, entries) in zip(components, releases):
+            logging.info("Rendering changelog of %s", component.name)
+            headers = collate_entry_header_data(
+                backend, entries, component.options)
+            for (output_format, output_file) in zip(
+                    component.options.output_format,
+                    component.options.output_file):
+                gcg.entrypoint.print_changelog(
+                    entries, headers, output_format, output_file,
+                    environments[component.options.template_dir])
+    except ValueError as exc:
+        logging.error("Program aborted; details: %s.", exc)
+        return err.PROCESSING_FAILED
+    return err.SUCCESS
+
+
+def main(argv=None):
+    """
+    Main entry point of the monorepo mode
+    :param argv: optional script parameters; default is to use sys.argv
+    :return: exit code (see gcg.errors)
+    """
+    if argv is None:
+        argv = sys.argv
+    options = parse_args(argv[1:])
+    logging.basicConfig(
+        level=gcg.entrypoint.log_level_from_verbosity(options.verbose),
+        format="[%(levelname)s] %(message)s")
+
+    try:
+        components = load_components(options.manifest)
+    except ValueError as exc:
+        logging.error("Invalid manifest %s; details: %s",
+                      options.manifest, exc)
+        return err.INVALID_INPUT
+    except SystemExit:
+        return err.ARGPARSE_FAILURE
+    if not components:
+        return err.SUCCESS
+
+    try:
+        # the walk relies on git reporting the changed paths
+        backend = GitCliBackend.open(components[0].options.path)
+    except git.NoSuchPathError as exc:
+        logging.error("Repository path does not exist; %s", exc)
+        return err.REPO_PATH_INVALID
+    except git.InvalidGitRepositoryError as exc:
+        logging.error("Repository path does not a Git repo make; %s", exc)
+        return err.REPO_PATH_NOT_REPO
+    return generate_changelogs(backend, components)
@@ -0,0 +1,187 @@
+#!/usr/bin/env python2
+
+"""
+Parallel traversal of the version tree (--jobs).
+
+The walk is split in two. The release boundaries are found first, by a
+walk retrieving the commit ids only; each release is the run of commits
+from its tag down to the next tag in the walk order, exactly as the serial
+traversal collects it. The commits of the releases are then retrieved,
+filtered and collated by a pool of worker processes, and the releases are
+put back together in the walk order.
+"""
+
+import logging
+import multiprocessing
+import re
+
+from gcg.backends import open_backend
+from gcg.clones import NO_FETCH_ENVIRONMENT, report_truncation
+from gcg.commit_store import CommitStore
+from gcg.history import commit_filtered_out, walk_merged_commits
+
+# releases with more commits are split among several workers
+PIECE_SIZE = 2000
+
+# per-process state of a worker (see init_worker())
+_WORKER = {}
+
+
+class ReleaseRanges(object):
+    """
+    Walk of the commit ids, split into releases: iteration yields tuples
+    (tag name, list of commit ids), in the walk order. Releases left out
+    by the release window are skipped and the walk stops as soon as
+    the window is complete.
+    """
+
+    def __init__(self, stubs, tag_index, window=None, shallow=()):
+        """
+        :param stubs: iterable of CommitStub objects, in the walk order
+        :param tag_index: tag index, as returned by get_tag_index()
+        :param window: optional; a ReleaseWindow object
+        :param shallow: optional; ids of the shallow commits, where
+                        the history is reported to be truncated
+        """
+        self.stubs = stubs
+        self.tag_index = tag_index
+        self.window = window
+        self.shallow = shallow
+        # most recent committer timestamp walked so far
+        self.max_date = 0
+
+    def __iter__(self):
+        curr_tag = ''
+        hexshas = []
+        for stub in self.stubs:
+            self.max_date = max(self.max_date, stub.committed_date)
+            tags = self.tag_index.get(stub.hexsha)
+            if tags:
+                if hexshas and self.selects(curr_tag):
+                    yield (curr_tag, hexshas)
+                curr_tag = tags[0]
+                hexshas = []
+                if self.window is not None and \
+                        self.window.complete(curr_tag):
+                    logging.info("Requested releases complete at %s",
+                                 curr_tag)
+                    return
+            if stub.hexsha in self.shallow:
+                report_truncation(stub.hexsha, curr_tag)
+            hexshas.append(stub.hexsha)
+        if hexshas and self.selects(curr_tag):
+            yield (curr_tag, hexshas)
+
+    def selects(self, tag):
+        """True when the release is to be put in the changelog"""
+        return self.window is None or self.window.selects(tag)
+
+
+def split_pieces(ranges, size):
+    """
+    Split the releases into pieces of work for the workers
+    :param ranges: iterable of tuples (tag name, list of commit ids)
+    :param size: maximum number of commits of a piece
+    :return: (yield) tuple (release number, tag name, list of commit ids)
+    """
+    for (index, (tag, hexshas)) in enumerate(ranges):
+        for start in range(0, len(hexshas), size):
+            yield (index, tag, hexshas[start:start + size])
+
+
+def init_worker(backend_name, path, options, exclude=()):
+    """
+    Prepare the worker process: open the repository and the filters
+    :param backend_name: history backend (see gcg.backends) to open
+    :param path: repository path
+    :param options: command-line options as specified by the user
+    :param exclude: optional; ids of the commits whose history is not
+                    walked (the lower limit of the traversal)
+    """
+    _WORKER['backend'] = open_backend(backend_name, path)
+    _WORKER['backend'].repo.git.update_environment(**NO_FETCH_ENVIRONMENT)
+    _WORKER['options'] = options
+    _WORKER['exclude'] = list(exclude)
+    _WORKER['regexp'] = re.compile(options.bug_tracking_pattern,
+                                   re.MULTILINE)
+
+
+def piece_commits(backend, hexshas, expand):
+    """
+    Retrieve the commits of a piece of a release
+    :param backend: history backend (see gcg.backends)
+    :param hexshas: ids of the (mainline) commits of the piece
+    :param expand: True to retrieve the commits brought in by the merges
+                   as well (see --expand-merges), with a single walk
+                   down to the first parent of the last commit
+    :return: iterator of tuples (commit, list of commits it brought in)
+    """
+    if not expand:
+        return ((x, []) for x in backend.commit_records(hexshas))
+    bottom = next(iter(backend.commit_records(hexshas[-1:])))
+    return walk_merged_commits(backend, hexshas[0], None,
+                               list(bottom.parents[:1]) + _WORKER['exclude'])
+
+
+def collect_piece(piece):
+    """
+    Retrieve and filter the commits of a piece of a release (in a worker)
+    :param piece: tuple (release number, tag name, list of commit ids)
+    :return: tuple (release number, tag name, CommitStore of the commits
+             which passed the filters)
+    """
+    (index, tag, hexshas) = piece
+    options = _WORKER['options']
+    expand = getattr(options, 'expand_merges', False)
+    store = CommitStore()
+    for (commit, merged) in piece_commits(_WORKER['backend'], hexshas,
+                                          expand):
+        commits = [commit]
+        if expand and commit.parent_count > 1:
+            commits = merged
+        for item in commits:
+            if not commit_filtered_out(item, options, _WORKER['regexp']):
+                store.append(item)
+    return (index, tag, store)
+
+
+def iter_parallel_releases(backend, options, ranges, jobs, lower_limit=None):
+    """
+    Collect the releases with a pool of worker processes and return
+    (yield) them in the walk order, as soon as each one is complete
+
+    :param backend: history backend (see gcg.backends) of the repository
+    :param options: command-line options as specified by the user
+    :param ranges: a ReleaseRanges object
+    :param jobs: number of worker processes
+    :param lower_limit: optional; the bottom commit of the traversal
+    :return: (yield) tuple (tag name, CommitStore); releases with no
+             commits left after filtering are skipped
+    """
+    exclude = [lower_limit.hexsha] if lower_limit is not None else []
+    pool = multiprocessing.Pool(jobs, init_worker,
+                                (backend.name, backend.git_dir, options,
+                                 exclude))
+    try:
+        (curr_index, curr_tag, curr_store) = (None, None, None)
+        for (index, tag, store) in pool.imap(
+                collect_piece, split_pieces(ranges, PIECE_SIZE)):
+            if index == curr_index:
+                curr_store.extend(store)
+                continue
+            if curr_store:
+                yield (curr_tag, curr_store)
+            (curr_index, curr_tag, curr_store) = (index, tag, store)
+        if curr_store:
+            yield (curr_tag, curr_store)
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def can_fork():
+    """
+    :return: False in processes which can't have child processes
+             (e.g. the workers of the batch mode)
+    """
+    return not multiprocessing.current_process().daemon
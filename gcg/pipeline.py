@@ -0,0 +1,50 @@
+#!/usr/bin/env python2
+
+"""
+Lazy evaluation of the changelog: releases are walked, collated and
+rendered one at a time, so the output can start before the history
+walk is finished and only a couple of releases are kept in memory.
+"""
+
+import collections
+
+
+class ReleaseStream(object):
+    """
+    Lazily evaluated replacement of the changelog entries (an OrderedDict
+    of tag name -> commits) and their headers, as used by the templates.
+
+    Iteration yields the tag names in order, while the commits
+    (stream[tag]) and the header (stream.headers[tag]) are available for
+    the most recent releases only. A window of two releases is kept as
+    Jinja may look one item ahead when iterating (e.g. for 'loop.last').
+    The stream can be iterated once.
+    """
+    WINDOW = 2
+
+    def __init__(self, releases, header_factory):
+        """
+        :param releases: iterable of tuples (tag name, commits), e.g. as
+                         returned by iter_version_tree()
+        :param header_factory: callable (tag name, commits) -> header data,
+                               called once per release
+        """
+        self._releases = releases
+        self._header_factory = header_factory
+        self._commits = collections.OrderedDict()
+        self.headers = collections.OrderedDict()
+
+    def __iter__(self):
+        for (version, commits) in self._releases:
+            self._commits[version] = commits
+            self.headers[version] = self._header_factory(version, commits)
+            while len(self._commits) > self.WINDOW:
+                (stale, _) = self._commits.popitem(last=False)
+                del self.headers[stale]
+            yield version
+
+    def __getitem__(self, version):
+        return self._commits[version]
+
+    def __contains__(self, version):
+        return version in self._commits
@@ -0,0 +1,77 @@
+#!/usr/bin/env python2
+
+"""
+Precompiled templates support.
+
+The built-in templates are compiled to Python modules at build time
+(see setup.py), so a run doesn't need to parse them; user templates
+are covered by an on-disk bytecode cache instead.
+"""
+
+import logging
+import os
+
+import jinja2
+
+from gcg.jinja_filters import FILTERS
+
+COMPILED_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            'templates_compiled')
+# compiled templates are only valid for the Jinja version which made them
+VERSION_FILE = 'jinja2.version'
+
+
+def compile_templates(target_dir=None):
+    """
+    Compile the built-in templates into Python modules
+    :param target_dir: optional; directory to write the modules to;
+                       COMPILED_DIR by default
+    :return: n/a
+    """
+    target_dir = target_dir or COMPILED_DIR
+    env = jinja2.Environment(loader=jinja2.PackageLoader('gcg'))
+    env.filters.update(FILTERS)
+    env.compile_templates(target_dir, zip=None, ignore_errors=False)
+    with open(os.path.join(target_dir, VERSION_FILE), 'w') as vfile:
+        vfile.write(jinja2.__version__)
+
+
+def module_loader(compiled_dir=None):
+    """
+    Provide a loader of the precompiled built-in templates
+    :param compiled_dir: optional; directory with the compiled templates;
+                         COMPILED_DIR by default
+    :return: a jinja2.ModuleLoader object or None when there are no
+             (usable) precompiled templates
+    """
+    compiled_dir = compiled_dir or COMPILED_DIR
+    try:
+        with open(os.path.join(compiled_dir, VERSION_FILE)) as vfile:
+            version = vfile.read().strip()
+    except IOError:
+        return None
+    if version != jinja2.__version__:
+        logging.debug("Templates precompiled with Jinja %s; ignoring them",
+                      version)
+        return None
+    return jinja2.ModuleLoader(compiled_dir)
+
+
+def bytecode_cache():
+    """
+    Provide the bytecode cache for the templates which are not
+    precompiled; it lives in the user's cache directory (XDG_CACHE_HOME).
+    Entries are validated against a checksum of the template source.
+    :return: a jinja2.FileSystemBytecodeCache object or None when
+             the cache directory is not available
+    """
+    base = os.environ.get('XDG_CACHE_HOME') or \
+        os.path.join(os.path.expanduser('~'), '.cache')
+    path = os.path.join(base, 'gcg', 'jinja2')
+    try:
+        if not os.path.isdir(path):
+            os.makedirs(path)
+    except OSError as exc:
+        logging.debug("Template bytecode cache not available: %s", exc)
+        return None
+    return jinja2.FileSystemBytecodeCache(path)
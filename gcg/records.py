@@ -0,0 +1,109 @@
+#!/usr/bin/env python2
+
+"""
+Machine-readable changelog output: a stream of records, one per release
+followed by one per commit of the release, rendered without templates.
+
+'jsonl' writes JSON Lines (a JSON object per line), 'msgpack' the same
+records as a sequence of MessagePack maps (requires the msgpack package).
+"""
+
+import json
+
+
+def jsonl_encoder():
+    """:return: callable turning a record into a JSON line"""
+    return lambda record: json.dumps(
+        record, ensure_ascii=False, separators=(',', ':')) + '\n'
+
+
+def msgpack_encoder():
+    """
+    :return: callable turning a record into MessagePack bytes
+    :raises: ValueError when msgpack is not installed
+    """
+    try:
+        import msgpack
+    except ImportError:
+        raise ValueError("msgpack is needed for the msgpack output format")
+    return msgpack.Packer(use_bin_type=True).pack
+
+
+# output format -> factory of the record encoder
+RECORD_FORMATS = {
+    'jsonl': jsonl_encoder,
+    'msgpack': msgpack_encoder,
+}
+# formats written as bytes rather than text
+BINARY_FORMATS = ('msgpack',)
+
+
+def release_record(version, header):
+    """
+    :param version: tag name of the release (empty for the current version)
+    :param header: release header, as returned by ReleaseHeaders
+    :return: dictionary; the release record
+    """
+    record = {'type': 'release', 'tag': version}
+    for (key, value) in header.items():
+        record[key] = value.isoformat() if key == 'date' else value
+    return record
+
+
+def commit_record(version, commit):
+    """
+    :param version: tag name of the release the commit belongs to
+    :param commit: a commit (CommitView or CommitRecord)
+    :return: dictionary; the commit record
+    """
+    return {
+        'type': 'commit',
+        'tag': version,
+        'hexsha': commit.hexsha,
+        'author': commit.author.name,
+        'email': commit.author.email,
+        'authored_date': commit.authored_date,
+        'committed_date': commit.committed_date,
+        'parent_count': commit.parent_count,
+        'message': commit.message,
+    }
+
+
+def iter_records(entries, headers):
+    """
+    :param entries: changelog entries (tag name -> commits), e.g.
+                    a ReleaseStream object
+    :param headers: release headers (dictionary with release tag as key)
+    :return: (yield) records (dictionaries): a release record followed
+             by the records of its commits, release by release
+    """
+    for version in entries:
+        yield release_record(version, headers[version])
+        for commit in entries[version]:
+            yield commit_record(version, commit)
+
+
+def generate_records(entries, headers, output_format, chunk_size):
+    """
+    Encode the changelog as records, as they are produced
+    :param entries: changelog entries (see iter_records())
+    :param headers: release headers (see iter_records())
+    :param output_format: one of RECORD_FORMATS
+    :param chunk_size: minimum size of the output parts
+    :return: (yield) consecutive parts of the output (strings, or bytes
+             for BINARY_FORMATS), each (but the last) at least chunk_size
+             long
+    """
+    encode = RECORD_FORMATS[output_format]()
+    empty = b'' if output_format in BINARY_FORMATS else ''
+    pending = []
+    size = 0
+    for record in iter_records(entries, headers):
+        pending.append(encode(record))
+        size += len(pending[-1])
+        if size >= chunk_size:
+            yield empty.join(pending)
+            pending = []
+            size = 0
+    if pending:
+        yield empty.join(pending)
@@ -0,0 +1,116 @@
+#!/usr/bin/env python2
+
+"""
+Release line information (headers) of the releases: version, author,
+email and the dates, in the representations the templates use.
+"""
+
+import logging
+from datetime import datetime
+
+
+def collate_entry_header_data(backend, entries, options):
+    """
+    :param backend: history backend (see gcg.backends)
+    :param entries: an OrderedDict object with keys being tag names (string)
+                    and values being sequences of commits (CommitStore)
+    :param options: user input parameters
+    :return: dictionary; k: tag name, v: object with properties
+                datetime
+    """
+    from tzlocal import get_localzone
+    headers = ReleaseHeaders(backend, options, get_localzone())
+    return dict((x, headers(x, entries[x])) for x in entries)
+
+
+class ReleaseHeaders(object):
+    """
+    Builder of the release line information (headers) of the releases.
+
+    Tag details (for --prefer-tags) of all the tags are retrieved with
+    a single query, when first needed; dates are formatted once per
+    distinct timestamp.
+    """
+
+    def __init__(self, backend, options, localtz):
+        """
+        :param backend: history backend (see gcg.backends)
+        :param options: user input parameters
+        :param localtz: a tzinfo object representing the local timezone
+        """
+        self.backend = backend
+        self.options = options
+        self.localtz = localtz
+        self._signatures = None
+        self._dates = {}
+
+    def __call__(self, version, commits):
+        """
+        Collect the release line information of a single release
+        :param version: tag name of the release (empty for the current
+                        version)
+        :param commits: sequence of commits of the release
+        :return: dictionary with date, date_rpm, date_deb, author, email,
+                 version and the deb_* values
+        """
+        if not version or (commits and not self.options.prefer_tags):
+            hdr = self.header_from_commit(commits[0])
+        else:
+            signature = self.signatures().get(version)
+            if signature is None:
+                logging.info("Tag '%s' has no tagger; using its commit",
+                             version)
+                hdr = self.header_from_commit(self.backend.commit(version))
+            else:
+                hdr = self.header(signature.name, signature.email,
+                                  signature.date)
+        stripped = version
+        prefix = self.options.tag_prefix
+        if prefix and stripped.startswith(prefix):
+            stripped = stripped[len(prefix):]
+        hdr['version'] = stripped or self.options.current_version
+        hdr['deb_urgency'] = self.options.deb_urgency
+        hdr['deb_distro'] = self.options.deb_distribution
+        hdr['deb_name'] = self.options.deb_package_name
+        return hdr
+
+    def signatures(self):
+        """:return: signatures of all the tags (see tag_signatures())"""
+        if self._signatures is None:
+            logging.info("Retrieving details of the tags")
+            self._signatures = self.backend.tag_signatures(['refs/tags/'])
+        return self._signatures
+
+    def header_from_commit(self, the_commit):
+        """
+        :param the_commit: a commit (CommitView, CommitRecord or git.Commit)
+        :return: dictionary with the release line information of the commit
+        """
+        return self.header(the_commit.author.name, the_commit.author.email,
+                           the_commit.authored_date)
+
+    def header(self, name, email, timestamp):
+        """
+        :return: dictionary with the author, email and dates
+        """
+        hdr = dict(self.dates(timestamp))
+        hdr['author'] = str(name)
+        hdr['email'] = str(email)
+        return hdr
+
+    def dates(self, timestamp):
+        """
+        :param timestamp: seconds since the epoch
+        :return: dictionary with the date (datetime) and its rpm and deb
+                 representations; computed once per timestamp
+        """
+        retval = self._dates.get(timestamp)
+        if retval is None:
+            date = datetime.fromtimestamp(timestamp, self.localtz)
+            retval = {
+                'date': date,
+                'date_rpm': date.strftime('%a %b %d %Y'),
+                'date_deb': date.strftime('%a, %d %b %Y %H:%M:%S %z'),
+            }
+            self._dates[timestamp] = retval
+        return retval
@@ -0,0 +1,150 @@
+#!/usr/bin/env python2
+
+"""
+Selection of a window of releases (the last few ones or a SemVer range),
+so the history walk can stop as soon as the requested releases are
+complete, rather than going down to the root commit.
+"""
+
+import re
+
+from gcg.tag_filter import semver_parse
+
+# a single comparison of a range, e.g. '>=2.0.0'
+RANGE_ITEM_REGEX = re.compile(r'^\s*(>=|<=|==|!=|>|<)?\s*(\S+)\s*$')
+# comparisons which reject versions older than their bound
+LOWER_BOUNDS = ('>=', '>', '==')
+
+
+def semver_compare(left, right):
+    """
+    Compare two Semantic Versions
+    :return: negative, zero or positive integer, like cmp() does
+    :raises: ValueError when any of the strings is not a Semantic Version
+    """
+    parsed = semver_parse(left)
+    if hasattr(parsed, 'compare'):
+        return parsed.compare(right)
+    import semver
+    return semver.compare(left, right)
+
+
+class VersionRange(object):
+    """
+    Range of Semantic Versions given as a comma-separated list of
+    comparisons, e.g. '>=2.0.0,<3.0.0'. A bare version means '=='.
+    """
+    OPERATORS = {
+        '>=': lambda x: x >= 0,
+        '<=': lambda x: x <= 0,
+        '==': lambda x: x == 0,
+        '!=': lambda x: x != 0,
+        '>': lambda x: x > 0,
+        '<': lambda x: x < 0,
+    }
+
+    def __init__(self, spec):
+        """
+        :param spec: the range, e.g. '>=2.0.0,<3.0.0'
+        :raises: ValueError when the range is malformed
+        """
+        self.spec = spec
+        self.items = []
+        for item in spec.split(','):
+            mobj = RANGE_ITEM_REGEX.match(item)
+            if mobj is None:
+                raise ValueError("malformed version range '{}'".format(spec))
+            (operator, version) = (mobj.group(1) or '==', mobj.group(2))
+            semver_parse(version)
+            self.items.append((operator, version))
+
+    def __contains__(self, version):
+        try:
+            return all(self.OPERATORS[op](semver_compare(version, bound))
+                       for (op, bound) in self.items)
+        except ValueError:
+            return False
+
+    def below(self, version):
+        """
+        Check if the version is older than any version in the range
+        :param version: version string
+        :return: True or False; False for anything but a Semantic Version
+        """
+        try:
+            return any(semver_compare(version, bound) < 0
+                       for (op, bound) in self.items if op in LOWER_BOUNDS)
+        except ValueError:
+            return False
+
+    def highest(self, versions):
+        """
+        Find the most recent version within the range
+        :param versions: iterable of version strings
+        :return: the highest matching version or None
+        """
+        retval = None
+        for version in versions:
+            if version in self and (
+                    retval is None or semver_compare(version, retval) > 0):
+                retval = version
+        return retval
+
+
+class ReleaseWindow(object):
+    """
+    Decides which releases of the walk (in the walk order, i.e. the most
+    recent first) are part of the changelog, and when the walk is over.
+    Releases are identified by the tags of their boundary commits.
+    """
+
+    def __init__(self, tag_filter, last_releases=None, versions=None):
+        """
+        :param tag_filter: TagFilter object, used to strip tag prefixes
+        :param last_releases: optional; number of (tagged) releases to
+                              include, on top of the current version
+        :param versions: optional; a VersionRange of the releases to
+                         include. The current version is left out then.
+        """
+        self.tag_filter = tag_filter
+        self.last_releases = last_releases
+        self.versions = versions
+        self.crossed = 0
+
+    @classmethod
+    def from_options(cls, options, tag_filter):
+        """
+        :param options: command-line options
+        :param tag_filter: TagFilter object
+        :return: a ReleaseWindow object or None when the whole history
+                 is requested
+        """
+        last_releases = getattr(options, 'last_releases', None)
+        versions = getattr(options, 'versions', None)
+        if last_releases is None and versions is None:
+            return None
+        if versions is not None:
+            versions = VersionRange(versions)
+        return cls(tag_filter, last_releases, versions)
+
+    def selects(self, tag):
+        """
+        :param tag: tag name of a release (empty for the current version)
+        :return: True when the release is to be put in the changelog
+        """
+        if self.versions is None:
+            return True
+        return bool(tag) and self.tag_filter.strip_prefix(tag) in self.versions
+
+    def complete(self, tag):
+        """
+        Register crossing a release boundary
+        :param tag: tag name of the release the walk enters
+        :return: True when all the requested releases have been walked
+        """
+        self.crossed += 1
+        if self.last_releases is not None and \
+                self.crossed > self.last_releases:
+            return True
+        return self.versions is not None and \
+            self.versions.below(self.tag_filter.strip_prefix(tag))
@@ -0,0 +1,93 @@
+#!/usr/bin/env python2
+
+"""
+Scope of the changelog: the commits the walk of the history starts and
+ends at, as requested on the command line.
+"""
+
+import logging
+
+from gcg.changelog_file import find_newest_release
+from gcg.release_window import VersionRange
+from gcg.tag_filter import TagFilter
+from gcg.tag_index import get_tag_index
+
+
+def resolve_commit_from_arguments(backend, options, arg_name):
+    """
+    Resolve a reference to a commit (by branch name, label or sha)
+    to an actual commit id
+    :param arg_name: name of the command-line argument to resolve
+    :param options: command-line options
+    :param backend: history backend (see gcg.backends)
+    :returns: a commit id as string
+    :raises: ValueError when the reference cannot be found within the repo
+    """
+    import git
+    retval = None
+    ref = getattr(options, arg_name)
+    if ref is not None:
+        invalid_commit_msg = "Value of argument --%s does not not resolve " \
+                             "to a valid commit in this repository"
+        try:
+            retval = backend.commit(ref)
+            logging.info("Commit referred to as '%s' (%s) resolved to %s",
+                         arg_name, ref, retval.hexsha)
+        except git.BadName as exc:
+            logging.error(invalid_commit_msg, arg_name)
+            raise ValueError(exc)
+        except ValueError:
+            logging.error(invalid_commit_msg, arg_name)
+            raise
+    return retval
+
+
+def resolve_update_limit(backend, options, tag_index):
+    """
+    Find the most recent release already present in the output file
+    (see --update option)
+    :param backend: history backend (see gcg.backends)
+    :param options: command-line options
+    :param tag_index: tag index, as returned by get_tag_index()
+    :return: tuple (commit of the release, offset of its header in the
+             file); (None, None) when the file has to be generated anew
+    """
+    tag_filter = TagFilter(None, options.tag_prefix)
+    known_versions = dict(
+        (tag_filter.strip_prefix(tag), tag)
+        for tags in tag_index.values() for tag in tags)
+    (tag, offset) = find_newest_release(
+        options.output_file[0], options.output_format[0], known_versions)
+    if tag is None:
+        logging.info("No known release found in %s; generating it anew",
+                     options.output_file[0])
+        return (None, None)
+    logging.info("Updating %s with releases newer than %s",
+                 options.output_file[0], tag)
+    return (backend.commit(tag), offset)
+
+
+def resolve_version_limit(backend, options, upper_limit):
+    """
+    Find the most recent release within the --versions range, so the walk
+    can start there rather than at the top commit
+    :param backend: history backend (see gcg.backends) to query with
+    :param options: command-line options
+    :param upper_limit: the top commit (see --until)
+    :return: commit of the release
+    :raises: ValueError when no release reachable from the top commit
+             is within the range
+    """
+    tag_filter = TagFilter(None, options.tag_prefix)
+    versions = dict(
+        (tag_filter.strip_prefix(tag), tag)
+        for tags in get_tag_index(backend, tag_filter,
+                                  upper_limit.hexsha).values()
+        for tag in tags)
+    newest = VersionRange(options.versions).highest(versions)
+    if newest is None:
+        raise ValueError("no release within '{}' is reachable from {}".format(
+            options.versions, upper_limit.hexsha))
+    logging.info("Most recent release within '%s' is %s",
+                 options.versions, versions[newest])
+    return backend.commit(versions[newest])
@@ -0,0 +1,511 @@
+#!/usr/bin/env python3
+
+"""
+Server mode: a long-running daemon generating changelogs on request.
+
+Requests are HTTP POSTs (on a TCP port or a Unix socket) with a JSON body:
+the gcg command-line arguments, as a list or under the 'argv' key. The
+changelog is streamed back (chunked transfer encoding) as it's rendered.
+
+Between requests the server keeps the repositories open, the tag listings
+(until the refs of the repository change) and the Jinja environments with
+their compiled templates. Requests are handled concurrently (asyncio);
+changelogs are generated by a pool of threads, one at a time per
+repository.
+
+Requires Python 3.
+"""
+
+import argparse
+import asyncio
+import concurrent.futures
+import contextlib
+import io
+import json
+import logging
+import os
+import sys
+import threading
+
+import git
+
+import gcg.entrypoint
+import gcg.errors as err
+from gcg.backends import open_backend
+
+# options with no meaning for a response streamed back, writing files
+# (to the server's file system or into the repositories) or reading
+# templates (code) off the server's file system on request
+UNSUPPORTED_OPTIONS = ('output_file', 'update', 'profile_out', 'stats',
+                       'cache', 'commit_graph', 'template_dir')
+# chunks of the changelog queued for sending, per request
+QUEUE_SIZE = 8
+HTTP_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found',
+                405: 'Method Not Allowed', 500: 'Internal Server Error'}
+ERROR_STATUS = {
+    err.INVALID_INPUT: 400,
+    err.INVALID_VCS_LIMITS: 400,
+    err.ARGPARSE_FAILURE: 400,
+    err.REPO_PATH_INVALID: 404,
+    err.REPO_PATH_NOT_REPO: 404,
+}
+
+_CAPTURE = threading.local()
+
+
+def parse_args(argv):
+    """Parse user's command-line parameters
+
+    :param argv: User arguments
+    :returns: object with configuration (as provided by argparse)
+    """
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter,
+        description="Generate changelogs on request, keeping repositories "
+                    "and templates warm between requests.",
+        epilog="""
+        A request is an HTTP POST with a JSON body: the list of gcg
+        arguments, e.g. ["-p", "/srv/repo", "-O", "rpm", "-x"], or an
+        object with such list under the 'argv' key. Output files (-o),
+        --update, the options writing files (--stats, --profile-out,
+        --cache, --commit-graph) and custom templates (--template-dir)
+        are not supported; the changelog is the response. Changelogs are
+        generated by the threads of the server, with no worker processes
+        (-j).
+        """
+    )
+    listen = parser.add_mutually_exclusive_group(required=True)
+    listen.add_argument(
+        '-s', '--socket',
+        help="""Path of the Unix socket to listen on""",
+        type=str, action="store",
+    )
+    listen.add_argument(
+        '--port',
+        help="""TCP port to listen on""",
+        type=int, action="store",
+    )
+    parser.add_argument(
+        '--host',
+        help="""Address to listen on (with --port)""",
+        type=str, action="store", default='127.0.0.1',
+    )
+    parser.add_argument(
+        '-r', '--repository-root',
+        help="""Directory the requested repositories (-p) must be within.
+        May be given multiple times. By default any repository the server
+        can read may be requested.""",
+        type=str, action="append", dest="roots", default=[],
+    )
+    parser.add_argument(
+        '-j', '--jobs',
+        help="""Number of changelogs generated at the same time""",
+        type=int, action="store", default=4,
+    )
+    parser.add_argument(
+        '-v', '--verbose',
+        help="Verbosity level. Specify twice for debug logs as well.",
+        action="count", default=0
+    )
+    return parser.parse_args(argv)
+
+
+class CaptureHandler(logging.Handler):
+    """
+    Logging handler collecting the error messages logged by the thread
+    generating a changelog, to be sent back when the request fails
+    """
+
+    def __init__(self):
+        super().__init__(logging.ERROR)
+
+    def emit(self, record):
+        messages = getattr(_CAPTURE, 'messages', None)
+        if messages is not None:
+            messages.append(self.format(record))
+
+
+def refs_fingerprint(repo):
+    """
+    :param repo: reference to the repository (git.Repo())
+    :return: a value which changes when any ref (or HEAD) changes
+    """
+    common_dir = getattr(repo, 'common_dir', None) or repo.git_dir
+    paths = [os.path.join(repo.git_dir, 'HEAD'),
+             os.path.join(common_dir, 'packed-refs')]
+    for (dirpath, dirnames, filenames) in os.walk(
+            os.path.join(common_dir, 'refs')):
+        paths.append(dirpath)
+        paths.extend(os.path.join(dirpath, x) for x in filenames)
+        dirnames.sort()
+    retval = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        retval.append((path, stat.st_mtime_ns, stat.st_size))
+    return hash(tuple(retval))
+
+
+class RepositoryState(object):
+    """
+    Warm state of a repository: the opened backend, with the tag listings
+    memoized until the refs change. Used by one thread at a time (lock).
+    """
+
+    def __init__(self, path, backend_name):
+        """
+        :param path: repository path
+        :param backend_name: history backend name (see gcg.backends)
+        :raises: the errors of gcg.backends.open_backend()
+        """
+        self.path = path
+        self.backend_name = backend_name
+        self.lock = threading.Lock()
+        self._fingerprint = None
+        self._memo = {}
+        self.backend = None
+        self.open()
+
+    def open(self):
+        """
+        (Re)open the repository, with the tag listings memoized
+        :raises: the errors of gcg.backends.open_backend()
+        """
+        self.backend = open_backend(self.backend_name, self.path)
+        self._memo.clear()
+        for name in ('tag_refs', 'tag_signatures'):
+            setattr(self.backend, name,
+                    self._memoized(name, getattr(self.backend, name)))
+
+    def _memoized(self, name, func):
+        """:return: func wrapper memoizing the results"""
+        def wrapper(patterns, *args, **kwargs):
+            """Memoizing wrapper"""
+            key = (name, tuple(patterns), args,
+                   tuple(sorted(kwargs.items())))
+            if key not in self._memo:
+                self._memo[key] = func(patterns, *args, **kwargs)
+            return self._memo[key]
+        return wrapper
+
+    def refresh(self):
+        """
+        Reopen the repository if the refs have changed: with the tag
+        listings, the object database of the backend (e.g. the packs
+        known to GitDB) may be out of date as well
+        """
+        fingerprint = refs_fingerprint(self.backend.repo)
+        if fingerprint != self._fingerprint:
+            if self._fingerprint is not None:
+                logging.info("Refs of %s changed; reopening it",
+                             self.backend.git_dir)
+                self.open()
+            self._fingerprint = fingerprint
+
+
+class QueueWriter(object):
+    """
+    File-like object passing the written text from a worker thread to
+    the event loop (through a bounded queue, so a slow client slows
+    the generation down)
+    """
+
+    def __init__(self, loop, queue):
+        self.loop = loop
+        self.queue = queue
+        self.abandoned = False
+
+    def write(self, text):
+        """
+        Queue the text (or bytes, for binary formats); raises IOError
+        when the client is gone
+        """
+        if self.abandoned:
+            raise IOError("Client disconnected")
+        if text:
+            self._put(text if isinstance(text, bytes)
+                      else text.encode('utf-8'))
+
+    def close(self):
+        """Queue the end of the output"""
+        self._put(None)
+
+    def _put(self, item):
+        asyncio.run_coroutine_threadsafe(
+            self.queue.put(item), self.loop).result()
+
+
+class ChangelogServer(object):
+    """
+    The server: parses the requests, generates the changelogs in worker
+    threads and streams them back
+    """
+
+    def __init__(self, jobs=4, roots=()):
+        """
+        :param jobs: optional; number of changelogs generated at the same
+                     time
+        :param roots: optional; directories the requested repositories
+                      must be within; any repository by default
+        """
+        self.executor = concurrent.futures.ThreadPoolExecutor(jobs)
+        self.roots = [os.path.realpath(x) for x in roots]
+        root = logging.getLogger()
+        if not any(isinstance(x, CaptureHandler) for x in root.handlers):
+            root.addHandler(CaptureHandler())
+        self._repositories = {}
+        self._environments = {}
+        self._lock = threading.Lock()
+
+    def check_path(self, options):
+        """
+        :param options: gcg options
+        :raises: ValueError when the repository is not within the roots
+        """
+        path = os.path.realpath(options.path)
+        if self.roots and not any(
+                path == x or path.startswith(x.rstrip(os.sep) + os.sep)
+                for x in self.roots):
+            raise ValueError("{} is not within the repository roots".format(
+                options.path))
+
+    def repository(self, options):
+        """
+        :param options: gcg options
+        :return: RepositoryState object for options.path and .backend
+        """
+        key = (os.path.realpath(options.path), options.backend)
+        with self._lock:
+            state = self._repositories.get(key)
+            if state is None:
+                state = RepositoryState(options.path, options.backend)
+                self._repositories[key] = state
+            return state
+
+    def environment(self, template_dir):
+        """:return: Jinja environment for the template directory"""
+        with self._lock:
+            environment = self._environments.get(template_dir)
+            if environment is None:
+                environment = gcg.entrypoint.init_jinja_env(template_dir)
+                self._environments[template_dir] = environment
+            return environment
+
+    def generate(self, options, out):
+        """
+        Generate the changelog (in a worker thread)
+        :param options: gcg options
+        :param out: QueueWriter object to write the changelog to
+        :return: tuple (exit code, list of error messages)
+        """
+        _CAPTURE.messages = []
+        try:
+            environment = self.environment(options.template_dir)
+            try:
+                state = self.repository(options)
+            except (ValueError, git.NoSuchPathError,
+                    git.InvalidGitRepositoryError):
+                # let run() report it the usual way
+                return (gcg.entrypoint.run(options, environment=environment,
+                                           out=out), _CAPTURE.messages)
+            with state.lock:
+                state.refresh()
+                retval = gcg.entrypoint.run(
+                    options, environment=environment, backend=state.backend,
+                    out=out)
+            return (retval, _CAPTURE.messages)
+        except Exception as exc:  # pylint: disable=broad-except
+            if out.abandoned:
+                return (err.PROCESSING_FAILED, [])
+            logging.exception("Changelog generation failed")
+            return (err.UNHANDLED_EXCEPTION,
+                    _CAPTURE.messages + [str(exc)])
+        finally:
+            _CAPTURE.messages = None
+            out.close()
+
+    async def handle(self, reader, writer):
+        """Serve a single request"""
+        try:
+            try:
+                (method, _, body) = await read_request(reader)
+            except (ValueError, asyncio.IncompleteReadError) as exc:
+                await send_error(writer, 400, str(exc))
+                return
+            if method != 'POST':
+                await send_error(writer, 405, "Use POST")
+                return
+            try:
+                options = request_options(body)
+                self.check_path(options)
+            except ValueError as exc:
+                await send_error(writer, 400, str(exc))
+                return
+            await self.respond(options, writer)
+        except (ConnectionError, asyncio.CancelledError):
+            logging.info("Client disconnected")
+        finally:
+            writer.close()
+
+    async def respond(self, options, writer):
+        """Generate the changelog and stream it back"""
+        loop = asyncio.get_event_loop()
+        queue = asyncio.Queue(QUEUE_SIZE)
+        out = QueueWriter(loop, queue)
+        result = loop.run_in_executor(self.executor, self.generate,
+                                      options, out)
+        started = False
+        try:
+            chunk = await queue.get()
+            while chunk is not None:
+                if not started:
+                    await send_head(writer, 200, chunked=True)
+                    started = True
+                writer.write(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+                await writer.drain()
+                chunk = await queue.get()
+        except BaseException:
+            out.abandoned = True
+            # let the worker finish; it's blocked until the queue is read
+            while await queue.get() is not None:
+                pass
+            raise
+        (code, messages) = await result
+        if code != err.SUCCESS:
+            if started:
+                # the response is cut short; the client sees it's incomplete
+                writer.transport.abort()
+                return
+            await send_error(writer, ERROR_STATUS.get(code, 500),
+                             '\n'.join(messages) or 'Exit code {}'.format(
+                                 code), code)
+            return
+        if not started:
+            await send_head(writer, 200, chunked=True)
+        writer.write(b'0\r\n\r\n')
+        await writer.drain()
+
+
+async def read_request(reader):
+    """
+    Read an HTTP request
+    :return: tuple (method, headers (lowercase names), body (bytes))
+    :raises: ValueError when the request is malformed
+    """
+    line = (await reader.readline()).decode('latin-1').strip()
+    parts = line.split()
+    if len(parts) != 3 or not parts[2].startswith('HTTP/'):
+        raise ValueError("Malformed request line")
+    headers = {}
+    while True:
+        line = (await reader.readline()).decode('latin-1')
+        if not line.strip():
+            break
+        (name, _, value) = line.partition(':')
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get('content-length', 0) or 0)
+    body = await reader.readexactly(length) if length else b''
+    return (parts[0].upper(), headers, body)
+
+
+def request_options(body):
+    """
+    Turn the request body into gcg options
+    :param body: JSON (bytes); list of arguments or {"argv": [...]}
+    :return: options, as returned by gcg.entrypoint.parse_args()
+    :raises: ValueError when the request or the arguments are invalid
+    """
+    try:
+        document = json.loads(body.decode('utf-8'))
+    except (UnicodeDecodeError, ValueError) as exc:
+        raise ValueError("Request is not valid JSON: {}".format(exc))
+    argv = document.get('argv') if isinstance(document, dict) else document
+    if not isinstance(argv, list) or \
+            not all(isinstance(x, str) for x in argv):
+        raise ValueError("Expected a list of arguments (strings)")
+    messages = io.StringIO()
+    try:
+        # argparse reports errors (and help) on the console and exits
+        with contextlib.redirect_stderr(messages), \
+                contextlib.redirect_stdout(messages):
+            options = gcg.entrypoint.parse_args(argv)
+    except SystemExit:
+        raise ValueError(messages.getvalue().strip())
+    for key in UNSUPPORTED_OPTIONS:
+        value = getattr(options, key, None)
+        if value and value != [None]:
+            raise ValueError("{} is not supported in server mode".format(key))
+    if getattr(options, 'jobs', 1) != 1:
+        # a pool of workers per request would fork the whole server
+        raise ValueError("jobs is not supported in server mode")
+    return options
+
+
+async def send_head(writer, status, chunked=False, length=None, code=None):
+    """Write the status line and headers of the response"""
+    lines = ['HTTP/1.1 {} {}'.format(status, HTTP_REASONS.get(status, '')),
+             'Content-Type: text/plain; charset=utf-8',
+             'Connection: close']
+    if chunked:
+        lines.append('Transfer-Encoding: chunked')
+    if length is not None:
+        lines.append('Content-Length: {}'.format(length))
+    if code is not None:
+        lines.append('X-Gcg-Exit-Code: {}'.format(code))
+    writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+    await writer.drain()
+
+
+async def send_error(writer, status, message, code=None):
+    """Write an error response"""
+    body = (message + '\n').encode('utf-8')
+    await send_head(writer, status, length=len(body), code=code)
+    writer.write(body)
+    await writer.drain()
+
+
+async def serve(options, server):
+    """
+    Listen and serve until cancelled
+    :param options: server options, as returned by parse_args()
+    :param server: ChangelogServer object
+    """
+    if options.socket:
+        listener = await asyncio.start_unix_server(server.handle,
+                                                   path=options.socket)
+        logging.warning("Listening on %s", options.socket)
+    else:
+        listener = await asyncio.start_server(server.handle, options.host,
+                                              options.port)
+        logging.warning("Listening on %s:%d", options.host, options.port)
+    async with listener:
+        await listener.serve_forever()
+
+
+def main(argv=None):
+    """
+    Main entry point
+    :param argv: optional script parameters; default is to use sys.argv
+    :return: exit code
+    """
+    if argv is None:
+        argv = sys.argv
+    options = parse_args(argv[1:])
+    logging.basicConfig(
+        level=gcg.entrypoint.log_level_from_verbosity(options.verbose),
+        format="[%(levelname)s] %(message)s")
+    server = ChangelogServer(options.jobs, options.roots)
+    try:
+        asyncio.run(serve(options, server))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if options.socket and os.path.exists(options.socket):
+            os.unlink(options.socket)
+    return err.SUCCESS
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,203 @@
+#!/usr/bin/env python2
+
+"""
+Run statistics (--stats): wall time of the phases of a changelog run and
+counters of the work done - git processes, object reads, commits walked
+and kept, releases and output size - and details such as the commit-graph
+strategy, written as a JSON report.
+"""
+
+import collections
+import contextlib
+import json
+import time
+import warnings
+
+PHASES = ('open', 'resolve', 'traverse', 'headers', 'render')
+
+
+class RunStats(object):
+    """
+    Collector of the statistics of a single run.
+
+    Phases are timed exclusively: a phase entered while another one is
+    running pauses it. That's how the traversal, the release headers and
+    the rendering, interleaved when the changelog is streamed, are told
+    apart.
+    """
+
+    def __init__(self):
+        self.timings = collections.OrderedDict((x, 0.0) for x in PHASES)
+        self.counters = collections.OrderedDict()
+        self.details = collections.OrderedDict()
+        self._running = []
+        self._started = time.time()
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """Add the time spent in the block (but nested phases) to the phase"""
+        now = time.time()
+        if self._running:
+            self._stop(now)
+        self._running.append([name, now])
+        try:
+            yield
+        finally:
+            now = time.time()
+            self._stop(now)
+            self._running.pop()
+            if self._running:
+                self._running[-1][1] = now
+
+    def _stop(self, now):
+        (name, start) = self._running[-1]
+        self.timings[name] = self.timings.get(name, 0.0) + now - start
+
+    def count(self, name, value=1):
+        """Increase the counter"""
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def record(self, name, value):
+        """Record a detail of the run (reported under its name)"""
+        self.details[name] = value
+
+    def timed_iter(self, name, iterable):
+        """
+        Return (yield) the items of the iterable; time spent producing
+        them goes to the phase
+        """
+        iterator = iter(iterable)
+        while True:
+            with self.phase(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def releases(self, releases):
+        """
+        Return (yield) the releases (tuples (tag name, commits)), timing
+        the traversal and counting the releases and the commits kept
+        """
+        for (version, commits) in self.timed_iter('traverse', releases):
+            self.count('releases')
+            self.count('commits_kept', len(commits))
+            yield (version, commits)
+
+    def counted_chunks(self, chunks):
+        """Return (yield) the output chunks, counting their size"""
+        for chunk in chunks:
+            self.count('output_size', len(chunk))
+            yield chunk
+
+    def counting_backend(self, backend):
+        """
+        Set up counting of the git processes, the object reads and
+        the commits walked. The backend itself (possibly shared, e.g.
+        in batch mode) is left as it is: counting is done by a backend
+        of the same kind, over a separate instance of the repository.
+        :param backend: history backend (see gcg.backends)
+        :return: a CountingBackend object, to be used instead
+        """
+        for counter in ('git_processes', 'object_reads', 'commits_walked'):
+            self.counters.setdefault(counter, 0)
+        return CountingBackend(type(backend)(counting_repo(backend.repo,
+                                                           self)), self)
+
+    def report(self, exit_code=None):
+        """
+        :param exit_code: optional; exit code of the run
+        :return: dictionary with the statistics
+        """
+        retval = collections.OrderedDict([
+            ('exit_code', exit_code),
+            ('wall_time', time.time() - self._started),
+            ('phases', self.timings),
+            ('counters', self.counters),
+        ])
+        retval.update(self.details)
+        return retval
+
+    def write(self, path, exit_code=None):
+        """Write the report (see report()) to a JSON file"""
+        with open(path, 'w') as sfile:
+            json.dump(self.report(exit_code), sfile, indent=2)
+            sfile.write('\n')
+
+
+class CountingBackend(object):
+    """
+    Proxy of a history backend counting the commits walked as
+    'commits_walked'; commits filtered out by git count only when
+    they're returned as stubs (e.g. tagged ones)
+    """
+
+    def __init__(self, backend, stats):
+        """
+        :param backend: history backend (see gcg.backends)
+        :param stats: a RunStats object
+        """
+        self.backend = backend
+        self.stats = stats
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
+
+    def iter_commits(self, *args, **kwargs):
+        """Count the commits walked (see HistoryBackend.iter_commits())"""
+        for commit in self.backend.iter_commits(*args, **kwargs):
+            self.stats.count('commits_walked')
+            yield commit
+
+    def iter_commit_ids(self, *args, **kwargs):
+        """Count the commits walked (see HistoryBackend.iter_commit_ids())"""
+        for commit in self.backend.iter_commit_ids(*args, **kwargs):
+            self.stats.count('commits_walked')
+            yield commit
+
+
+def counting_repo(repo, stats):
+    """
+    Open the repository anew, counting the git processes run (each
+    git.Git.execute() call runs one) as 'git_processes' and the reads
+    of the object database as 'object_reads'
+    :param repo: reference to the repository (git.Repo())
+    :param stats: a RunStats object
+    :return: git.Repo object of the same repository and kind of object
+             database
+    """
+    import git
+
+    class CountingGit(git.Git):
+        """git.Git counting the processes"""
+        __slots__ = ()
+
+        def execute(self, *args, **kwargs):
+            """Count and run the command (see git.Git.execute())"""
+            # pylint: disable=arguments-differ
+            stats.count('git_processes')
+            return super(CountingGit, self).execute(*args, **kwargs)
+
+    class CountingDB(type(repo.odb)):
+        """Object database counting the reads"""
+
+        def info(self, *args, **kwargs):
+            """Count and read the object header"""
+            stats.count('object_reads')
+            return super(CountingDB, self).info(*args, **kwargs)
+
+        def stream(self, *args, **kwargs):
+            """Count and read the object"""
+            stats.count('object_reads')
+            return super(CountingDB, self).stream(*args, **kwargs)
+
+    # pylint: disable=too-few-public-methods
+    class CountingRepo(git.Repo):
+        """git.Repo running git commands with CountingGit"""
+        GitCommandWrapperType = CountingGit
+
+    with warnings.catch_warnings():
+        # GitPython discourages GitDB, used by the gitdb backend
+        warnings.simplefilter('ignore', DeprecationWarning)
+        return CountingRepo(repo.working_dir, odbt=CountingDB)
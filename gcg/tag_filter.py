@@ -6,16 +6,45 @@ Semantic Versioning or custum rules
 
 import re
 import logging
-import semver
+
+# Semantic Versioning 2.0.0, as suggested by semver.org
+SEMVER_REGEX = re.compile(
+    r'^(0|[1-9]\d*)\.(0|[1-9]\d*)\.(0|[1-9]\d*)'
+    r'(?:-((?:0|[1-9]\d*|\d*[a-zA-Z-][0-9a-zA-Z-]*)'
+    r'(?:\.(?:0|[1-9]\d*|\d*[a-zA-Z-][0-9a-zA-Z-]*))*))?'
+    r'(?:\+([0-9a-zA-Z-]+(?:\.[0-9a-zA-Z-]+)*))?$')
+# anything failing this can't be a version for any semver implementation
+SEMVER_SHAPE_REGEX = re.compile(r'^\d+\.\d+\.\d+')
+
+
+def semver_parse(version_string):
+    """
+    Parse the version with the semver module, imported on first use
+    :param version_string: input string
+    :return: the parsed version
+    :raises: ValueError when it's not a Semantic Version
+    """
+    import semver
+    # semver.parse() is deprecated in newer semver releases
+    parse = getattr(getattr(semver, 'VersionInfo', None), 'parse',
+                    semver.parse)
+    return parse(version_string)
 
 
 class TagFilter(object):
     """
     Class facilitating validating and filtering versions against
-    SemVer rules or custom, user-provided version scheme
+    SemVer rules or custom, user-provided version scheme.
+
+    Verdicts are memoized (per version string), so validating the same
+    tags over and over again is cheap.
     """
+    MEMO_SIZE = 65536
+
     def __init__(self, pattern=None, prefix=None):
         self.prefix = prefix
+        self.custom_pattern = None
+        self._memo = {}
         if pattern is None:
             self.matches = self.is_semantic_version
         else:
@@ -32,13 +61,22 @@ class TagFilter(object):
                        at object creation time.
         :return: True or False
         """
-        logging.debug("Validate string '%s' against SemVer rules", value)
         version_string = self.strip_prefix(value, prefix)
-        try:
-            semver.parse(version_string)
-        except ValueError:
-            return False
-        return True
+        retval = self._memo.get(version_string)
+        if retval is None:
+            if SEMVER_REGEX.match(version_string):
+                retval = True
+            elif not SEMVER_SHAPE_REGEX.match(version_string):
+                retval = False
+            else:
+                # borderline case; let the semver module have the final say
+                try:
+                    semver_parse(version_string)
+                    retval = True
+                except ValueError:
+                    retval = False
+            self._remember(version_string, retval)
+        return retval
 
     def is_custom_version(self, value, prefix=None):
         """
@@ -50,14 +88,19 @@ class TagFilter(object):
                        the input string
         :return: True or False
         """
-        logging.debug("Validate string '%s' against custom pattern '%s'",
-                      value, self.custom_pattern.pattern)
         version_string = self.strip_prefix(value, prefix)
-        retval = False
-        if self.custom_pattern.match(version_string):
-            retval = True
+        retval = self._memo.get(version_string)
+        if retval is None:
+            retval = self.custom_pattern.match(version_string) is not None
+            self._remember(version_string, retval)
         return retval
 
+    def _remember(self, version_string, verdict):
+        """Memoize the verdict; the memo is bounded to MEMO_SIZE entries"""
+        if len(self._memo) >= self.MEMO_SIZE:
+            self._memo.clear()
+        self._memo[version_string] = verdict
+
     def matching_only(self, versions, prefix=None):
         """
         Return only the list of versions (tags) that match the configured
@@ -69,8 +112,28 @@ class TagFilter(object):
         :return: list containing only those strings which match SemVer.org
                  specification; may be empty.
         """
-        return [x for x in versions if
-                self.matches(x, prefix=prefix)]
+        matches = self.matches
+        retval = [x for x in versions if matches(x, prefix=prefix)]
+        logging.debug("%d out of %d tag(s) match the versioning rules",
+                      len(retval), len(versions))
+        return retval
+
+    def ref_patterns(self):
+        """
+        Provide 'git for-each-ref' patterns narrowing the tag listing
+        down to the names which could possibly match the configured
+        versioning rules. The prefix is optional, so both prefixed and
+        bare names are covered.
+
+        :return: list of ref patterns (fnmatch-style)
+        """
+        if self.custom_pattern is not None:
+            return ['refs/tags/']
+        retval = ['refs/tags/[0-9]*']
+        if self.prefix:
+            escaped = re.sub(r'([][*?\\])', r'\\\1', self.prefix)
+            retval.append('refs/tags/{}[0-9]*'.format(escaped))
+        return retval
 
     def strip_prefix(self, value, prefix=None):
         """
@@ -0,0 +1,51 @@
+#!/usr/bin/env python2
+
+"""
+Index of the release tags: commit ids mapped to the names of the tags
+pointing at them, built out of a single listing of the tag refs.
+"""
+
+import logging
+
+
+def get_tag_index(backend, tag_filter, merged=None):
+    """
+    Build an index of release tags for the whole repository using a single
+    'git for-each-ref' call. Annotated tags are peeled to the commits
+    they point at, so lookups can be made by commit id directly.
+    :param backend: history backend (see gcg.backends) to query with
+    :param tag_filter: a TagFilter object; only tags matching its rules
+                       are put into the index
+    :param merged: optional; revision the indexed tags must be reachable
+                   from
+    :return: dictionary; k: commit hexsha, v: list of tag names pointing
+             at the commit (sorted by name, like 'git tag --points-at' does)
+    """
+    return get_tag_indexes(backend, [tag_filter], merged)[0]
+
+
+def get_tag_indexes(backend, tag_filters, merged=None):
+    """
+    Same as get_tag_index(), but build an index per tag filter (e.g. per
+    tag prefix), still with a single 'git for-each-ref' call
+    :param backend: history backend (see gcg.backends) to query with
+    :param tag_filters: list of TagFilter objects
+    :param merged: optional; revision the indexed tags must be reachable
+                   from
+    :return: list of tag indexes, one per filter
+    """
+    retval = [{} for _ in tag_filters]
+    patterns = []
+    for tag_filter in tag_filters:
+        patterns.extend(x for x in tag_filter.ref_patterns()
+                        if x not in patterns)
+    refs = backend.tag_refs(patterns, merged)
+    for (tag_filter, index) in zip(tag_filters, retval):
+        names = tag_filter.matching_only([name for (_, name) in refs])
+        matching = set(names)
+        for (hexsha, name) in refs:
+            if name in matching:
+                index.setdefault(hexsha, []).append(name)
+        logging.info("Indexed %d release tag(s) out of %d candidate(s)",
+                     len(names), len(refs))
+    return retval
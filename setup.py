@@ -7,6 +7,7 @@ Setuptools configuration for GCG project
 import os
 import logging
 from setuptools import setup
+from setuptools.command.build_py import build_py
 
 
 def read(fname):
@@ -48,12 +49,24 @@ def get_version(fname):
     return retval or read(fname).strip()
 
 
+class BuildPyWithTemplates(build_py):
+    """Build command which also precompiles the built-in Jinja templates
+    into Python modules, so they don't need to be parsed at runtime"""
+
+    def run(self):
+        build_py.run(self)
+        from gcg.precompiled import compile_templates
+        target_dir = os.path.join(self.build_lib, 'gcg', 'templates_compiled')
+        logging.info("precompiling templates into %s", target_dir)
+        compile_templates(target_dir)
+
+
 logging.basicConfig(level=logging.INFO)
 
 setup(
     name='gcg',
     version=get_version('version.txt'),
-    packages=['gcg'],
+    packages=['gcg', 'gcg.backends'],
     url='https://github.com/nokia/git-changelog-generator',
     license='BSD-3-Clause',
     author='Waldek Maleska',
@@ -63,9 +76,15 @@ setup(
     tests_require=read_list('requirements_test.txt'),
     setup_requires=read_list('requirements_setup.txt'),
     install_requires=read_list('requirements_install.txt'),
+    extras_require={
+        'msgpack': ['msgpack'],
+    },
     entry_points={
         'console_scripts': [
             'gcg = gcg.entrypoint:main',
+            'gcg-batch = gcg.batch:main',
+            'gcg-monorepo = gcg.monorepo:main',
+            'gcg-server = gcg.server:main',
         ],
     },
     classifiers=[
@@ -81,4 +100,7 @@ setup(
         "License :: OSI Approved :: BSD License",
     ],
     include_package_data=True,
+    cmdclass={
+        'build_py': BuildPyWithTemplates,
+    },
 )
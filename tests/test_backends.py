@@ -0,0 +1,156 @@
+#!/usr/bin/env python2
+"""
+Unit and component tests for the history backends
+"""
+
+import collections
+import os
+import shutil
+import subprocess
+import tempfile
+
+from mock import patch
+
+import gcg.entrypoint
+import gcg.errors as err
+from gcg.backends import GitCliBackend, InProcessBackend, open_backend
+from gcg.backends.inprocess import CommitWalk, ref_matches, \
+    visible_commits
+from tests.helpers.gitrepo import prepare_git_repo
+
+
+def test_ref_matches():
+    """Ref patterns match as with 'git for-each-ref'"""
+    assert ref_matches('refs/tags/1.0.0', 'refs/tags/[0-9]*')
+    assert ref_matches('refs/tags/1.0.0', 'refs/tags/')
+    assert ref_matches('refs/tags/1.0.0', 'refs/tags')
+    assert not ref_matches('refs/tags/v1.0.0', 'refs/tags/[0-9]*')
+    assert ref_matches('refs/tags/v*1.0', 'refs/tags/v\\*[0-9]*')
+    assert not ref_matches('refs/tags/vx1.0', 'refs/tags/v\\*[0-9]*')
+
+
+def test_visible_commits_streamed():
+    """Commits are returned without delay once nothing is left to hide"""
+    fake = collections.namedtuple('Fake', ['binsha', 'committed_date',
+                                           'parents'])
+    oldest = fake(b'c', 8, ())
+    middle = fake(b'b', 9, (oldest,))
+    walk = CommitWalk()
+    walk.push(fake(b'h', 20, ()), True)
+    walk.push(fake(b'a', 10, (middle,)), False)
+    commits = visible_commits(walk)
+    assert next(commits).binsha == b'a'
+    # the rest of the history is yet to be walked
+    assert b'c' not in walk.states
+    assert [x.binsha for x in commits] == [b'b', b'c']
+
+
+class TestBackends(object):
+    """Both backends see the same history"""
+
+    # pylint: disable=unused-argument,missing-docstring
+    # pylint: disable=attribute-defined-outside-init
+    def setup_method(self, test_method):
+        self.tmp_dir = tempfile.mkdtemp()
+        (self.path, self.repo, client) = prepare_git_repo(
+            self.tmp_dir, messages_and_tags=[
+                ("ISSUE-1 1st", None),
+                ("2nd", "1.0.0"),
+                ("ISSUE-3 3rd\n\nwith a body", None)])
+        client.checkout('-b', 'branch', 'HEAD~1')
+        client.commit('--allow-empty', '-m', 'ISSUE-4 on branch')
+        client.checkout('master')
+        client.merge('--no-ff', '-m', 'ISSUE-5 merge', 'branch')
+        client.tag('-a', '-m', 'annotated', '1.1.0')
+        client.commit('--allow-empty', '-m', '6th')
+
+    # pylint: disable=unused-argument,missing-docstring
+    def teardown_method(self, test_method):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_same_walk(self):
+        cli = GitCliBackend(self.repo)
+        inprocess = InProcessBackend.open(self.path)
+        for (high, low, exclude, first_parent) in [
+                ('HEAD', None, None, False), ('HEAD', '1.0.0', None, False),
+                ('HEAD~1', None, ['branch'], False),
+                ('1.0.0', 'HEAD', None, False), ('HEAD', None, None, True),
+                ('HEAD', 'branch', None, True)]:
+            expected = [(x.hexsha, x.parents, x.author, x.authored_date,
+                         x.committed_date, x.message)
+                        for x in cli.iter_commits(
+                            high, low, exclude, first_parent=first_parent)]
+            assert expected == [
+                (x.hexsha, x.parents, x.author, x.authored_date,
+                 x.committed_date, x.message)
+                for x in inprocess.iter_commits(
+                    high, low, exclude, first_parent=first_parent)]
+
+    def test_date_order(self):
+        """No parent comes before its children, despite the dates"""
+        client = self.repo.git
+        # a commit from the future, reached through a merge before
+        # its child from the past
+        client.checkout('-b', 'future')
+        client.update_environment(GIT_COMMITTER_DATE='2090-01-01 00:00Z')
+        client.commit('--allow-empty', '-m', 'future')
+        client.checkout('-b', 'past')
+        client.update_environment(GIT_COMMITTER_DATE='2001-01-01 00:00Z')
+        client.commit('--allow-empty', '-m', 'past')
+        client.update_environment(GIT_COMMITTER_DATE=None)
+        client.checkout('master')
+        client.merge('--no-ff', '-m', 'merge future', 'future')
+        client.merge('--no-ff', '-m', 'merge past', 'past')
+        future = self.repo.commit('future').hexsha
+        past = self.repo.commit('past').hexsha
+        cli = GitCliBackend(self.repo)
+        inprocess = InProcessBackend.open(self.path)
+        for date_order in (False, True):
+            walked = [x.hexsha for x in cli.iter_commits(
+                'HEAD', date_order=date_order)]
+            assert walked == [x.hexsha for x in inprocess.iter_commits(
+                'HEAD', date_order=date_order)]
+            assert (walked.index(past) < walked.index(future)) == date_order
+
+    def test_tags_and_ancestry(self):
+        for backend in (open_backend('git', self.path),
+                        open_backend('gitdb', self.path, self.repo)):
+            head = backend.commit('HEAD').hexsha
+            tagged = backend.commit('1.0.0').hexsha
+            assert backend.is_ancestor(tagged, head)
+            assert not backend.is_ancestor(head, tagged)
+            assert backend.tag_details('1.1.0').message == 'annotated'
+            assert backend.tag_details('1.0.0') is None
+            assert [x for (_, x) in backend.tag_refs(['refs/tags/'])] == [
+                '1.0.0', '1.1.0']
+            signatures = backend.tag_signatures(['refs/tags/'])
+            assert sorted(signatures) == ['1.0.0', '1.1.0']
+            commit = self.repo.commit('1.0.0')
+            assert signatures['1.0.0'] == (
+                commit.author.name, commit.author.email, commit.authored_date)
+            tag = self.repo.tags['1.1.0'].tag
+            assert signatures['1.1.0'] == (
+                tag.tagger.name, tag.tagger.email, tag.tagged_date)
+
+    def test_same_changelog(self):
+        out_file = os.path.join(self.tmp_dir, 'outfile')
+        for args in ([], ['-x', '-b'], ['-u', '1.1.0', '-s', '1.0.0'],
+                     ['-t']):
+            outputs = []
+            for backend in ('git', 'gitdb'):
+                assert err.SUCCESS == gcg.entrypoint.main([
+                    'xyz', '-p', self.path, '-O', 'rpm', '-o', out_file,
+                    '--backend', backend] + args)
+                outputs.append(open(out_file).read())
+            assert outputs[0] == outputs[1]
+
+    def test_no_processes(self):
+        """The in-process backend doesn't run git"""
+        out_file = os.path.join(self.tmp_dir, 'outfile')
+        with patch.object(subprocess, 'Popen',
+                          side_effect=AssertionError('git was run')):
+            assert err.SUCCESS == gcg.entrypoint.main([
+                'xyz', '-p', self.path, '-O', 'rpm', '-o', out_file,
+                '--backend', 'gitdb', '-x', '-b', '--versions', '>=1.0.0'])
+        assert '- ISSUE-5 merge' not in open(out_file).read()
+        assert '- ISSUE-4 on branch' in open(out_file).read()
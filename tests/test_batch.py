@@ -0,0 +1,97 @@
+#!/usr/bin/env python2
+"""
+Component tests for the manifest-driven batch mode
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from mock import patch
+
+import gcg.batch
+import gcg.entrypoint
+import gcg.errors as err
+from tests.helpers.gitrepo import prepare_git_repo
+
+
+def run_job_in(argv):
+    """Stand-in for gcg.batch.run_job(), recording the worker process"""
+    time.sleep(0.1)
+    with open(argv[argv.index('--output-file') + 1], 'w') as ofile:
+        ofile.write(str(os.getpid()))
+    return err.SUCCESS
+
+
+class TestBatch(object):
+    """Batch jobs produce the same output as individual runs"""
+
+    # pylint: disable=unused-argument,missing-docstring
+    # pylint: disable=attribute-defined-outside-init
+    def setup_method(self, test_method):
+        self.tmp_dir = tempfile.mkdtemp()
+        (self.path, _, _) = prepare_git_repo(
+            self.tmp_dir, messages_and_tags=[
+                ("1st", None), ("2nd", "1.0.0"), ("3rd", None)])
+
+    # pylint: disable=unused-argument,missing-docstring
+    def teardown_method(self, test_method):
+        shutil.rmtree(self.tmp_dir)
+
+    def write_manifest(self, jobs):
+        manifest = os.path.join(self.tmp_dir, 'manifest.json')
+        with open(manifest, 'w') as mfile:
+            json.dump({'jobs': jobs}, mfile)
+        return manifest
+
+    def test_jobs(self, capsys):
+        manifest = self.write_manifest([
+            {'name': 'rpm', 'path': 'testrepo', 'output_format': 'rpm',
+             'output_file': 'out.rpm'},
+            {'name': 'deb', 'path': 'testrepo', 'output_format': 'deb',
+             'output_file': 'out.deb', 'deb_package_name': 'pkg',
+             'deb_distribution': 'xenial', 'until': 'HEAD~1'},
+            {'name': 'norepo', 'path': 'nothere', 'output_format': 'rpm',
+             'output_file': 'out.none'},
+            {'name': 'nodistro', 'path': 'testrepo', 'output_format': 'deb',
+             'output_file': 'out.none', 'deb_package_name': 'pkg'},
+        ])
+        assert err.BATCH_JOBS_FAILED == gcg.batch.main(
+            ['xyz', manifest, '-j', '2'])
+        assert capsys.readouterr().out.splitlines() == [
+            'rpm: {}'.format(err.SUCCESS),
+            'deb: {}'.format(err.SUCCESS),
+            'norepo: {}'.format(err.REPO_PATH_INVALID),
+            'nodistro: {}'.format(err.INVALID_INPUT),
+        ]
+
+        expected = os.path.join(self.tmp_dir, 'expected')
+        assert err.SUCCESS == gcg.entrypoint.main([
+            'xyz', '-p', self.path, '-O', 'deb', '-o', expected, '-n', 'pkg',
+            '-D', 'xenial', '-u', 'HEAD~1'])
+        assert open(os.path.join(self.tmp_dir, 'out.deb')).read() == \
+            open(expected).read()
+        assert '- 3rd' in open(os.path.join(self.tmp_dir, 'out.rpm')).read()
+
+    def test_invalid_manifest(self):
+        manifest = self.write_manifest([{'name': 'stdout', 'path': '.'}])
+        assert err.INVALID_INPUT == gcg.batch.main(['xyz', manifest])
+        assert err.INVALID_INPUT == gcg.batch.main(
+            ['xyz', os.path.join(self.tmp_dir, 'nothere.json')])
+
+    def test_same_repository_jobs(self, capsys):
+        """Jobs of a single repository are spread over the workers"""
+        manifest = self.write_manifest([
+            {'name': str(x), 'path': 'testrepo',
+             'output_file': 'out.{}'.format(x)} for x in range(8)])
+        # the workers are forked, patched already
+        with patch.object(gcg.batch, 'run_job', run_job_in):
+            assert err.SUCCESS == gcg.batch.main(['xyz', manifest, '-j', '2'])
+        assert capsys.readouterr().out.splitlines() == [
+            '{}: {}'.format(x, err.SUCCESS) for x in range(8)]
+        workers = set(
+            open(os.path.join(self.tmp_dir, 'out.{}'.format(x))).read()
+            for x in range(8))
+        assert len(workers) == 2
@@ -0,0 +1,77 @@
+#!/usr/bin/env python2
+"""
+Tests of the benchmark tooling: the repository generator, stage timing
+and result comparison
+"""
+
+import os
+import shutil
+import tempfile
+
+import git
+import pytest
+
+from benchmarks.common import DEFAULT_PARAMS, RepoParams, params_from_dict
+from benchmarks.compare import compare_results
+from benchmarks.generate import generate_repo
+from benchmarks.run import STAGES, time_stages
+
+
+class TestBenchmarks(object):
+    """Generated repositories have the requested shape"""
+
+    # pylint: disable=unused-argument,missing-docstring
+    # pylint: disable=attribute-defined-outside-init
+    def setup_method(self, test_method):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.params = RepoParams(commits=120, tag_every=10, merge_ratio=0.2,
+                                 branch_length=3, message_size=100,
+                                 annotated_ratio=0.5, seed=1)
+        self.path = generate_repo(os.path.join(self.tmp_dir, 'repo'),
+                                  self.params)
+
+    # pylint: disable=unused-argument,missing-docstring
+    def teardown_method(self, test_method):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_generate(self):
+        repo = git.Repo(self.path)
+        commits = list(repo.iter_commits('HEAD'))
+        assert len(commits) == 120
+        merges = [x for x in commits if len(x.parents) > 1]
+        assert merges
+        # side branches of 3 commits fork off the first parent of the merge
+        for merge in merges:
+            side = [repo.commit('{}^2~{}'.format(merge.hexsha, x))
+                    for x in range(4)]
+            assert merge.parents[0] not in side[:3]
+            assert side[3] == merge.parents[0]
+        mainline = 120 - 3 * len(merges)
+        assert len(repo.tags) == mainline // 10
+        kinds = set(x.tag is None for x in repo.tags)
+        assert kinds == set([True, False])
+        assert all(len(x.message) >= 100 for x in commits)
+        # same parameters: the repository is reused
+        assert generate_repo(self.path, self.params) == self.path
+        with pytest.raises(ValueError):
+            generate_repo(self.path, self.params._replace(seed=2))
+        # saved before the branch length was a parameter
+        old = dict(self.params._asdict())
+        del old['branch_length']
+        assert params_from_dict(old).branch_length == \
+            DEFAULT_PARAMS.branch_length
+
+    def test_time_stages(self):
+        (timings, counters) = time_stages(self.path, ['-O', 'rpm', '-x'])
+        assert list(timings) == list(STAGES)
+        assert counters['releases'] == len(git.Repo(self.path).tags) + 1
+        assert 0 < counters['commits'] < 120
+        assert counters['output_size'] > 0
+
+    def test_compare(self):
+        baseline = {'a': {'timings': {'traverse': 1.0, 'render': 0.01}}}
+        current = {'a': {'timings': {'traverse': 1.5, 'render': 0.03}},
+                   'b': {'timings': {'traverse': 1.0}}}
+        results = compare_results(baseline, current, 1.2)
+        assert [(x[1], x[5]) for x in results] == [
+            ('traverse', True), ('render', False)]
@@ -0,0 +1,66 @@
+#!/usr/bin/env python2
+"""
+Component tests for the persistent traversal cache
+"""
+
+import os
+import shutil
+import tempfile
+
+import gcg.entrypoint
+import gcg.errors as err
+from gcg.cache import CACHE_DIR
+from tests.helpers.gitrepo import prepare_git_repo
+
+
+class TestCache(object):
+    """Cached and uncached runs must produce the same changelog"""
+
+    # pylint: disable=unused-argument,missing-docstring
+    # pylint: disable=attribute-defined-outside-init
+    def setup_method(self, test_method):
+        self.tmp_dir = tempfile.mkdtemp()
+        (self.path, self.repo, self.client) = prepare_git_repo(
+            self.tmp_dir, messages_and_tags=[
+                ("1st", None), ("2nd", "1.0.0"), ("3rd", None)])
+
+    # pylint: disable=unused-argument,missing-docstring
+    def teardown_method(self, test_method):
+        shutil.rmtree(self.tmp_dir)
+
+    def changelog(self, *args):
+        out_file = os.path.join(self.tmp_dir, 'outfile')
+        assert err.SUCCESS == gcg.entrypoint.main(
+            ['xyz', '-p', self.path, '-O', 'rpm', '-o', out_file] +
+            list(args))
+        with open(out_file) as ofile:
+            return ofile.read()
+
+    def assert_cache_consistent(self):
+        expected = self.changelog()
+        assert self.changelog('--cache') == expected
+        return expected
+
+    def test_cache_created(self):
+        self.assert_cache_consistent()
+        assert os.listdir(os.path.join(self.repo.git_dir, CACHE_DIR))
+
+    def test_new_commits_and_tags(self):
+        self.assert_cache_consistent()
+        self.repo.index.commit("4th")
+        self.assert_cache_consistent()
+        self.repo.create_tag('1.1.0', 'HEAD')
+        self.repo.index.commit("5th")
+        output = self.assert_cache_consistent()
+        assert '- 1.1.0\n- 4th' in output
+        # no changes at all
+        assert self.changelog('--cache') == output
+
+    def test_tags_moved_and_deleted(self):
+        self.assert_cache_consistent()
+        self.repo.delete_tag('1.0.0')
+        self.repo.create_tag('1.0.0', 'HEAD~2')
+        assert '- 1.0.0\n- 1st' in self.assert_cache_consistent()
+        self.repo.delete_tag('1.0.0')
+        self.repo.index.commit("4th")
+        assert '1.0.0' not in self.assert_cache_consistent()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python2
+"""
+Component tests for shallow and partial clones
+"""
+
+import json
+import logging
+import os
+import shutil
+import tempfile
+
+import git
+
+import gcg.entrypoint
+import gcg.errors as err
+import gcg.monorepo
+from gcg.clones import CloneStatus, promisor_remotes, shallow_commits
+from tests.helpers.gitrepo import prepare_git_repo
+
+
+class TestClones(object):
+    """Changelogs of minimal clones, made without the network"""
+
+    # pylint: disable=unused-argument,missing-docstring
+    # pylint: disable=attribute-defined-outside-init
+    def setup_method(self, test_method):
+        self.tmp_dir = tempfile.mkdtemp()
+        (self.source, _, client) = prepare_git_repo(self.tmp_dir, 'source')
+        client.config('uploadpack.allowFilter', 'true')
+        path = os.path.join(self.source, 'lib', 'file')
+        os.mkdir(os.path.dirname(path))
+        for (index, tag) in enumerate(
+                [None, '1.0.0', None, '1.1.0', None, None]):
+            with open(path, 'a') as ofile:
+                ofile.write('line {}\n'.format(index) * 50)
+            client.add(path)
+            client.commit('-m', 'ISSUE-{} change'.format(index))
+            if tag is not None:
+                client.tag(tag)
+        # an (inexact) rename: detecting it would need the blobs
+        client.mv(path, path + '2')
+        with open(path + '2', 'a') as ofile:
+            ofile.write('renamed\n')
+        client.commit('-a', '-m', 'ISSUE-6 rename')
+        self.out_file = os.path.join(self.tmp_dir, 'outfile')
+
+    # pylint: disable=unused-argument,missing-docstring
+    def teardown_method(self, test_method):
+        shutil.rmtree(self.tmp_dir)
+
+    def clone(self, name, *args):
+        path = os.path.join(self.tmp_dir, name)
+        git.Git(self.tmp_dir).clone(
+            *(['--quiet'] + list(args) + ['file://' + self.source, path]))
+        return path
+
+    def changelog(self, path, *args):
+        assert err.SUCCESS == gcg.entrypoint.main(
+            ['xyz', '-p', path, '-O', 'rpm', '-o', self.out_file] +
+            list(args))
+        return open(self.out_file).read()
+
+    def test_shallow(self, caplog):
+        path = self.clone('shallow', '--depth', '4')
+        assert len(shallow_commits(git.Repo(path))) == 1
+        with caplog.at_level(logging.WARNING):
+            expected = self.changelog(path)
+        assert 'release 1.1.0 may be incomplete' in caplog.text
+        assert '- 1.1.0' in expected
+        assert 'ISSUE-2' not in expected
+        for args in (['--backend', 'gitdb'], ['-j', '2'], ['-x', '-t']):
+            assert self.changelog(path, *args) == expected
+
+    def test_partial(self):
+        expected = self.changelog(self.source)
+        path = self.clone('partial', '--filter=blob:none', '--no-checkout')
+        assert promisor_remotes(git.Repo(path)) == ['origin']
+        # nothing to fetch from
+        shutil.move(self.source, self.source + '.gone')
+        for args in ([], ['-t'], ['--backend', 'gitdb'], ['-j', '2']):
+            assert self.changelog(path, *args) == expected
+
+        manifest = os.path.join(self.tmp_dir, 'components.json')
+        with open(manifest, 'w') as mfile:
+            json.dump({'options': {'path': 'partial', 'output_format': 'rpm'},
+                       'components': [{'name': 'lib', 'paths': ['lib'],
+                                       'output_file': 'outfile'}]}, mfile)
+        assert err.SUCCESS == gcg.monorepo.main(['xyz', manifest])
+        assert open(self.out_file).read() == expected
+
+
+def test_clone_status():
+    """The status tells what kind of clone it is"""
+    assert str(CloneStatus()) == 'complete'
+    assert str(CloneStatus(['a' * 40], ['origin'])) == \
+        'shallow (1 boundary commit(s)), partial (promisor remote(s): origin)'
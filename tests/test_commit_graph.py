@@ -0,0 +1,76 @@
+#!/usr/bin/env python2
+"""
+Unit tests for the commit-graph support
+"""
+
+import os
+import shutil
+import stat
+import tempfile
+
+from gcg.commit_graph import BLOOM_CHUNKS, commit_graph_status, \
+    prepare_commit_graph, read_chunk_ids
+from tests.helpers.gitrepo import prepare_git_repo
+
+
+class TestCommitGraph(object):
+    """Detection and writing of the commit-graph"""
+
+    # pylint: disable=unused-argument,missing-docstring
+    # pylint: disable=attribute-defined-outside-init
+    def setup_method(self, test_method):
+        self.tmp_dir = tempfile.mkdtemp()
+        (_, self.repo, self.client) = prepare_git_repo(
+            self.tmp_dir, messages=["1st", "2nd"])
+
+    # pylint: disable=unused-argument,missing-docstring
+    def teardown_method(self, test_method):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_no_commit_graph(self):
+        status = prepare_commit_graph(self.repo, self.client)
+        assert not status.present
+        assert not status.changed_paths
+        assert str(status) == 'not available'
+
+    def test_write_commit_graph(self):
+        status = prepare_commit_graph(self.repo, self.client, write=True)
+        assert status.present
+        assert status.changed_paths
+        assert status.written
+        assert str(status) == 'with changed-path filters (written now); ' \
+            'changed-path filters not used'
+        assert status.strategy() == {
+            'present': True, 'bloom': True, 'path_limited_walk': False}
+        assert prepare_commit_graph(
+            self.repo, self.client, path_limited=True).path_limited_walk
+        for name in status.files:
+            assert set(BLOOM_CHUNKS) <= read_chunk_ids(name)
+
+        self.client.commit_graph('write', '--reachable', '--no-changed-paths')
+        status = commit_graph_status(self.repo)
+        assert status.present and not status.changed_paths
+
+        self.repo.config_writer().set_value(
+            'core', 'commitGraph', 'false').release()
+        assert not commit_graph_status(self.repo).present
+
+    def test_read_only_repository(self):
+        objects_dir = os.path.join(self.repo.git_dir, 'objects')
+        mode = os.stat(objects_dir).st_mode
+        os.chmod(objects_dir, mode & ~(stat.S_IWUSR | stat.S_IWGRP |
+                                       stat.S_IWOTH))
+        try:
+            if os.access(objects_dir, os.W_OK):
+                return  # e.g. running as root
+            status = prepare_commit_graph(self.repo, self.client, write=True)
+            assert not status.written and not status.present
+        finally:
+            os.chmod(objects_dir, mode)
+
+    def test_malformed_file(self):
+        path = os.path.join(self.tmp_dir, 'graph')
+        with open(path, 'wb') as gfile:
+            gfile.write(b'CGPH\x01')
+        assert read_chunk_ids(path) == set()
+        assert read_chunk_ids(os.path.join(self.tmp_dir, 'nothere')) == set()
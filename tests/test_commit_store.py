@@ -0,0 +1,71 @@
+#!/usr/bin/env python2
+# encoding: utf-8
+"""
+Unit tests for the compact commit storage
+"""
+
+import pytest
+
+from gcg.commit_store import CommitStore
+from gcg.history import Author, CommitRecord
+from gcg.jinja_filters import commit_headline
+
+
+def make_records():
+    """A couple of records to populate the store with"""
+    author = Author(u'Pytest Forever', u'author@example.com')
+    return [
+        CommitRecord('a' * 40, ('b' * 40, 'c' * 40), author, 1500000000,
+                     1500000100, u'Merge branch\n'),
+        CommitRecord('b' * 40, ('d' * 40,), author, 1400000000,
+                     1400000000, u'Zażółć gęślą jaźń\n\nBody\n'),
+        CommitRecord('0123456789abcdef0123456789abcdef01234567', (),
+                     Author(u'Other', u'other@example.com'), 0, 0, u''),
+    ]
+
+
+def test_store_round_trip():
+    """Views return exactly what has been stored"""
+    store = CommitStore()
+    records = make_records()
+    for record in records:
+        store.append(record)
+
+    assert len(store) == 3
+    for (view, record) in zip(store, records):
+        assert view.hexsha == record.hexsha
+        assert view.message == record.message
+        assert view.author == record.author
+        assert view.authored_date == record.authored_date
+        assert view.committed_date == record.committed_date
+        assert view.parent_count == len(record.parents)
+        assert str(view) == record.hexsha
+    assert commit_headline(store[1]) == u'Zażółć gęślą jaźń'
+    assert store[-1].author.name == u'Other'
+
+
+def test_store_index_errors():
+    """Out of range access raises IndexError, empty store is falsy"""
+    store = CommitStore()
+    assert not store
+    with pytest.raises(IndexError):
+        store[0]  # pylint: disable=pointless-statement
+    store.append(make_records()[0])
+    assert store
+    with pytest.raises(IndexError):
+        store[1]  # pylint: disable=pointless-statement
+
+
+def test_store_extend():
+    """Extending with another store is the same as appending its commits"""
+    records = make_records()
+    store = CommitStore()
+    store.append(records[2])
+    other = CommitStore()
+    for record in records[1:] + records[::-1]:
+        other.append(record)
+    store.extend(other)
+    store.extend(CommitStore())
+    assert [(x.hexsha, x.message, x.author) for x in store] == [
+        (x.hexsha, x.message, x.author)
+        for x in records[2:] + records[1:] + records[::-1]]
@@ -0,0 +1,84 @@
+#!/usr/bin/env python2
+"""
+Component tests for the first-parent traversal (--first-parent)
+"""
+
+import os
+import shutil
+import tempfile
+
+import pytest
+
+import gcg.entrypoint
+import gcg.errors as err
+from tests.helpers.gitrepo import prepare_git_repo
+
+
+class TestFirstParent(object):
+    """Merges stand for the changes of their side branches"""
+
+    # pylint: disable=unused-argument,missing-docstring
+    # pylint: disable=attribute-defined-outside-init
+    def setup_method(self, test_method):
+        self.tmp_dir = tempfile.mkdtemp()
+        (self.path, _, client) = prepare_git_repo(
+            self.tmp_dir, messages_and_tags=[("1st", "1.0.0")])
+        client.checkout('-b', 'feature')
+        client.commit('--allow-empty', '-m', 'ISSUE-2 side a')
+        client.commit('--allow-empty', '-m', 'ISSUE-3 side b')
+        client.tag('1.0.5')
+        client.checkout('master')
+        client.commit('--allow-empty', '-m', 'ISSUE-4 direct')
+        client.merge('--no-ff', '-m', 'ISSUE-5 merge feature', 'feature')
+        client.tag('1.1.0')
+        client.checkout('-b', 'fix')
+        client.commit('--allow-empty', '-m', 'ISSUE-6 fix')
+        client.checkout('master')
+        client.merge('--no-ff', '-m', 'Merge fix', 'fix')
+
+        template_dir = os.path.join(self.tmp_dir, 'templates')
+        os.mkdir(template_dir)
+        with open(os.path.join(template_dir, 'short'), 'w') as tfile:
+            tfile.write("{% for e in entries %}{{ headers[e].version }}:"
+                        "{% for c in entries[e] %} {{ c.message | trim }};"
+                        "{% endfor %}\n{% endfor %}")
+        self.out_file = os.path.join(self.tmp_dir, 'outfile')
+
+    # pylint: disable=unused-argument,missing-docstring
+    def teardown_method(self, test_method):
+        shutil.rmtree(self.tmp_dir)
+
+    def changelog(self, *args):
+        assert err.SUCCESS == gcg.entrypoint.main(
+            ['xyz', '-p', self.path, '-O', 'short', '-o', self.out_file,
+             '--template-dir', os.path.join(self.tmp_dir, 'templates')] +
+            list(args))
+        return open(self.out_file).read()
+
+    def test_mainline(self):
+        expected = ("current: Merge fix;\n"
+                    "1.1.0: ISSUE-5 merge feature; ISSUE-4 direct;\n"
+                    "1.0.0: 1st;\n")
+        for args in ([], ['--backend', 'gitdb'], ['-j', '2']):
+            assert self.changelog('--first-parent', *args) == expected
+        # the side branch and its release are walked otherwise
+        assert '1.0.5:' in self.changelog()
+        assert self.changelog('--first-parent', '-b') == \
+            "1.1.0: ISSUE-5 merge feature; ISSUE-4 direct;\n"
+
+    def test_expand_merges(self):
+        expected = ("current: ISSUE-6 fix;\n"
+                    "1.1.0: ISSUE-3 side b; ISSUE-2 side a; ISSUE-4 direct;\n"
+                    "1.0.0: 1st;\n")
+        for args in ([], ['--backend', 'gitdb'], ['-j', '2'], ['-x']):
+            assert self.changelog('--first-parent', '--expand-merges',
+                                  *args) == expected
+        assert self.changelog('--first-parent', '--expand-merges', '-b') == \
+            "current: ISSUE-6 fix;\n1.1.0: ISSUE-3 side b; ISSUE-2 side a; " \
+            "ISSUE-4 direct;\n"
+
+
+def test_expand_merges_requires_first_parent():
+    """--expand-merges means nothing for the full walk"""
+    with pytest.raises(ValueError):
+        gcg.entrypoint.parse_args(['-O', 'rpm', '--expand-merges'])
@@ -0,0 +1,141 @@
+#!/usr/bin/env python2
+"""
+Unit tests for streaming commit records out of 'git log'
+"""
+
+import os
+import shutil
+import tempfile
+
+import pytest
+
+from gcg.history import CommitRecord, CommitStub, iter_commit_paths, \
+    iter_commit_records, iter_filtered_commits, iter_mainline_groups, \
+    split_fields
+from tests.helpers.gitrepo import prepare_git_repo, AUTHOR
+
+
+def test_split_fields_across_chunks():
+    """Fields split across read boundaries are reassembled"""
+    chunks = [b'a\0b', b'c\0', b'd\0e\0f', b'\0']
+    assert list(split_fields(chunks, 2)) == [[b'a', b'bc'], [b'd', b'e']]
+    assert list(split_fields(chunks, 1)) == [
+        [b'a'], [b'bc'], [b'd'], [b'e'], [b'f']]
+
+
+def test_records_match_repository():
+    """Records carry the same data GitPython would load"""
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        (_, repo, client) = prepare_git_repo(tmp_dir, messages=[
+            "First", "Second\n\nWith a body\x1fand odd characters"])
+        records = list(iter_commit_records(client, 'HEAD'))
+        assert [x.hexsha for x in records] == [
+            x.hexsha for x in repo.iter_commits('HEAD')]
+        (second, first) = records
+        assert isinstance(second, CommitRecord)
+        assert second.message == repo.head.commit.message
+        assert second.parents == (first.hexsha,)
+        assert first.parents == ()
+        assert second.author == (AUTHOR.name, AUTHOR.email)
+        assert second.authored_date == repo.head.commit.authored_date
+        assert str(second) == second.hexsha
+        assert [x.hexsha for x in iter_commit_records(
+            client, 'HEAD~1..HEAD')] == [second.hexsha]
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def test_commit_paths():
+    """Changed paths come along with the records; merges included"""
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        (path, repo, client) = prepare_git_repo(tmp_dir, messages=["Empty"])
+        for name in ('a', 'b'):
+            with open(os.path.join(path, name), 'w') as ofile:
+                ofile.write(name)
+        repo.index.add(['a', 'b'])
+        repo.index.commit("Two files")
+        client.checkout('-b', 'branch')
+        with open(os.path.join(path, 'c'), 'w') as ofile:
+            ofile.write('c')
+        client.add('c')
+        client.commit('--allow-empty-message', '-m', '')
+        client.checkout('master')
+        client.merge('--no-ff', '-m', 'Merge', 'branch')
+
+        walk = list(iter_commit_paths(client, 'HEAD'))
+        assert dict((x.message.strip(), paths) for (x, paths) in walk) == {
+            "Merge": ('c',), "": ('c',), "Two files": ('a', 'b'),
+            "Empty": ()}
+        assert [x.hexsha for (x, _) in walk] == [
+            x.hexsha for x in iter_commit_records(client, 'HEAD')]
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def test_filtered_commits():
+    """Marked commits filtered out by git keep their place in the walk"""
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        (_, repo, client) = prepare_git_repo(tmp_dir, messages=["ISSUE-1"])
+
+        def commit(message, date, tag=None):
+            """Empty commit at the given date, optionally tagged"""
+            client.update_environment(GIT_COMMITTER_DATE=date)
+            client.commit('--allow-empty', '-m', message)
+            if tag:
+                client.tag(tag)
+        commit("release 1", '2091-01-01 00:00Z', '1')
+        client.checkout('-b', 'side')
+        # same dates as the commits on master
+        commit("ISSUE-2 side", '2092-01-01 00:00Z')
+        commit("side release", '2093-01-01 00:00Z', 'side')
+        client.checkout('master')
+        commit("ISSUE-3", '2093-01-01 00:00Z')
+        commit("release 2", '2093-01-01 00:00Z', '2')
+        commit("merge", '2094-01-01 00:00Z')
+        client.merge('--no-ff', '-m', 'ISSUE-4 merge side', 'side')
+        commit("release 3", '2095-01-01 00:00Z', '3')
+        client.update_environment(GIT_COMMITTER_DATE=None)
+
+        tagged = set(x.commit.hexsha for x in repo.tags)
+        for refs in ('HEAD', '1..HEAD', 'side..HEAD'):
+            marks = tagged & set(
+                x.hexsha for x in iter_commit_records(client, refs))
+            for args in ((), ('--first-parent',)):
+                expected = [x.hexsha for x in iter_commit_records(
+                    client, refs, *args)
+                            if x.hexsha in marks or 'ISSUE' in x.message]
+                walk = list(iter_filtered_commits(
+                    client, refs, ['--grep=ISSUE'], marks, *args))
+                assert [x.hexsha for x in walk] == expected
+                assert all(isinstance(x, CommitStub) for x in walk
+                           if x.hexsha in marks)
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def test_mainline_groups():
+    """Commits are grouped by the mainline commit which brought them in"""
+    def record(hexsha, *parents):
+        """Commit record with the essentials only"""
+        return CommitRecord(hexsha, parents, AUTHOR, 0, 0, u'')
+    # 'side' is reachable from both merges, 'fix' from the top one only
+    history = [record('top', 'merge', 'fix'), record('fix', 'side'),
+               record('merge', 'base', 'side'), record('side', 'base'),
+               record('base')]
+    walk = iter(history)
+    groups = iter_mainline_groups(walk, 'top')
+    (top, merged) = next(groups)
+    assert (top.hexsha, [x.hexsha for x in merged]) == ('top', ['fix'])
+    # returned as soon as no other commit can join it
+    assert [x.hexsha for x in walk] == ['side', 'base']
+    assert [(x.hexsha, [y.hexsha for y in group])
+            for (x, group) in iter_mainline_groups(history, 'top')] == [
+                ('top', ['fix']), ('merge', ['side']), ('base', [])]
+    # parents out of the walk (e.g. hidden) only hold the groups back
+    assert [x.hexsha for (x, _) in iter_mainline_groups(
+        history[:3], 'top')] == ['top', 'merge']
+    with pytest.raises(ValueError):
+        list(iter_mainline_groups(history[1:], 'merge'))
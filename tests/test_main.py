@@ -5,14 +5,21 @@ Unit and component tests for the main module
 """
 
 from __future__ import print_function
+import json
 import re
 import os
+import pstats
 import shutil
 import tempfile
 
+import git
+from mock import patch
+
 import gcg
 import gcg.entrypoint
 import gcg.errors as err
+from gcg.backends import GitCliBackend
+from gcg.history import iter_commit_records
 from tests.helpers.gitrepo import prepare_git_repo, AUTHOR
 
 
@@ -354,3 +361,277 @@ class TestMain(object):
         assert int(grp[5]) >= 0 and int(grp[5]) < 60
         assert int(grp[6]) >= 0 and int(grp[6]) < 60
         assert int(grp[7]) >= 0 and int(grp[7]) <= 1400
+
+    def test_update_output_file(self):
+        """
+        --update puts only new releases in front of the existing file;
+        the outcome is the same as generating the changelog anew
+        """
+        input_data = [
+            ("1st", None),
+            ("2nd", "v1.0.0"),
+            ("3rd", None),
+        ]
+        (path, repo, client) = prepare_git_repo(
+            self.tmp_dir, messages_and_tags=input_data)
+        assert client
+        for fmt in (['rpm'], ['deb', '-n', 'pkg', '-D', 'xenial']):
+            out_file = os.path.join(self.tmp_dir, 'outfile.' + fmt[0])
+            args = ['xyz', '-p', path, '-P', 'v', '-O'] + fmt
+            assert err.SUCCESS == gcg.entrypoint.main(
+                args + ['-o', out_file, '--update'])
+            with open(out_file, 'a') as ofile:
+                ofile.write('Untouched by the update\n')
+
+            repo.index.commit("4th")
+            repo.create_tag('v1.1.0', 'HEAD')
+            repo.index.commit("5th")
+            assert err.SUCCESS == gcg.entrypoint.main(
+                args + ['-o', out_file, '--update'])
+
+            expected_file = out_file + '.expected'
+            assert err.SUCCESS == gcg.entrypoint.main(
+                args + ['-o', expected_file])
+            expected = open(expected_file).read()
+            assert open(out_file).read() == (
+                expected + 'Untouched by the update\n')
+            repo.delete_tag('v1.1.0')
+
+    @staticmethod
+    def test_update_requires_output_file():
+        """--update makes no sense for the standard output"""
+        assert err.INVALID_INPUT == gcg.entrypoint.main([
+            'xyz', '-O', 'rpm', '--update'])
+
+    def test_multiple_formats(self):
+        """
+        Several formats (including custom templates) out of one run
+        give the same output as separate runs
+        """
+        input_data = [
+            ("1st", None),
+            ("2nd", "1.0.0"),
+            ("3rd", None),
+        ]
+        (path, repo, client) = prepare_git_repo(
+            self.tmp_dir, messages_and_tags=input_data)
+        assert repo and client
+        template_dir = os.path.join(self.tmp_dir, 'templates')
+        os.mkdir(template_dir)
+        with open(os.path.join(template_dir, 'short'), 'w') as tfile:
+            tfile.write("{% for e in entries %}{{ headers[e].version }}: "
+                        "{{ entries[e] | length }}\n{% endfor %}")
+
+        outputs = [os.path.join(self.tmp_dir, x) for x in ('a', 'b', 'c')]
+        deb_args = ['-n', 'pkg', '-D', 'xenial']
+        assert err.SUCCESS == gcg.entrypoint.main([
+            'xyz', '-p', path, '--template-dir', template_dir,
+            '-O', 'rpm', '-o', outputs[0], '-O', 'deb', '-o', outputs[1],
+            '-O', 'short', '-o', outputs[2]] + deb_args)
+        assert open(outputs[2]).read() == "current: 1\n1.0.0: 2\n"
+
+        single = os.path.join(self.tmp_dir, 'single')
+        for (fmt, output) in zip(['rpm', 'deb'], outputs):
+            assert err.SUCCESS == gcg.entrypoint.main([
+                'xyz', '-p', path, '-O', fmt, '-o', single] + deb_args)
+            assert open(single).read() == open(output).read()
+
+    def test_multiple_formats_invalid(self):
+        """Each format needs an output file; templates must exist"""
+        (path, _, _) = prepare_git_repo(self.tmp_dir, messages=["1st"])
+        assert err.INVALID_INPUT == gcg.entrypoint.main([
+            'xyz', '-p', path, '-O', 'rpm', '-O', 'rpm', '-o', 'x'])
+        assert err.INVALID_INPUT == gcg.entrypoint.main([
+            'xyz', '-p', path, '-O', 'nosuchformat'])
+        assert err.INVALID_INPUT == gcg.entrypoint.main([
+            'xyz', '-p', path, '-O', 'nosuchformat',
+            '--template-dir', self.tmp_dir])
+
+    def test_git_side_filtering(self):
+        """
+        Filtering done by git gives the same result as filtering in gcg,
+        including releases tagged at commits which are filtered out
+        """
+        input_data = [
+            ("ISSUE-1 1st", None),
+            ("2nd", "1.0.0"),
+            ("ISSUE-3 3rd", None),
+            ("ISSUE-4 4th", None),
+            ("5th\\n\\nISSUE-5 in the body", "1.1.0"),
+            ("ISSUE-6 6th", None),
+        ]
+        (path, repo, client) = prepare_git_repo(
+            self.tmp_dir, messages_and_tags=input_data)
+        branch = repo.create_head('branch', 'HEAD~1')
+        repo.head.reference = branch
+        repo.index.commit('ISSUE-7 7th')
+        repo.head.reference = repo.heads.master
+        client.merge('--no-ff', '-m ISSUE-8 merge', 'branch')
+        repo.create_tag('1.2.0', 'HEAD')
+
+        out_file = os.path.join(self.tmp_dir, 'outfile')
+        outputs = []
+        for args in (['-b'], ['-x'], ['-b', '-x']):
+            assert err.SUCCESS == gcg.entrypoint.main([
+                'xyz', '-p', path, '-O', 'rpm', '-o', out_file] + args)
+            outputs.append(re.sub(r' \(rev\.[0-9a-f]{8}\)', '',
+                                  open(out_file).read()))
+            with patch('gcg.entrypoint.git_filter_args', return_value=[]):
+                assert err.SUCCESS == gcg.entrypoint.main([
+                    'xyz', '-p', path, '-O', 'rpm', '-o', out_file] + args)
+            assert re.sub(r' \(rev\.[0-9a-f]{8}\)', '',
+                          open(out_file).read()) == outputs[-1]
+
+        assert '- 1.1.0\n- ISSUE-4 4th' in outputs[0]
+        assert '- 5th' not in outputs[0]
+        assert '- 1.0.0\n- ISSUE-1 1st' in outputs[0]
+        assert '- ISSUE-8 merge' not in outputs[1]
+        assert '- 1.2.0\n- ISSUE-' in outputs[1]
+        assert '- ISSUE-8 merge' not in outputs[2]
+        assert '- ISSUE-7 7th' in outputs[2]
+
+    def test_python_only_pattern(self):
+        """
+        A bug tracking pattern git (PCRE) rejects is checked by gcg only
+        """
+        input_data = [
+            ("ISSUE-1 1st", "1.0.0"),
+            ("2nd", None),
+            ("ISSUE-3 3rd", None),
+        ]
+        (path, _, _) = prepare_git_repo(
+            self.tmp_dir, messages_and_tags=input_data)
+        out_file = os.path.join(self.tmp_dir, 'outfile')
+        # (?a) (ASCII-only classes) is Python syntax only
+        assert err.SUCCESS == gcg.entrypoint.main([
+            'xyz', '-p', path, '-O', 'rpm', '-o', out_file, '-b',
+            '-B', r'(?a)ISSUE-\d+'])
+        output = open(out_file).read()
+        assert '- ISSUE-3 3rd' in output
+        assert '- ISSUE-1 1st' in output
+        assert '- 2nd' not in output
+
+    def test_release_window(self):
+        """
+        --last-releases and --versions narrow the changelog down to
+        the requested releases
+        """
+        input_data = [
+            ("1st", "v1.0.0"),
+            ("2nd", "v1.1.0"),
+            ("3rd", None),
+            ("4th", "v2.0.0"),
+            ("5th", "v2.1.0"),
+            ("6th", "v3.0.0"),
+            ("7th", None),
+        ]
+        (path, repo, client) = prepare_git_repo(
+            self.tmp_dir, messages_and_tags=input_data)
+        assert repo and client
+        template_dir = os.path.join(self.tmp_dir, 'templates')
+        os.mkdir(template_dir)
+        with open(os.path.join(template_dir, 'short'), 'w') as tfile:
+            tfile.write("{% for e in entries %}{{ headers[e].version }}: "
+                        "{{ entries[e] | length }}\n{% endfor %}")
+        out_file = os.path.join(self.tmp_dir, 'outfile')
+        args = ['xyz', '-p', path, '-P', 'v', '--template-dir', template_dir,
+                '-O', 'short', '-o', out_file]
+
+        assert err.SUCCESS == gcg.entrypoint.main(
+            args + ['--last-releases', '2'])
+        assert open(out_file).read() == "current: 1\n3.0.0: 1\n2.1.0: 1\n"
+        assert err.SUCCESS == gcg.entrypoint.main(
+            args + ['--last-releases', '0'])
+        assert open(out_file).read() == "current: 1\n"
+        assert err.SUCCESS == gcg.entrypoint.main(
+            args + ['--versions', '>=1.1.0,<3.0.0'])
+        assert open(out_file).read() == "2.1.0: 1\n2.0.0: 2\n1.1.0: 1\n"
+        assert err.SUCCESS == gcg.entrypoint.main(
+            args + ['--versions', '>=2.0.0', '-u', 'v2.1.0~1'])
+        assert open(out_file).read() == "2.0.0: 2\n"
+        assert err.INVALID_VCS_LIMITS == gcg.entrypoint.main(
+            args + ['--versions', '>=4.0.0'])
+        assert err.INVALID_INPUT == gcg.entrypoint.main(
+            args + ['--versions', '>=2.0'])
+        assert err.INVALID_INPUT == gcg.entrypoint.main(
+            args + ['--last-releases', '1', '-s', 'HEAD~1'])
+
+    def test_release_window_stops_walk(self):
+        """The walk isn't continued past the requested releases"""
+        input_data = [("{}th".format(x), "1.{}.0".format(x))
+                      for x in range(10)]
+        (path, repo, _) = prepare_git_repo(
+            self.tmp_dir, messages_and_tags=input_data)
+        options = gcg.entrypoint.parse_args(
+            ['-p', path, '-O', 'rpm', '--last-releases', '2'])
+        walked = []
+
+        def counting_walk(*args, **kwargs):
+            for commit in iter_commit_records(*args, **kwargs):
+                walked.append(commit)
+                yield commit
+
+        with patch('gcg.backends.gitcli.iter_commit_records', counting_walk):
+            entries = gcg.entrypoint.traverse_version_tree(
+                GitCliBackend(repo), options, repo.head.commit, None)
+        assert list(entries) == ['1.9.0', '1.8.0']
+        assert len(walked) == 3
+
+    def test_stats_and_profile(self):
+        """Statistics and the profile of the run are written on request"""
+        input_data = [("1st", None), ("ISSUE-1 2nd", "1.0.0"),
+                      ("3rd", None), ("ISSUE-2 4th", "1.1.0"), ("5th", None)]
+        (path, repo, _) = prepare_git_repo(
+            self.tmp_dir, messages_and_tags=input_data)
+        repo.create_tag('1.2.0', message='annotated')
+        out_file = os.path.join(self.tmp_dir, 'outfile')
+        stats_file = os.path.join(self.tmp_dir, 'stats.json')
+        profile_file = os.path.join(self.tmp_dir, 'profile')
+        for args in ([], ['-O', 'deb', '-o', out_file + '.deb', '-n', 'foo',
+                          '-D', 'xenial']):
+            assert err.SUCCESS == gcg.entrypoint.main([
+                'xyz', '-p', path, '-O', 'rpm', '-o', out_file, '-b',
+                '--stats', stats_file, '--profile-out', profile_file] + args)
+            with open(stats_file) as sfile:
+                stats = json.load(sfile)
+            assert stats['exit_code'] == err.SUCCESS
+            assert list(stats['phases']) == [
+                'open', 'resolve', 'traverse', 'headers', 'render']
+            assert all(x >= 0 for x in stats['phases'].values())
+            counters = stats['counters']
+            # 1.2.0 has no commits with bug references
+            assert counters['releases'] == 2
+            # git filters out the commits without bug references; only
+            # the tagged one of them (1.2.0) is still walked
+            assert counters['commits_walked'] == 3
+            assert counters['commits_kept'] == 2
+            assert counters['git_processes'] > 0
+            assert counters['object_reads'] > 0
+            assert stats['commit_graph'] == {
+                'present': False, 'bloom': False, 'path_limited_walk': False}
+            assert counters['output_size'] == os.path.getsize(out_file) + (
+                os.path.getsize(out_file + '.deb') if args else 0)
+            assert pstats.Stats(profile_file).total_calls > 0
+        # the repository objects aren't left instrumented
+        assert type(repo.git) is git.Git
+        assert 'stream' not in vars(repo.odb)
+
+    def test_prefer_tags_bulk(self):
+        """Tagger details of all the releases come from one query"""
+        (path, repo, _) = prepare_git_repo(
+            self.tmp_dir, messages=["{}th".format(x) for x in range(5)])
+        for (number, commit) in enumerate(repo.iter_commits('HEAD')):
+            if number % 2:
+                repo.create_tag('1.{}.0'.format(number), commit)
+            else:
+                repo.create_tag('1.{}.0'.format(number), commit,
+                                message='release')
+        out_file = os.path.join(self.tmp_dir, 'outfile')
+        with patch('gcg.backends.GitCliBackend.tag_details',
+                   side_effect=AssertionError('tag looked up')):
+            assert err.SUCCESS == gcg.entrypoint.main([
+                'xyz', '-p', path, '-O', 'rpm', '-o', out_file, '-t'])
+        headers = [x for x in open(out_file) if x.startswith('*')]
+        assert len(headers) == 5
+        assert all('{} <{}> - 1.'.format(AUTHOR.name, AUTHOR.email) in x
+                   for x in headers)
@@ -0,0 +1,151 @@
+#!/usr/bin/env python2
+"""
+Component tests for the monorepo mode
+"""
+
+import json
+import os
+import re
+import shutil
+import tempfile
+
+import gcg.entrypoint
+import gcg.errors as err
+import gcg.monorepo
+from gcg.backends import GitCliBackend
+from gcg.monorepo import Component
+from tests.helpers.gitrepo import prepare_git_repo
+
+
+def test_component_paths():
+    """Directories match the paths below them; patterns are globs"""
+    component = Component('x', ['lib/', './doc', 'tools/*.py'], None)
+    assert component.touches(['lib/a.c'])
+    assert component.touches(['README', 'doc/x/y.rst'])
+    assert component.touches(['tools/gen.py'])
+    assert not component.touches(['library/a.c', 'tools/gen.sh'])
+    assert not component.touches([])
+    assert Component('all', ['.'], None).touches(['README'])
+
+
+class TestMonorepo(object):
+    """Per-component changelogs out of a single walk"""
+
+    # pylint: disable=unused-argument,missing-docstring
+    # pylint: disable=attribute-defined-outside-init
+    def setup_method(self, test_method):
+        self.tmp_dir = tempfile.mkdtemp()
+        (self.path, self.repo, _) = prepare_git_repo(self.tmp_dir)
+        for (message, files, tag) in [
+                ("1st", ['a/x', 'b/y'], None),
+                ("2nd", ['a/x'], 'a-1.0.0'),
+                ("3rd", ['b/y'], 'b-1.0.0'),
+                ("4th", ['c/z'], None),
+                ("5th", ['a/x', 'b/y'], 'a-1.1.0')]:
+            for name in files:
+                fpath = os.path.join(self.path, name)
+                if not os.path.isdir(os.path.dirname(fpath)):
+                    os.makedirs(os.path.dirname(fpath))
+                with open(fpath, 'a') as ofile:
+                    ofile.write(message)
+            self.repo.index.add(files)
+            commit = self.repo.index.commit(message)
+            if tag:
+                self.repo.create_tag(tag, commit)
+
+    # pylint: disable=unused-argument,missing-docstring
+    def teardown_method(self, test_method):
+        shutil.rmtree(self.tmp_dir)
+
+    def write_manifest(self, data):
+        manifest = os.path.join(self.tmp_dir, 'components.json')
+        with open(manifest, 'w') as mfile:
+            json.dump(data, mfile)
+        return manifest
+
+    def test_components(self):
+        template_dir = os.path.join(self.tmp_dir, 'templates')
+        os.mkdir(template_dir)
+        with open(os.path.join(template_dir, 'short'), 'w') as tfile:
+            tfile.write("{% for e in entries %}{{ headers[e].version }}:"
+                        "{% for c in entries[e] %} {{ c.message | trim }}"
+                        "{% endfor %}\n{% endfor %}")
+        manifest = self.write_manifest({
+            'options': {'path': 'testrepo', 'output_format': 'short',
+                        'template_dir': 'templates'},
+            'components': [
+                {'name': 'a', 'paths': ['a'], 'tag_prefix': 'a-',
+                 'output_file': 'a.out'},
+                {'name': 'b', 'paths': 'b/', 'tag_prefix': 'b-',
+                 'output_file': 'b.out'},
+                {'name': 'rpm', 'paths': ['a', 'b'], 'tag_prefix': 'a-',
+                 'output_format': 'rpm', 'output_file': 'rpm.out'},
+            ]})
+        assert err.SUCCESS == gcg.monorepo.main(['xyz', manifest])
+
+        def output(name):
+            return open(os.path.join(self.tmp_dir, name)).read()
+        assert output('a.out') == "1.1.0: 5th\n1.0.0: 2nd 1st\n"
+        assert output('b.out') == "current: 5th\n1.0.0: 3rd 1st\n"
+
+        expected = os.path.join(self.tmp_dir, 'expected')
+        assert err.SUCCESS == gcg.entrypoint.main([
+            'xyz', '-p', self.path, '-P', 'a-', '-O', 'rpm', '-o', expected])
+        assert output('rpm.out') == re.sub(
+            r'- 4th \(rev\.[0-9a-f]{8}\)\n', '', open(expected).read())
+
+    def test_invalid_manifest(self):
+        component = {'name': 'a', 'paths': ['a'], 'output_file': 'a.out',
+                     'path': 'testrepo', 'output_format': 'rpm'}
+        for data in [
+                [component],
+                {'components': [dict(component, paths=None, name='b'),
+                                dict(component, output_file=None)]},
+                {'components': [component, dict(component, until='HEAD~1')]},
+                {'components': [dict(component, last_releases=1)]}]:
+            assert err.INVALID_INPUT == gcg.monorepo.main(
+                ['xyz', self.write_manifest(data)])
+
+    def test_path_limited_walk(self):
+        """
+        The walk limited to the components' paths (used with the Bloom
+        filters of the commit-graph) routes commits the same way
+        """
+        client = self.repo.git
+        client.checkout('-b', 'branch', 'HEAD~2')
+        for (name, content) in [('a/x', 'branch'), ('d/w', 'branch')]:
+            fpath = os.path.join(self.path, name)
+            if not os.path.isdir(os.path.dirname(fpath)):
+                os.makedirs(os.path.dirname(fpath))
+            with open(fpath, 'w') as ofile:
+                ofile.write(content)
+            client.add(name)
+            client.commit('-m', 'on branch: ' + name)
+        client.checkout('master')
+        client.merge('--no-ff', '-X', 'theirs', '-m', 'merge', 'branch')
+        client.tag('b-1.1.0', 'HEAD~1')
+
+        manifest = self.write_manifest({
+            'options': {'path': 'testrepo', 'output_format': 'rpm'},
+            'components': [
+                {'name': 'a', 'paths': ['a'], 'tag_prefix': 'a-',
+                 'output_file': 'a.out'},
+                {'name': 'b', 'paths': ['b', 'd/*'], 'tag_prefix': 'b-',
+                 'output_file': 'b.out'}]})
+        components = gcg.monorepo.load_components(manifest)
+        head = self.repo.head.commit
+
+        def shas(releases):
+            return [[(tag, [x.hexsha for x in commits])
+                     for (tag, commits) in entries.items()]
+                    for entries in releases]
+        backend = GitCliBackend(self.repo)
+        full = gcg.monorepo.traverse_components(
+            backend, components, gcg.monorepo.walk_components(
+                backend, components, head, None))
+        limited = gcg.monorepo.traverse_components(
+            backend, components, gcg.monorepo.walk_components(
+                backend, components, head, None, limit_paths=True))
+        assert shas(full) == shas(limited)
+        assert head.hexsha in dict(shas(full)[0])['']
+        assert 'b-1.1.0' in full[1]
@@ -2,8 +2,18 @@
 
 """Unit test suite for functions related to version handling"""
 
+import collections
+import os
+import shutil
+import tempfile
 from argparse import Namespace
+
+import jinja2
+from mock import patch
+
+import gcg.entrypoint
 import gcg.jinja_filters
+import gcg.precompiled
 
 
 def test_commit_headline_ok():
@@ -18,3 +28,54 @@ def test_commit_headline_ok():
 
     """)
     assert gcg.jinja_filters.commit_headline(fake_commit) == "This is a"
+
+
+def render_sample(env, output_format):
+    """Render a small changelog with given environment"""
+    entries = collections.OrderedDict()
+    entries['v1.0.0'] = [Namespace(message='First\n', hexsha='a1a2a3a4a5a6')]
+    headers = {'v1.0.0': {'version': '1.0.0', 'author': 'me',
+                          'email': 'me@example.com', 'date_rpm': 'today',
+                          'date_deb': 'now', 'deb_name': 'pkg',
+                          'deb_distro': 'xenial', 'deb_urgency': 'low'}}
+    return env.get_template(output_format).render(
+        entries=entries, headers=headers)
+
+
+def test_precompiled_templates():
+    """Precompiled built-in templates are used and render the same"""
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        gcg.precompiled.compile_templates(tmp_dir)
+        with patch('gcg.precompiled.COMPILED_DIR', tmp_dir):
+            env = gcg.entrypoint.init_jinja_env()
+        assert isinstance(env.loader.loaders[0], jinja2.ModuleLoader)
+        plain = jinja2.Environment(loader=jinja2.PackageLoader('gcg'))
+        plain.filters.update(gcg.jinja_filters.FILTERS)
+        for output_format in ('rpm', 'deb'):
+            assert render_sample(env, output_format) == \
+                render_sample(plain, output_format)
+
+        # compiled by a different Jinja version: not used
+        with open(os.path.join(tmp_dir, 'jinja2.version'), 'w') as vfile:
+            vfile.write('0.0')
+        assert gcg.precompiled.module_loader(tmp_dir) is None
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+def test_external_templates_bytecode_cache():
+    """Templates from an external directory are cached as bytecode"""
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        template_dir = os.path.join(tmp_dir, 'templates')
+        os.mkdir(template_dir)
+        with open(os.path.join(template_dir, 'custom'), 'w') as tfile:
+            tfile.write('{% for e in entries %}{{ e }}{% endfor %}')
+        cache_dir = os.path.join(tmp_dir, 'cache')
+        with patch.dict(os.environ, {'XDG_CACHE_HOME': cache_dir}):
+            env = gcg.entrypoint.init_jinja_env(template_dir)
+            assert env.get_template('custom').render(entries=['x']) == 'x'
+        assert os.listdir(os.path.join(cache_dir, 'gcg', 'jinja2'))
+    finally:
+        shutil.rmtree(tmp_dir)
@@ -0,0 +1,54 @@
+#!/usr/bin/env python2
+"""
+Component tests for the parallel traversal of the version tree
+"""
+
+import os
+import shutil
+import tempfile
+
+from mock import patch
+
+import gcg.entrypoint
+import gcg.errors as err
+from benchmarks.common import RepoParams
+from benchmarks.generate import generate_repo
+
+
+class TestParallel(object):
+    """Releases collected by the workers make the same changelog"""
+
+    # pylint: disable=unused-argument,missing-docstring
+    # pylint: disable=attribute-defined-outside-init
+    def setup_method(self, test_method):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = generate_repo(
+            os.path.join(self.tmp_dir, 'repo'),
+            RepoParams(commits=300, tag_every=25, merge_ratio=0.3,
+                       branch_length=2, message_size=40, annotated_ratio=0.5,
+                       seed=3))
+        self.out_file = os.path.join(self.tmp_dir, 'outfile')
+
+    # pylint: disable=unused-argument,missing-docstring
+    def teardown_method(self, test_method):
+        shutil.rmtree(self.tmp_dir)
+
+    def changelog(self, args):
+        assert err.SUCCESS == gcg.entrypoint.main(
+            ['xyz', '-p', self.path, '-O', 'rpm', '-o', self.out_file] + args)
+        return open(self.out_file).read()
+
+    def test_same_changelog(self):
+        for args in ([], ['-x', '-b'], ['--last-releases', '3'],
+                     ['--versions', '>=1.3.0,<1.6.0'], ['-u', 'HEAD~40'],
+                     ['--backend', 'gitdb', '-x']):
+            expected = self.changelog(args)
+            # releases split among the workers, too
+            with patch('gcg.parallel.PIECE_SIZE', 7):
+                assert self.changelog(args + ['-j', '3']) == expected
+
+    def test_cache(self):
+        expected = self.changelog([])
+        assert self.changelog(['-j', '2', '--cache']) == expected
+        assert os.listdir(os.path.join(self.path, 'gcg-cache'))
+        assert self.changelog(['--cache']) == expected
@@ -0,0 +1,41 @@
+#!/usr/bin/env python2
+"""
+Unit tests for the lazy release pipeline
+"""
+
+import jinja2
+
+from gcg.pipeline import ReleaseStream
+
+
+def fake_releases(count, consumed):
+    """Releases generator recording how far it has been consumed"""
+    for i in range(count):
+        consumed.append(i)
+        yield ('v{}'.format(i), ['commit {}'.format(i)])
+
+
+def test_stream_is_lazy_and_bounded():
+    """Releases are pulled one by one, only the recent ones are kept"""
+    consumed = []
+    stream = ReleaseStream(fake_releases(5, consumed),
+                           lambda version, commits: {'version': version})
+    for (i, version) in enumerate(stream):
+        assert consumed[-1] == i
+        assert stream[version] == ['commit {}'.format(i)]
+        assert stream.headers[version] == {'version': version}
+        assert len(stream.headers) <= ReleaseStream.WINDOW
+    assert 'v0' not in stream
+    assert 'v4' in stream
+
+
+def test_stream_with_lookahead():
+    """Templates using the loop variable (which may look ahead) work"""
+    template = jinja2.Template(
+        "{% for e in entries %}{{ headers[e].version }}:"
+        "{% for c in entries[e] %}{{ c }}{% endfor %}"
+        "{% if not loop.last %},{% endif %}{% endfor %}")
+    stream = ReleaseStream(fake_releases(3, []),
+                           lambda version, commits: {'version': version})
+    assert template.render(entries=stream, headers=stream.headers) == (
+        "v0:commit 0,v1:commit 1,v2:commit 2")
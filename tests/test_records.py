@@ -0,0 +1,101 @@
+#!/usr/bin/env python2
+# encoding: utf-8
+"""
+Tests of the record output formats (jsonl, msgpack)
+"""
+
+import collections
+import datetime
+import io
+import json
+import os
+import shutil
+import tempfile
+
+import pytest
+
+import gcg.entrypoint
+import gcg.errors as err
+from gcg.commit_store import CommitStore
+from gcg.history import Author, CommitRecord
+from gcg.records import generate_records
+from tests.helpers.gitrepo import prepare_git_repo
+
+
+def sample_changelog():
+    """Entries and headers of a changelog with two releases"""
+    author = Author(u'Pytest Forever', u'author@example.com')
+    entries = collections.OrderedDict()
+    for (version, messages) in (('', [u'Zażółć\n']),
+                                ('1.0.0', [u'2nd\n', u'1st\n'])):
+        entries[version] = CommitStore()
+        for (index, message) in enumerate(messages):
+            entries[version].append(CommitRecord(
+                str(index) * 40, (), author, 1500000000 + index,
+                1500000100 + index, message))
+    date = datetime.datetime(2017, 7, 14, 2, 40)
+    headers = dict((x, {'version': x or 'current', 'date': date,
+                        'author': 'me', 'email': 'me@example.com'})
+                   for x in entries)
+    return (entries, headers)
+
+
+def test_jsonl():
+    """A line per release, followed by the lines of its commits"""
+    (entries, headers) = sample_changelog()
+    chunks = list(generate_records(entries, headers, 'jsonl', 200))
+    assert len(chunks) > 1
+    records = [json.loads(x) for x in ''.join(chunks).splitlines()]
+    assert [(x['type'], x['tag']) for x in records] == [
+        ('release', ''), ('commit', ''),
+        ('release', '1.0.0'), ('commit', '1.0.0'), ('commit', '1.0.0')]
+    assert records[0]['version'] == 'current'
+    assert records[0]['date'] == '2017-07-14T02:40:00'
+    assert records[1]['message'] == u'Zażółć\n'
+    assert records[4]['hexsha'] == '1' * 40
+    assert records[4]['authored_date'] == 1500000001
+
+
+def test_msgpack():
+    """Same records, as MessagePack maps"""
+    msgpack = pytest.importorskip('msgpack')
+    (entries, headers) = sample_changelog()
+    data = b''.join(generate_records(entries, headers, 'msgpack', 200))
+    text = ''.join(generate_records(entries, headers, 'jsonl', 200))
+    assert list(msgpack.Unpacker(io.BytesIO(data), raw=False)) == \
+        [json.loads(x) for x in text.splitlines()]
+
+
+class TestRecordOutput(object):
+    """Records are written alongside (or instead of) the changelogs"""
+
+    # pylint: disable=unused-argument,missing-docstring
+    # pylint: disable=attribute-defined-outside-init
+    def setup_method(self, test_method):
+        self.tmp_dir = tempfile.mkdtemp()
+        (self.path, _, _) = prepare_git_repo(
+            self.tmp_dir, messages_and_tags=[
+                ("ISSUE-1 1st", None), ("2nd", "1.0.0"), ("3rd", None)])
+
+    # pylint: disable=unused-argument,missing-docstring
+    def teardown_method(self, test_method):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_main(self):
+        jsonl_file = os.path.join(self.tmp_dir, 'out.jsonl')
+        rpm_file = os.path.join(self.tmp_dir, 'out.rpm')
+        assert err.SUCCESS == gcg.entrypoint.main([
+            'xyz', '-p', self.path, '-O', 'jsonl', '-o', jsonl_file,
+            '-O', 'rpm', '-o', rpm_file])
+        with open(jsonl_file) as jfile:
+            records = [json.loads(x) for x in jfile]
+        assert [x.get('message') for x in records] == [
+            None, '3rd', None, '2nd', 'ISSUE-1 1st']
+        assert records[2]['version'] == '1.0.0'
+        assert records[2]['date_rpm'] in open(rpm_file).read()
+
+    def test_update_rejected(self):
+        out_file = os.path.join(self.tmp_dir, 'out.jsonl')
+        assert err.INVALID_INPUT == gcg.entrypoint.main([
+            'xyz', '-p', self.path, '-O', 'jsonl', '-o', out_file,
+            '--update'])
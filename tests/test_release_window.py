@@ -0,0 +1,66 @@
+#!/usr/bin/env python2
+"""
+Unit tests for the selection of a window of releases
+"""
+
+import pytest
+
+from gcg.release_window import ReleaseWindow, VersionRange
+from gcg.tag_filter import TagFilter
+
+
+def test_version_range():
+    """Comparisons of a range are all met; a bare version means '=='"""
+    versions = VersionRange('>=2.0.0, <3.0.0')
+    assert '2.0.0' in versions
+    assert '2.10.1' in versions
+    assert '3.0.0-rc.1' in versions
+    assert '3.0.0' not in versions
+    assert '1.9.9' not in versions
+    assert 'foo' not in versions
+    assert '1.0.0' in VersionRange('1.0.0')
+    assert '1.0.1' not in VersionRange('1.0.0')
+    assert '1.0.1' in VersionRange('!=1.0.0')
+
+
+def test_version_range_below():
+    """Only versions failing a lower bound are older than the range"""
+    versions = VersionRange('>2.0.0,<3.0.0')
+    assert versions.below('1.9.9')
+    assert not versions.below('2.0.0')
+    assert not versions.below('3.0.1')
+    assert not versions.below('foo')
+    assert not VersionRange('<3.0.0').below('0.0.1')
+
+
+def test_version_range_highest():
+    """The most recent version within the range is found"""
+    versions = VersionRange('<3.0.0')
+    assert versions.highest(['2.0.0', '3.0.0', '2.10.0', '1.0.0']) == '2.10.0'
+    assert versions.highest(['3.0.0']) is None
+
+
+@pytest.mark.parametrize('spec', ['2.0', '>=2.0.0,', '=>2.0.0', '>= 1 2'])
+def test_version_range_malformed(spec):
+    """Malformed ranges are rejected"""
+    with pytest.raises(ValueError):
+        VersionRange(spec)
+
+
+def test_last_releases_window():
+    """The window is complete once the requested releases are crossed"""
+    window = ReleaseWindow(TagFilter(None, 'v'), last_releases=2)
+    assert window.selects('')
+    assert not window.complete('v3.0.0')
+    assert not window.complete('v2.0.0')
+    assert window.complete('v1.0.0')
+
+
+def test_versions_window():
+    """Only releases within the range are selected"""
+    window = ReleaseWindow(TagFilter(None, 'v'),
+                           versions=VersionRange('>=2.0.0'))
+    assert not window.selects('')
+    assert window.selects('v2.1.0')
+    assert not window.complete('v2.0.0')
+    assert window.complete('v1.0.0')
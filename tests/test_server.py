@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Component tests for the server mode
+"""
+
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import threading
+
+import git
+import pytest
+
+import gcg.entrypoint
+import gcg.errors as err
+from gcg.server import ChangelogServer, request_options
+from tests.helpers.gitrepo import AUTHOR, prepare_git_repo
+
+
+def read_response(data):
+    """
+    :param data: raw HTTP response (bytes)
+    :return: tuple (status, headers, body); chunked body is decoded
+    """
+    (head, _, body) = data.partition(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split()[1])
+    headers = dict((x.split(':', 1)[0].lower(), x.split(':', 1)[1].strip())
+                   for x in lines[1:])
+    if headers.get('transfer-encoding') == 'chunked':
+        decoded = b''
+        while True:
+            (size, _, body) = body.partition(b'\r\n')
+            size = int(size, 16)
+            if not size:
+                break
+            decoded += body[:size]
+            body = body[size + 2:]
+        body = decoded
+    return (status, headers, body.decode('utf-8'))
+
+
+class TestServer(object):
+    """Changelogs are served as the CLI generates them"""
+
+    # pylint: disable=unused-argument,missing-docstring
+    # pylint: disable=attribute-defined-outside-init
+    def setup_method(self, test_method):
+        self.tmp_dir = tempfile.mkdtemp()
+        (self.path, self.repo, _) = prepare_git_repo(
+            self.tmp_dir, messages_and_tags=[
+                ("ISSUE-1 1st", None), ("2nd", "1.0.0"), ("3rd", None)])
+        self.socket = os.path.join(self.tmp_dir, 'gcg.sock')
+        self.loop = asyncio.new_event_loop()
+        self.server = ChangelogServer(2)
+        started = threading.Event()
+
+        async def start():
+            self.listener = await asyncio.start_unix_server(
+                self.server.handle, path=self.socket)
+            started.set()
+
+        self.thread = threading.Thread(target=self.loop.run_forever)
+        self.thread.start()
+        asyncio.run_coroutine_threadsafe(start(), self.loop)
+        started.wait(10)
+
+    # pylint: disable=unused-argument,missing-docstring
+    def teardown_method(self, test_method):
+        self.loop.call_soon_threadsafe(self.listener.close)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def request(self, argv, method='POST'):
+        async def send():
+            (reader, writer) = await asyncio.open_unix_connection(
+                self.socket)
+            body = json.dumps({'argv': argv}).encode('utf-8')
+            writer.write('{} / HTTP/1.1\r\nContent-Length: {}\r\n\r\n'.format(
+                method, len(body)).encode('latin-1') + body)
+            data = await reader.read()
+            writer.close()
+            return data
+        return read_response(asyncio.run(send()))
+
+    def test_same_as_cli(self, capsys):
+        for args in (['-O', 'rpm'], ['-O', 'deb', '-n', 'foo', '-D', 'xenial',
+                                     '-b']):
+            assert err.SUCCESS == gcg.entrypoint.main(
+                ['xyz', '-p', self.path] + args)
+            expected = capsys.readouterr().out
+            # twice: the second time with the warm state
+            for _ in range(2):
+                (status, _, body) = self.request(['-p', self.path] + args)
+                assert status == 200
+                assert body == expected
+
+    def test_refs_change(self):
+        (_, _, body) = self.request(['-p', self.path, '-O', 'rpm'])
+        assert '- 1.1.0' not in body
+        self.repo.index.commit("4th")
+        self.repo.create_tag('1.1.0')
+        (_, _, body) = self.request(['-p', self.path, '-O', 'rpm'])
+        assert '- 1.1.0' in body
+        assert '- 4th' in body
+
+    def test_new_pack(self):
+        """The gitdb backend reads the objects fetched in a new pack"""
+        argv = ['-p', self.path, '-O', 'rpm', '--backend', 'gitdb']
+        (status, _, body) = self.request(argv)
+        assert status == 200
+        upstream = os.path.join(self.tmp_dir, 'upstream')
+        client = self.repo.git
+        client.clone(self.path, upstream)
+        other = git.Repo(upstream).git
+        other.update_environment(GIT_COMMITTER_NAME=AUTHOR.name,
+                                 GIT_COMMITTER_EMAIL=AUTHOR.email)
+        other.commit('--allow-empty', '-m', 'ISSUE-4 upstream')
+        other.tag('1.1.0')
+        # packed however few the objects are
+        client.config('fetch.unpackLimit', '1')
+        client.fetch(upstream, 'master:master', '1.1.0:refs/tags/1.1.0',
+                     update_head_ok=True)
+        packs = os.listdir(os.path.join(self.repo.git_dir, 'objects', 'pack'))
+        assert len([x for x in packs if x.endswith('.pack')]) == 1
+        (status, _, body) = self.request(argv)
+        assert status == 200
+        assert '- ISSUE-4 upstream' in body
+
+    def test_errors(self):
+        (status, headers, body) = self.request(
+            ['-p', os.path.join(self.tmp_dir, 'missing'), '-O', 'rpm'])
+        assert status == 404
+        assert headers['x-gcg-exit-code'] == str(err.REPO_PATH_INVALID)
+        assert 'does not exist' in body
+        (status, _, body) = self.request(['-p', self.path, '-O', 'rpm',
+                                          '-u', 'nosuchref'])
+        assert status == 400
+        (status, _, body) = self.request(['-p', self.path, '-O', 'rpm'],
+                                         method='GET')
+        assert status == 405
+        (status, _, body) = self.request(['-p', self.path, '-O', 'etc/passwd',
+                                          '--template-dir', '/'])
+        assert status == 400
+        assert 'template_dir' in body
+
+
+def test_request_options():
+    """Requests take the gcg arguments, as a list or under 'argv'"""
+    assert request_options(b'["-O", "rpm"]').output_format == ['rpm']
+    assert request_options(b'{"argv": ["-O", "deb", "-n", "x", "-D", "y"]}'
+                           ).output_format == ['deb']
+    for body in (b'not json', b'{"args": []}', b'[1]'):
+        with pytest.raises(ValueError):
+            request_options(body)
+    with pytest.raises(ValueError) as exc:
+        request_options(b'["-O", "rpm", "-o", "file"]')
+    assert 'output_file' in str(exc.value)
+    for (argv, key) in ((['--stats', 'stats.json'], 'stats'),
+                        (['--cache'], 'cache'),
+                        (['--commit-graph'], 'commit_graph'),
+                        (['-j', '4'], 'jobs')):
+        with pytest.raises(ValueError) as exc:
+            request_options(json.dumps(['-O', 'rpm'] + argv).encode())
+        assert key in str(exc.value)
+    assert request_options(b'["-O", "rpm", "-j", "1"]').jobs == 1
+    with pytest.raises(ValueError) as exc:
+        request_options(b'["-O", "x", "--template-dir", "/srv/templates"]')
+    assert 'template_dir' in str(exc.value)
+    with pytest.raises(ValueError) as exc:
+        request_options(b'["--no-such-option"]')
+    assert 'unrecognized arguments' in str(exc.value) or \
+        'required' in str(exc.value)
+
+
+def test_repository_roots():
+    """With roots, only the repositories within them may be requested"""
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        server = ChangelogServer(1, [os.path.join(tmp_dir, 'srv')])
+        for path in ('srv', 'srv/foo', 'srv/foo/../bar'):
+            server.check_path(request_options(json.dumps(
+                ['-p', os.path.join(tmp_dir, path), '-O', 'rpm']).encode()))
+        for path in ('srv2', 'srv/../other', '.'):
+            with pytest.raises(ValueError):
+                server.check_path(request_options(json.dumps(
+                    ['-p', os.path.join(tmp_dir, path), '-O',
+                     'rpm']).encode()))
+        ChangelogServer(1).check_path(
+            request_options(b'["-p", "/", "-O", "rpm"]'))
+    finally:
+        shutil.rmtree(tmp_dir)
@@ -12,7 +12,13 @@ import shutil
 import os
 import tempfile
 
+import pytest
+
 import gcg
+from gcg.backends import GitCliBackend, InProcessBackend
+from gcg.pipeline import ReleaseStream
+from gcg.tag_filter import TagFilter
+from tests.helpers.gitrepo import prepare_git_repo
 
 
 class TestHelperFunctions(object):
@@ -50,6 +56,27 @@ class TestHelperFunctions(object):
             entries, headers, output_format='rpm', output_file=ofile)
         assert os.path.exists(ofile)
 
+    def test_print_failure_keeps_file(self):
+        """print_changelog() leaves the output file as it was on failure"""
+        ofile = os.path.join(self.temp_dir, 'output.txt')
+        with open(ofile, 'w') as cfile:
+            cfile.write('PRECIOUS')
+
+        def failing_entries():
+            """Releases of a walk failing midway"""
+            yield ('1.0.0', [])
+            raise ValueError("walk failed")
+
+        entries = ReleaseStream(
+            failing_entries(), lambda version, commits: {'version': version})
+        with pytest.raises(ValueError):
+            gcg.entrypoint.print_changelog(
+                entries, entries.headers, output_format='rpm',
+                output_file=ofile)
+        with open(ofile) as cfile:
+            assert cfile.read() == 'PRECIOUS'
+        assert os.listdir(self.temp_dir) == ['output.txt']
+
     # FIXME: fix this UT TO ACTUALLY VALIDATE THE OUTPUT, i think
     def test_print_changelog_use_stdout(self):
         # repo = git.Repo.init(self.tmp_dir)
@@ -66,3 +93,47 @@ class TestHelperFunctions(object):
         gcg.entrypoint.print_changelog(entries, headers, output_format='rpm')
 
         # print("OUTPUT: {}".format(mock_stdout.getvalue()))
+
+    @staticmethod
+    def test_generate_changelog_chunks():
+        """generate_changelog() output adds up to the rendered template"""
+        entries = collections.OrderedDict()
+        headers = {}
+        for i in range(200):
+            fake_commit = argparse.Namespace(
+                message='message {}'.format(i) * 1000, hexsha='a1a2a3a4a5a6')
+            entries[str(i)] = [fake_commit]
+            headers[str(i)] = {'version': str(i)}
+        expected = gcg.entrypoint.init_jinja_env().get_template(
+            'rpm').render(entries=entries, headers=headers)
+
+        chunks = list(gcg.entrypoint.generate_changelog(
+            entries, headers, 'rpm'))
+        assert len(chunks) > 1
+        assert all(len(x) >= gcg.entrypoint.OUTPUT_CHUNK_SIZE
+                   for x in chunks[:-1])
+        assert ''.join(chunks) == expected
+
+    def test_tag_index(self):
+        """get_tag_index() peels annotated tags and skips non-releases"""
+        input_data = [
+            ("1st", "v1.0.0"),
+            ("2nd", "not-a-version"),
+            ("3rd", "1.1.0"),
+        ]
+        (path, repo, _) = prepare_git_repo(
+            self.temp_dir, messages_and_tags=input_data)
+        repo.create_tag('v1.1.1', 'HEAD', message='annotated')
+
+        for backend in (GitCliBackend(repo), InProcessBackend.open(path)):
+            index = gcg.entrypoint.get_tag_index(backend,
+                                                 TagFilter(prefix='v'))
+            assert index == {
+                repo.commit('HEAD~2').hexsha: ['v1.0.0'],
+                repo.commit('HEAD').hexsha: ['1.1.0', 'v1.1.1'],
+            }
+            assert gcg.entrypoint.get_tag_index(backend, TagFilter()) == {
+                repo.commit('HEAD').hexsha: ['1.1.0'],
+            }
+            assert gcg.entrypoint.get_tag_index(
+                backend, TagFilter(), 'HEAD~1') == {}
@@ -0,0 +1,38 @@
+#!/usr/bin/env python2
+"""
+Tests of the startup: --help and argument errors don't load the heavy
+dependencies
+"""
+
+import subprocess
+import sys
+
+import pytest
+
+HEAVY_MODULES = ('git', 'jinja2', 'tzlocal', 'semver')
+
+SCRIPT = """
+import sys
+import gcg.entrypoint
+try:
+    %s
+except (SystemExit, ValueError):
+    pass
+print(' '.join(x for x in %r if x in sys.modules))
+"""
+
+
+@pytest.mark.parametrize('call', [
+    "gcg.entrypoint.main(['gcg'] + sys.argv[1:])",
+    "gcg.entrypoint.parse_args(sys.argv[1:])"])
+@pytest.mark.parametrize('args', [['--help'], ['-O', 'xyz'],
+                                  ['--no-such-option']])
+def test_no_heavy_imports(call, args):
+    """
+    Nothing but the argument parsing is needed to answer, whether it
+    exits (--help, usage errors) or raises ValueError (invalid values)
+    """
+    output = subprocess.check_output(
+        [sys.executable, '-c', SCRIPT % (call, HEAVY_MODULES)] + args,
+        stderr=subprocess.STDOUT)
+    assert output.decode('utf-8').splitlines()[-1] == ''
@@ -0,0 +1,22 @@
+#!/usr/bin/env python2
+"""
+Unit tests for the run statistics
+"""
+
+from mock import patch
+
+from gcg.stats import RunStats
+
+
+def test_nested_phases():
+    """Time spent in a nested phase doesn't count for the outer one"""
+    clock = iter([0.0, 1.0, 3.0, 7.0, 8.0, 9.0, 13.0])
+    with patch('gcg.stats.time.time', lambda: next(clock)):
+        stats = RunStats()
+        with stats.phase('render'):
+            releases = stats.releases([('1.0.0', [1, 2])])
+            assert list(releases) == [('1.0.0', [1, 2])]
+    # render: 1-3, 7-8 and 9-13; traverse: 3-7 (release), 8-9 (end)
+    assert stats.timings['render'] == 7.0
+    assert stats.timings['traverse'] == 5.0
+    assert stats.counters == {'releases': 1, 'commits_kept': 2}
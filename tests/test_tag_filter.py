@@ -3,6 +3,8 @@
 Unit tests for version validation and matching
 """
 
+from mock import patch
+
 from gcg.tag_filter import TagFilter
 
 
@@ -104,3 +106,39 @@ def test_matching_only_custom():
         '01.02',
         '1.2.3',
         '1.2.3-4+bld5']) == ['v123.123', '01.02']
+
+
+def test_ref_patterns():
+    """Ref patterns narrow the listing for SemVer, but not for custom
+    patterns which may match anything"""
+    assert TagFilter().ref_patterns() == ['refs/tags/[0-9]*']
+    assert TagFilter(prefix='v').ref_patterns() == [
+        'refs/tags/[0-9]*', 'refs/tags/v[0-9]*']
+    assert TagFilter(prefix='rel*').ref_patterns() == [
+        'refs/tags/[0-9]*', 'refs/tags/rel\\*[0-9]*']
+    assert TagFilter(r'^(\d+)\.(\d+)$', 'v').ref_patterns() == ['refs/tags/']
+
+
+def test_semver_fast_path():
+    """Clear-cut cases don't reach the semver module; verdicts are
+    memoized"""
+    with patch('gcg.tag_filter.semver_parse') as mock_parse:
+        obj = TagFilter(prefix='v')
+        assert obj.matching_only(
+            ['v1.2.3', '1.2.3-rc.1+build.5', 'foo', '1.2', 'v1.2.3'] * 3) == [
+                'v1.2.3', '1.2.3-rc.1+build.5', 'v1.2.3'] * 3
+        assert not mock_parse.called
+
+        mock_parse.side_effect = ValueError('nope')
+        assert not obj.matches('1.2.3-01')
+        assert not obj.matches('v1.2.3-01')
+        assert mock_parse.call_count == 1
+
+
+def test_memo_is_bounded():
+    """The memo doesn't grow beyond its limit"""
+    obj = TagFilter()
+    with patch.object(TagFilter, 'MEMO_SIZE', 10):
+        obj.matching_only(['1.0.{}'.format(x) for x in range(25)])
+    # pylint: disable=protected-access
+    assert len(obj._memo) <= 10